@@ -0,0 +1,394 @@
+"""Pub/sub backplane shared by every worker process.
+
+One process is elected leader and produces the article feed. Each worker
+subscribes to the feed and fans it out to its own WebSocket clients.
+
+Implementations, selected by URL with ``create_backplane``:
+
+* ``memory://`` -- single process, no coordination (the default)
+* ``local:///path/to/socket`` -- workers on one host, coordinated through a
+  lock file and a Unix domain socket hosted by the leader
+* ``redis://host:port/db`` -- any server speaking the Redis protocol
+"""
+import asyncio
+import logging
+import os
+import struct
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class Backplane:
+    """Base class: local delivery to subscribers of this process."""
+
+    def __init__(self, queue_size: int = 64):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def is_leader(self) -> bool:
+        """True if this process should produce the feed."""
+        return True
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, []).append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].remove(queue)
+
+    def _deliver(self, channel: str, data: bytes) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                # A subscriber this far behind only needs the newest batches
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(data)
+            self.delivered += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queued": sum(queue.qsize() for queues in self._subscribers.values() for queue in queues),
+        }
+
+
+class InProcessBackplane(Backplane):
+    async def publish(self, channel: str, data: bytes) -> None:
+        self.published += 1
+        self._deliver(channel, data)
+
+
+# Frames on the local socket: 4-byte length, 1-byte channel length, channel, payload
+_HEADER = struct.Struct(">IB")
+
+
+def _frame(channel: str, data: bytes) -> bytes:
+    encoded = channel.encode("utf-8")
+    return _HEADER.pack(len(encoded) + len(data) + 1, len(encoded)) + encoded + data
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    length, channel_length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    body = await reader.readexactly(length - 1)
+    return body[:channel_length].decode("utf-8"), body[channel_length:]
+
+
+class LocalSocketBackplane(Backplane):
+    """Workers on one host, no external services.
+
+    Whichever process holds an exclusive ``flock`` on ``<path>.lock`` is the
+    leader and hosts a Unix socket hub at ``path`` that relays frames between
+    workers. Followers connect to the hub; if the leader exits, its lock is
+    released and the followers race to take over.
+    """
+
+    def __init__(self, path: str, queue_size: int = 64, retry_interval: float = 1.0):
+        super().__init__(queue_size)
+        self.path = path
+        self.retry_interval = retry_interval
+        self._lock_file = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._hub: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._peers):
+            writer.close()
+        if self._hub is not None:
+            self._hub.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    async def is_leader(self) -> bool:
+        return self._server is not None
+
+    def _try_lock(self) -> bool:
+        import fcntl
+
+        lock_file = open(self.path + ".lock", "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            if self._try_lock():
+                await self._lead()
+                return
+            try:
+                await self._follow()
+            except (OSError, asyncio.IncompleteReadError) as e:
+                logger.debug(f"Backplane hub unavailable: {e!r}")
+            self._hub = None
+            await asyncio.sleep(self.retry_interval)
+
+    async def _lead(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=self.path)
+        logger.info(f"Backplane leader (pid {os.getpid()}) listening on {self.path}")
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._peers.add(writer)
+        try:
+            while True:
+                channel, data = await _read_frame(reader)
+                self._relay(channel, data, exclude=writer)
+                self._deliver(channel, data)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _relay(self, channel: str, data: bytes, exclude: Optional[asyncio.StreamWriter] = None) -> None:
+        frame = _frame(channel, data)
+        for writer in list(self._peers):
+            if writer is exclude:
+                continue
+            if writer.transport.get_write_buffer_size() > 8 * 1024 * 1024:
+                # Stuck follower; it will reconnect
+                logger.warning("Dropping backplane follower with a full write buffer")
+                writer.close()
+                self._peers.discard(writer)
+                continue
+            writer.write(frame)
+
+    async def _follow(self) -> None:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        self._hub = writer
+        logger.info(f"Backplane follower (pid {os.getpid()}) connected to {self.path}")
+        try:
+            while True:
+                channel, data = await _read_frame(reader)
+                self._deliver(channel, data)
+        finally:
+            writer.close()
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        self.published += 1
+        self._deliver(channel, data)
+        if self._server is not None:
+            self._relay(channel, data)
+        elif self._hub is not None:
+            self._hub.write(_frame(channel, data))
+            await self._hub.drain()
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats["leader"] = self._server is not None
+        stats["followers"] = len(self._peers)
+        return stats
+
+
+class RESPConnection:
+    """Just enough of the Redis protocol for pub/sub and leader election."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, db: int = 0, password: Optional[str] = None) -> "RESPConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        if password:
+            await connection.execute("AUTH", password)
+        if db:
+            await connection.execute("SELECT", str(db))
+        return connection
+
+    def send(self, *args) -> None:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.writer.write(b"".join(parts))
+
+    async def read(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = await self.reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self.read() for _ in range(length)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    async def execute(self, *args):
+        self.send(*args)
+        await self.writer.drain()
+        return await self.read()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+# Renew the leader key only if we still own it
+_RENEW_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+)
+
+
+class RedisBackplane(Backplane):
+    """Pub/sub and leader lease over any Redis-protocol server."""
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, prefix: str = "pulsehub:",
+                 lease_ms: int = 15000, queue_size: int = 64, command_timeout: float = 5.0):
+        super().__init__(queue_size)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.lease_ms = lease_ms
+        # A server that accepts connections but stops replying must not hold the lock forever
+        self.command_timeout = command_timeout
+        self.node_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._commands: Optional[RESPConnection] = None
+        self._lock = asyncio.Lock()
+        self._channels: Set[str] = set()
+        self._listener: Optional[RESPConnection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._leader = False
+
+    async def _command(self, *args):
+        async with self._lock:
+            try:
+                if self._commands is None:
+                    self._commands = await asyncio.wait_for(
+                        RESPConnection.open(self.host, self.port, self.db, self.password), self.command_timeout
+                    )
+                return await asyncio.wait_for(self._commands.execute(*args), self.command_timeout)
+            except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                # Reconnect on the next command; a late reply must not be read as the answer to it
+                if self._commands is not None:
+                    self._commands.close()
+                    self._commands = None
+                if isinstance(e, asyncio.TimeoutError):
+                    raise ConnectionError(f"Redis did not reply within {self.command_timeout}s") from None
+                raise
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for connection in (self._commands, self._listener):
+            if connection is not None:
+                connection.close()
+
+    async def is_leader(self) -> bool:
+        key = self.prefix + "leader"
+        try:
+            if self._leader and await self._command("EVAL", _RENEW_SCRIPT, "1", key, self.node_id, str(self.lease_ms)):
+                return True
+            self._leader = await self._command("SET", key, self.node_id, "NX", "PX", str(self.lease_ms)) == "OK"
+        except (ConnectionError, OSError, RuntimeError) as e:
+            logger.warning(f"Backplane leader election failed: {e!r}")
+            self._leader = False
+        return self._leader
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        # Our own subscription delivers the message back to this process
+        self.published += 1
+        await self._command("PUBLISH", self.prefix + channel, data)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[bytes]:
+        self._channels.add(channel)
+        if self._listener is not None:
+            self._listener.send("SUBSCRIBE", self.prefix + channel)
+        async for data in super().subscribe(channel):
+            yield data
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                self._listener = await RESPConnection.open(self.host, self.port, self.db, self.password)
+                for channel in self._channels:
+                    self._listener.send("SUBSCRIBE", self.prefix + channel)
+                while True:
+                    reply = await self._listener.read()
+                    if isinstance(reply, list) and reply and reply[0] == b"message":
+                        channel = reply[1].decode("utf-8")[len(self.prefix):]
+                        self._deliver(channel, reply[2])
+            # RuntimeError is an error reply from the server, e.g. a failed AUTH
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, RuntimeError) as e:
+                logger.warning(f"Backplane subscription lost, reconnecting: {e!r}")
+                if self._listener is not None:
+                    self._listener.close()
+                self._listener = None
+                await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, object]:
+        stats = super().stats()
+        stats["leader"] = self._leader
+        stats["nodeId"] = self.node_id
+        return stats
+
+
+def create_backplane(url: str) -> Backplane:
+    """Build a backplane from a URL; see the module docstring for the schemes."""
+    parsed = urlparse(url)
+    if parsed.scheme in ("", "memory"):
+        return InProcessBackplane()
+    if parsed.scheme in ("local", "unix"):
+        return LocalSocketBackplane(parsed.path or "/tmp/pulsehub-backplane.sock")
+    if parsed.scheme == "redis":
+        return RedisBackplane(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+        )
+    raise ValueError(f"Unsupported backplane URL: {url}")
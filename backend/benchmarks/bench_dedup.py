@@ -0,0 +1,84 @@
+"""Insert/query cost of the near-duplicate index at 100k articles per hour.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dedup [--articles 100000] [--duplicate-ratio 0.3]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from dedup import DuplicateIndex
+
+WORDS = (
+    "government minister election vote market stocks inflation earthquake storm flood "
+    "court ruling police protest talks summit trade tariff energy oil gas climate "
+    "health hospital vaccine outbreak school strike union bank rates growth jobs "
+    "report officials said announced warned rose fell sharply amid after before"
+).split()
+
+
+def make_article(rng: random.Random, i: int) -> dict:
+    return {
+        "id": str(i),
+        "url": f"https://example.com/{i}",
+        "source": rng.choice(["Reuters", "AP News", "BBC", "CNN", "Local News"]),
+        "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))),
+        "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 30))),
+    }
+
+
+def rewrite(rng: random.Random, article: dict, i: int) -> dict:
+    """Another outlet's copy of the same story: new URL, a couple of words changed."""
+    words = article["title"].split()
+    words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return dict(article, id=str(i), url=f"https://other.example.com/{i}", title=" ".join(words))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    stream = []
+    for i in range(args.articles):
+        if stream and rng.random() < args.duplicate_ratio:
+            stream.append(rewrite(rng, rng.choice(stream[-500:]), i))
+        else:
+            stream.append(make_article(rng, i))
+
+    # One hour of traffic, spread evenly; the window keeps all of it
+    interval = 3600 / args.articles
+    index = DuplicateIndex(window_seconds=3600, max_entries=args.articles)
+    latencies = []
+    started = time.perf_counter()
+    for i, article in enumerate(stream):
+        t = time.perf_counter()
+        index.check(article, now=i * interval)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+
+    # Separate pass for memory; tracemalloc would distort the timings above
+    tracemalloc.start()
+    sized = DuplicateIndex(window_seconds=3600, max_entries=args.articles)
+    for i, article in enumerate(stream):
+        sized.check(article, now=i * interval)
+    peak = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    latencies.sort()
+    stats = index.stats()
+    print(f"articles:           {args.articles}")
+    print(f"total time:         {elapsed:.2f}s ({args.articles / elapsed:,.0f} articles/s)")
+    print(f"p50 / p99 per call: {latencies[len(latencies) // 2] * 1e6:.0f}us / "
+          f"{latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us")
+    print(f"index memory:       {peak / 1e6:.1f} MB ({peak / max(len(index), 1):.0f} B/entry)")
+    print(f"unique / exact / near: {stats['unique']} / {stats['exactDuplicates']} / {stats['nearDuplicates']}")
+    print(f"budget used at 100k/hour: {elapsed / 3600:.3%} of one core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Batched vs one-call-per-article enrichment against a stub model.
+
+The stub sleeps ``--latency`` seconds per call, like a remote model would.
+Run from the backend directory:
+
+    python -m benchmarks.bench_enrichment [--articles 500] [--latency 0.5]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from enrichment import Enricher, RateLimiter, offline_model
+from llm import LLMClient
+
+WORDS = (
+    "government minister election market stocks earthquake storm court ruling protest talks summit "
+    "trade energy climate health hospital vaccine research space team tournament success crisis"
+).split()
+
+
+def make_articles(count: int, rng: random.Random) -> list:
+    return [
+        {
+            "title": " ".join(rng.choice(WORDS) for _ in range(10)).capitalize(),
+            "description": " ".join(rng.choice(WORDS) for _ in range(40)).capitalize() + ".",
+        }
+        for _ in range(count)
+    ]
+
+
+async def run(articles: list, latency: float, concurrency: int, **options) -> dict:
+    model = offline_model(latency=latency, seed=7)
+    enricher = Enricher(LLMClient(model, max_concurrency=concurrency, timeout=60),
+                        RateLimiter(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9), **options)
+    started = time.perf_counter()
+    await enricher.enrich(articles)
+    return {**enricher.stats(), "seconds": time.perf_counter() - started}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    single = await run(make_articles(args.articles, rng), args.latency, args.concurrency,
+                       max_output_tokens=80)
+    batched = await run(make_articles(args.articles, rng), args.latency, args.concurrency)
+    for name, stats in (("one per call", single), ("batched", batched)):
+        print(f"{name:13s} {stats['calls']:5d} calls  {stats['articlesPerCall']:6.1f} articles/call  "
+              f"{stats['tokensPerArticle']:6.1f} tokens/article  {stats['seconds']:6.2f}s")
+    print(f"calls saved:   {1 - batched['calls'] / single['calls']:.0%}")
+    print(f"tokens saved:  {1 - batched['tokensPerArticle'] / single['tokensPerArticle']:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""Gazetteer geotagging: Aho-Corasick automaton vs one substring search per name.
+
+The baseline is what newsProcessor.js does: lower-case the text and test
+``name in text`` for every gazetteer name. Run from the backend directory:
+
+    python -m benchmarks.bench_geotag [--names 50000] [--articles 2000]
+"""
+import argparse
+import random
+import time
+
+from countries import COUNTRY_ALIASES, COUNTRY_CODES
+from geotag import Place, build_extractor
+
+SYLLABLES = "ka lo mi ra ton vel sar bu den gar ix ol pen qua ris sto tur un var wen yal zor".split()
+FILLER = (
+    "officials said on Monday that talks would continue after the vote while markets "
+    "rose sharply and residents reported heavy rain and power cuts across the region"
+).split()
+
+
+def synthetic_name(rng: random.Random) -> str:
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 2))]
+    return " ".join(word.capitalize() for word in words)
+
+
+def make_text(rng: random.Random, names: list, length: int) -> str:
+    words = [rng.choice(FILLER) for _ in range(length)]
+    for _ in range(rng.randint(0, 2)):
+        words.insert(rng.randrange(len(words) + 1), rng.choice(names))
+    text = " ".join(words)
+    return text[0].upper() + text[1:]
+
+
+def substring_locate(names: list, text: str):
+    lowered = text.lower()
+    for name in names:
+        if name in lowered:
+            return name
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=50000)
+    parser.add_argument("--articles", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    started = time.perf_counter()
+    extractor = build_extractor(COUNTRY_CODES, COUNTRY_ALIASES)
+    seen = set()
+    while len(extractor) < args.names:
+        name = synthetic_name(rng)
+        if name not in seen:
+            seen.add(name)
+            extractor.add(Place(name, "ZZ", rng.uniform(-180, 180), rng.uniform(-90, 90), "city",
+                                rng.randint(1000, 10 ** 6)))
+    extractor.compile()
+    build = time.perf_counter() - started
+
+    places = [place.name for place in extractor.places]
+    lowered = [name.lower() for name in places]
+    articles = [(make_text(rng, places, 12), make_text(rng, places, 30)) for _ in range(args.articles)]
+
+    started = time.perf_counter()
+    found = extractor.locate_many(articles)
+    automaton = time.perf_counter() - started
+
+    sample = articles[:max(1, args.articles // 20)]
+    started = time.perf_counter()
+    for title, description in sample:
+        substring_locate(lowered, title) or substring_locate(lowered, description)
+    substring = (time.perf_counter() - started) * len(articles) / len(sample)
+
+    print(f"gazetteer names:   {len(extractor)}")
+    print(f"automaton build:   {build:.2f}s")
+    print(f"automaton:         {automaton / len(articles) * 1e6:8.0f}us/article "
+          f"({len(articles) / automaton:,.0f} articles/s)")
+    print(f"substring search:  {substring / len(articles) * 1e6:8.0f}us/article "
+          f"({len(articles) / substring:,.0f} articles/s, from {len(sample)} articles)")
+    print(f"speedup:           {substring / automaton:.0f}x")
+    print(f"geotagged:         {sum(1 for place in found if place)} of {len(articles)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Cost of the instrumentation on the hot path.
+
+Times a histogram observation, a /metrics render, and logging a large
+model response at INFO against the level-gated DEBUG call that replaced it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_metrics [--iterations 200000]
+"""
+import argparse
+import io
+import logging
+import random
+import time
+
+from instrumentation import Gauge, Histogram, Registry
+
+
+def per_call(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+    rng = random.Random(3)
+    values = [rng.expovariate(200) for _ in range(1024)]
+
+    registry = Registry()
+    plain = registry.register(Histogram("plain_seconds", "unlabelled"))
+    labelled = registry.register(Histogram("labelled_seconds", "labelled", labels=("phase",)))
+    for i in range(20):
+        registry.register(Gauge(f"gauge_{i}", "callback gauge", callback=lambda: 42))
+    i = 0
+
+    def observe_plain():
+        nonlocal i
+        i += 1
+        plain.observe(values[i & 1023])
+
+    def observe_labelled():
+        nonlocal i
+        i += 1
+        labelled.observe(values[i & 1023], "llm")
+
+    print(f"observe:             {per_call(observe_plain, args.iterations) * 1e9:6.0f} ns")
+    print(f"observe (labelled):  {per_call(observe_labelled, args.iterations) * 1e9:6.0f} ns")
+    print(f"render /metrics:     {per_call(registry.render, 1000) * 1e6:6.0f} us")
+
+    logger = logging.getLogger("bench")
+    logger.propagate = False
+    logger.addHandler(logging.StreamHandler(io.StringIO()))
+    logger.setLevel(logging.INFO)
+    response = '{"summary": "' + "word " * 400 + '"}'
+    print(f"INFO f-string log:   {per_call(lambda: logger.info(f'Raw response content: {response}'), 20000) * 1e6:6.2f} us")
+    print(f"gated DEBUG log:     {per_call(lambda: logger.debug('Raw response content: %s', response), 20000) * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
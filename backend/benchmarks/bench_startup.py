@@ -0,0 +1,120 @@
+"""Cold start: import time, time to the first health check and first-request latency.
+
+Each run starts a fresh interpreter. "import" times ``import main``, which
+builds the app; "first /" is from spawning ``uvicorn main:app`` to its first
+200. "first /country-info" is the first model call: with the stub provider
+it is the lazy client setup plus the stub, with --provider gemini and a key
+it includes the SDK import and a real call.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup [--runs 5] [--provider stub] [--importtime]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body: dict = None) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def import_seconds(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def serve_once(env: dict) -> dict:
+    """Seconds from spawning uvicorn to the first 200 on /, then to each /country-info answer."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if request(url + "/") == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        result = {"first /": time.perf_counter() - started}
+        for label in ("first /country-info", "second /country-info"):
+            t = time.perf_counter()
+            # A different country each time, so neither is a cache hit
+            status = request(url + "/country-info", {"country": "France" if label.startswith("first") else "Japan"})
+            result[label] = time.perf_counter() - t
+            result["status"] = status
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def report(name: str, samples: list) -> None:
+    print(f"{name:22s} median {statistics.median(samples) * 1e3:8.1f}ms   max {max(samples) * 1e3:8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="stub", help="LLM_PROVIDER for the server")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    args = parser.parse_args()
+
+    env = {**os.environ, "LLM_PROVIDER": args.provider, "COUNTRY_CACHE_PATH": "", "LOG_LEVEL": "WARNING"}
+    imports = [import_seconds(env) for _ in range(args.runs)]
+    report("import main", imports)
+
+    runs = [serve_once(env) for _ in range(args.runs)]
+    for label in ("first /", "first /country-info", "second /country-info"):
+        report(label, [run[label] for run in runs])
+    print(f"/country-info status:  {runs[-1]['status']}")
+
+    if args.importtime:
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                                env=env, capture_output=True, text=True).stderr
+        rows = []
+        for line in stderr.splitlines():
+            parts = line.split("|")
+            # Top-level packages only: their cumulative time includes everything they pull in
+            if len(parts) == 3 and parts[1].strip().isdigit() and parts[2].startswith("   ") \
+                    and not parts[2].startswith("    "):
+                rows.append((int(parts[1]), parts[2].strip()))
+        print("slowest imports (cumulative):")
+        for micros, name in sorted(rows, reverse=True)[:10]:
+            print(f"  {name:30s} {micros / 1e3:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
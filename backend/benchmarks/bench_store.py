@@ -0,0 +1,94 @@
+"""Memory and query latency of the recent-article store.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_store [--articles 100000] [--queries 2000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from store import ArticleStore, SequenceGenerator, records_to_json
+
+COUNTRIES = ["US", "GB", "FR", "DE", "JP", "AU", "BR", "IN", "NG", "ZA", "UA", "CA", "MX", "CN", "KE"]
+CATEGORIES = ["politics", "business", "technology", "science", "health"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+
+def make_articles(count: int, rng: random.Random) -> list:
+    """``count`` articles published over the last 24 hours, oldest first."""
+    now = datetime.now(timezone.utc)
+    next_seq = SequenceGenerator()
+    articles = []
+    for i in range(count):
+        published = now - timedelta(seconds=86400 * (count - i) / count)
+        country = rng.choice(COUNTRIES)
+        articles.append({
+            "id": str(i),
+            "seq": next_seq(),
+            "title": f"Headline number {i} about {country}",
+            "description": "Latest updates about current events, with a little more detail.",
+            "url": f"https://example.com/{i}",
+            "source": rng.choice(["Reuters", "AP News", "BBC", "CNN", "Local News"]),
+            "sourceType": rng.choice(["big_media", "government", "local_media", "social_media"]),
+            "sentiment": rng.choice(SENTIMENTS),
+            "category": rng.choice(CATEGORIES),
+            "publishedAt": published.isoformat(),
+            "countryCode": country,
+            "location": {"name": country, "coordinates": [rng.uniform(-180, 180), rng.uniform(-90, 90)]},
+        })
+    return articles
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return (f"p50 {samples[len(samples) // 2] * 1e6:7.0f}us   "
+            f"p99 {samples[int(len(samples) * 0.99)] * 1e6:7.0f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    articles = make_articles(args.articles, rng)
+
+    tracemalloc.start()
+    store = ArticleStore(capacity=args.articles)
+    started = time.perf_counter()
+    store.extend(articles)
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"articles:       {len(store)}")
+    print(f"insert:         {elapsed:.2f}s with tracemalloc ({args.articles / elapsed:,.0f} articles/s)")
+    print(f"store memory:   {memory / 1e6:.1f} MB ({memory / len(store):.0f} B/article)")
+
+    last_hour = datetime.now(timezone.utc).timestamp() - 3600
+    seqs = [a["seq"] for a in articles]
+    scenarios = {
+        "latest 50": lambda: store.query(limit=50),
+        "country": lambda: store.query(country=rng.choice(COUNTRIES), limit=100),
+        "country+category": lambda: store.query(
+            country=rng.choice(COUNTRIES), category=rng.choice(CATEGORIES), limit=100),
+        "country+sentiment, last hour": lambda: store.query(
+            country=rng.choice(COUNTRIES), sentiment=rng.choice(SENTIMENTS), since=last_hour, limit=100),
+        "page (cursor)": lambda: store.query(category=rng.choice(CATEGORIES), before=rng.choice(seqs), limit=100),
+        "resume 500 behind": lambda: store.query(after=seqs[-500], limit=1000),
+        "latest 100 to JSON": lambda: records_to_json(store.query(limit=100)),
+    }
+    for name, query in scenarios.items():
+        samples = []
+        for _ in range(args.queries):
+            t = time.perf_counter()
+            query()
+            samples.append(time.perf_counter() - t)
+        print(f"{name:30s} {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Viewport clustering latency at a million stored points.
+
+Points sit mostly on gazetteer cities (geotagged articles share their
+city's coordinates), the rest anywhere. Each query is a 1280x800 px
+viewport around a random city, answered tile by tile as /articles/viewport
+does, with the tile cache off. A full scan of every point is timed for
+comparison.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_viewport [--points 1000000] [--queries 300]
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import time
+
+from geotag import DATA_DIR, load_cities
+from viewport import TileCache, ViewportIndex, project, tiles_for_bbox, unproject
+
+CATEGORIES = ["politics", "business", "technology", "science", "health", "sports", "general"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+VIEWPORT_PX = (1280, 800)
+
+
+class Record:
+    """Just the ArticleRecord fields the index reads, to keep a million of them cheap."""
+
+    __slots__ = ("seq", "category", "sentiment", "lon", "lat")
+
+    def __init__(self, seq, category, sentiment, lon, lat):
+        self.seq = seq
+        self.category = category
+        self.sentiment = sentiment
+        self.lon = lon
+        self.lat = lat
+
+    def article(self):
+        return {"seq": self.seq, "category": self.category, "sentiment": self.sentiment,
+                "location": {"coordinates": [self.lon, self.lat]}}
+
+
+def make_points(count: int, cities: list, rng: random.Random) -> list:
+    points = []
+    for seq in range(count):
+        if rng.random() < 0.8:
+            lon, lat = rng.choice(cities)
+        else:
+            lon, lat = rng.uniform(-180, 180), rng.uniform(-60, 75)
+        points.append(Record(seq, rng.choice(CATEGORIES), rng.choice(SENTIMENTS), lon, lat))
+    return points
+
+
+def viewport(lon: float, lat: float, zoom: int) -> tuple:
+    """bbox of a VIEWPORT_PX map centred on (lon, lat)."""
+    world = 256 * (1 << zoom)
+    half_width = VIEWPORT_PX[0] / 2 / world
+    half_height = VIEWPORT_PX[1] / 2 / world
+    _, y = project(lon, lat)
+    _, north = unproject(0, max(0.0, y - half_height))
+    _, south = unproject(0, min(1.0, y + half_height))
+    if half_width >= 0.5:
+        return -180.0, south, 180.0, north
+    wrap = lambda value: (value + 180) % 360 - 180
+    return wrap(lon - 360 * half_width), south, wrap(lon + 360 * half_width), north
+
+
+def query(index: ViewportIndex, bbox: tuple, zoom: int, filters: tuple) -> int:
+    results = [index.tile(zoom, x, y, *filters) for x, y in tiles_for_bbox(bbox, zoom, max_tiles=256)]
+    return sum(len(r["clusters"]) + len(r["articles"]) for r in results)
+
+
+def scan(points: list, bbox: tuple, zoom: int) -> int:
+    """Cluster by brute force: every point, every query."""
+    west, south, east, north = bbox
+    size = 1 << (zoom + 3)
+    cells = {}
+    for p in points:
+        if south <= p.lat <= north and (west <= p.lon <= east if west <= east else p.lon >= west or p.lon <= east):
+            x, y = project(p.lon, p.lat)
+            key = (int(x * size), int(y * size))
+            cells[key] = cells.get(key, 0) + 1
+    return len(cells)
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    return (f"p50 {samples[len(samples) // 2] * 1e3:8.2f}ms   "
+            f"p99 {samples[int(len(samples) * 0.99)] * 1e3:8.2f}ms")
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--max-level", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    cities = [(place.lon, place.lat) for place, _ in load_cities(os.path.join(DATA_DIR, "cities.csv"))]
+    points = make_points(args.points, cities, rng)
+
+    before = rss_mb()
+    index = ViewportIndex(max_level=args.max_level)
+    started = time.perf_counter()
+    for point in points:
+        index.add(point)
+    elapsed = time.perf_counter() - started
+    print(f"points:      {len(index):,}  ({index.stats()['cells']:,} cells, {index.stats()['groups']:,} groups)")
+    print(f"insert:      {elapsed:.1f}s ({len(index) / elapsed:,.0f} points/s)")
+    print(f"index RSS:   ~{rss_mb() - before:.0f} MB")
+
+    bands = {"zoom 0-4": range(0, 5), "zoom 5-8": range(5, 9), "zoom 9-11": range(9, 12), "zoom 12-16": range(12, 17)}
+    filters = {
+        "no filter": (None, None),
+        "category+sentiment": (frozenset(["politics", "health"]), frozenset(["negative"])),
+    }
+    all_samples = []
+    for band, zooms in bands.items():
+        for name, chosen in filters.items():
+            samples = []
+            for _ in range(args.queries):
+                zoom = rng.choice(zooms)
+                lon, lat = rng.choice(cities)
+                bbox = viewport(lon, lat, zoom)
+                t = time.perf_counter()
+                query(index, bbox, zoom, chosen)
+                samples.append(time.perf_counter() - t)
+            all_samples.extend(samples)
+            print(f"{band:11s} {name:20s} {percentiles(samples)}")
+    print(f"{'all':11s} {'':20s} {percentiles(all_samples)}")
+
+    # Clients panning around the same areas mostly hit the tile cache
+    cache = TileCache(index, ttl=60)
+
+    async def cached() -> list:
+        samples = []
+        for _ in range(args.queries * 4):
+            zoom = rng.choice(range(2, 12))
+            lon, lat = rng.choice(cities[:20])
+            bbox = viewport(lon, lat, zoom)
+            t = time.perf_counter()
+            await asyncio.gather(*(cache.get(zoom, x, y) for x, y in tiles_for_bbox(bbox, zoom, max_tiles=256)))
+            samples.append(time.perf_counter() - t)
+        return samples
+
+    samples = asyncio.run(cached())
+    print(f"{'cached':11s} {'20 busiest cities':20s} {percentiles(samples)}   hit rate {cache.stats()['hitRate']:.0%}")
+
+    lon, lat = cities[0]
+    bbox = viewport(lon, lat, 3)
+    t = time.perf_counter()
+    scan(points, bbox, 3)
+    print(f"full scan, zoom 3 viewport: {(time.perf_counter() - t) * 1e3:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
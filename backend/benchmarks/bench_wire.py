@@ -0,0 +1,113 @@
+"""Compare article batch encodings: payload size and encode time.
+
+Every format is first checked to decode to the same articles as plain JSON.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_wire
+"""
+import json
+import random
+import sys
+import time
+import zlib
+from datetime import datetime
+
+from wire import (COLUMNAR, JSON, MSGPACK, available_compressions, available_formats, decode_articles,
+                  encode_articles)
+
+LOCATIONS = [
+    {"name": "New York", "coordinates": [-74.006, 40.7128]},
+    {"name": "London", "coordinates": [-0.1276, 51.5074]},
+    {"name": "Tokyo", "coordinates": [139.6917, 35.6895]},
+    {"name": "Sydney", "coordinates": [151.2093, -33.8688]},
+    {"name": "Paris", "coordinates": [2.3522, 48.8566]},
+]
+
+
+def sample_article(rng: random.Random) -> dict:
+    """Same shape and value distribution as main.generate_news_article()."""
+    location = rng.choice(LOCATIONS)
+    return {
+        "id": str(rng.randint(1000, 9999)),
+        "title": f"Breaking News from {location['name']}",
+        "description": f"Latest updates from {location['name']} about current events.",
+        "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+        "url": "https://example.com/news",
+        "source": rng.choice(["Reuters", "AP News", "BBC", "CNN", "Local News"]),
+        "sourceType": rng.choice(["big_media", "government", "local_media", "social_media"]),
+        "sentiment": rng.choice(["positive", "neutral", "negative"]),
+        "category": rng.choice(["politics", "business", "technology", "science", "health"]),
+        "publishedAt": datetime.now().isoformat(),
+        "location": location,
+    }
+
+
+def article_shapes(rng: random.Random) -> list:
+    """One article of each shape the pipeline produces."""
+    plain = sample_article(rng)
+    enriched = dict(sample_article(rng), seq=1792289244863985, summary="Markets rose.", enrichedBy="llm")
+    lagos = {"name": "Lagos", "countryCode": "NG", "coordinates": [3.3792, 6.5244]}
+    geotagged = dict(sample_article(rng), location=lagos)
+    ungeotagged = dict(sample_article(rng), location=None)
+    no_coordinates = dict(sample_article(rng), location={"name": "Somewhere"})
+    sparse = {"id": "1", "title": "Only a title", "url": "https://example.com/1"}
+    return [plain, enriched, geotagged, ungeotagged, no_coordinates, sparse]
+
+
+def round_trip_failures(articles: list) -> list:
+    """Formats whose decoded articles differ from the JSON encoding's."""
+    message = {"type": "articles", "articles": articles}
+    expected = json.loads(encode_articles(message, JSON))
+    failures = []
+    for wire_format in available_formats():
+        compressions = [None] + (available_compressions() if wire_format == MSGPACK else [])
+        for compression in compressions:
+            if decode_articles(encode_articles(message, wire_format, compression)) != expected:
+                failures.append(f"{wire_format}+{compression}" if compression else wire_format)
+    return failures
+
+
+def send_json_baseline(message: dict) -> str:
+    # What starlette's WebSocket.send_json does before sending
+    return json.dumps(message, separators=(",", ":"))
+
+
+def measure(encode, message: dict, repeat: int):
+    payload = encode(message)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(message)
+    elapsed = (time.perf_counter() - start) / repeat
+    raw = payload.encode("utf-8") if isinstance(payload, str) else payload
+    return len(raw), len(zlib.compress(raw)), elapsed
+
+
+def main() -> None:
+    rng = random.Random(42)
+    failures = round_trip_failures(article_shapes(rng))
+    if failures:
+        print(f"round trip differs from JSON for: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"round trip matches JSON for: {', '.join(available_formats())}")
+
+    encoders = {"send_json": send_json_baseline}
+    for wire_format in available_formats():
+        encoders[wire_format] = lambda m, f=wire_format: encode_articles(m, f)
+    if MSGPACK in available_formats():
+        for compression in available_compressions():
+            encoders[f"{MSGPACK}+{compression}"] = lambda m, c=compression: encode_articles(m, MSGPACK, c)
+
+    print(f"{'batch':>6} {'encoding':<14} {'bytes':>10} {'deflated':>10} {'encode ms':>10} {'vs send_json':>12}")
+    for size in (1, 100, 10000):
+        message = {"type": "articles", "articles": [sample_article(rng) for _ in range(size)]}
+        repeat = max(3, 2000 // size)
+        baseline = None
+        for name, encode in encoders.items():
+            raw, deflated, elapsed = measure(encode, message, repeat)
+            baseline = baseline or raw
+            print(f"{size:>6} {name:<14} {raw:>10} {deflated:>10} {elapsed * 1000:>10.3f} {raw / baseline:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""Load test for WebSocket fan-out and /country-info, with JSON results and a baseline check.
+
+The app runs under uvicorn in a child process with the stub model
+provider (LLM_PROVIDER=stub), in this process with --in-process, or
+wherever --url points. Three phases:
+
+1. fan-out: --clients WebSocket clients, --slow-share of them reading one
+   message every --slow-delay seconds, while the sample feed publishes
+   --feed-batch articles every --feed-interval seconds. Delivery latency is
+   receive time minus the article's seq, which is its publish time in
+   microseconds on the same host clock.
+2. country-info hot: --country-requests requests for a few countries,
+   loaded into the cache beforehand, at --concurrency.
+3. country-info cold: --cold-requests unknown names, each a stub model call.
+
+Server event loop lag for each phase comes from the
+pulsehub_event_loop_lag_seconds histogram on /metrics.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest [--clients 2000] [--duration 20] [--output results.json]
+    python -m benchmarks.loadtest --baseline results.json   # exit status 1 on a regression
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SEQ = re.compile(r'"seq":(\d+)')
+_SAMPLE = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+HOT_COUNTRIES = ["germany", "france", "japan", "brazil", "india", "kenya", "canada", "mexico",
+                 "italy", "spain", "egypt", "china", "peru", "chile", "norway", "poland"]
+
+# (result path, higher is better, values below this never count as a regression)
+CHECKS = [
+    ("websocket.latencyMs.p50", False, 5.0),
+    ("websocket.latencyMs.p99", False, 10.0),
+    ("websocket.latencyMs.p999", False, 20.0),
+    ("websocket.messagesPerSecond", True, 0.0),
+    ("server.rssMb", False, 0.0),
+    ("countryInfo.hot.requestsPerSecond", True, 0.0),
+    ("countryInfo.hot.latencyMs.p99", False, 10.0),
+    ("countryInfo.cold.requestsPerSecond", True, 0.0),
+    ("eventLoop.fanout.stallSeconds", False, 0.05),
+    ("eventLoop.countryInfoHot.stallSeconds", False, 0.05),
+    ("eventLoop.countryInfoCold.stallSeconds", False, 0.05),
+]
+
+
+def percentiles(samples) -> Dict[str, Optional[float]]:
+    """p50/p99/p999/max in milliseconds of samples given in milliseconds."""
+    if not len(samples):
+        return {"p50": None, "p99": None, "p999": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+    return {"p50": pick(0.5), "p99": pick(0.99), "p999": pick(0.999), "max": round(ordered[-1], 2)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(args) -> Dict[str, str]:
+    return {
+        "SAMPLE_BATCH_SIZE": str(args.feed_batch),
+        "SAMPLE_INTERVAL": str(args.feed_interval),
+        "COUNTRY_CACHE_PATH": "",
+        "LOG_LEVEL": "WARNING",
+        "LLM_PROVIDER": "stub",
+        "LLM_STUB_LATENCY": str(args.stub_latency),
+    }
+
+
+class Server:
+    """The app under test: a child uvicorn process, a thread in this process, or a URL."""
+
+    def __init__(self, args):
+        self.args = args
+        self.url = args.url.rstrip("/") if args.url else None
+        self.pid: Optional[int] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._uvicorn = None
+        self._thread: Optional[threading.Thread] = None
+        self._log = None
+
+    def start(self) -> None:
+        if self.url:
+            return
+        port = free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        if self.args.in_process:
+            import uvicorn
+            from main import create_app
+            from settings import Settings
+            app = create_app(Settings({**os.environ, **server_env(self.args)}))
+            self._uvicorn = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+            self._thread = threading.Thread(target=self._uvicorn.run, daemon=True)
+            self._thread.start()
+            self.pid = os.getpid()
+        else:
+            self._log = tempfile.NamedTemporaryFile(prefix="loadtest-server-", suffix=".log", delete=False)
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:create_app", "--factory", "--host", "127.0.0.1",
+                 "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env={**os.environ, **server_env(self.args)},
+                stdout=self._log, stderr=subprocess.STDOUT,
+            )
+            self.pid = self._process.pid
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self._process is not None and self._process.poll() is not None:
+                break
+            try:
+                if httpx.get(self.url + "/", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"server did not start; see {self._log.name if self._log else 'its output'}")
+
+    def peak_rss_mb(self) -> Optional[float]:
+        """High-water RSS from /proc, if the server runs on this host."""
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except (OSError, TypeError):
+            pass
+        return None
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._uvicorn is not None:
+            self._uvicorn.should_exit = True
+            self._thread.join(timeout=10)
+
+
+def parse_metrics(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    samples: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match is None or line.startswith("#"):
+            continue
+        name, labels, value = match.groups()
+        samples.setdefault(name, []).append((dict(_LABEL.findall(labels or "")), float(value)))
+    return samples
+
+
+def metric_value(metrics: Dict, name: str) -> Optional[float]:
+    values = metrics.get(name)
+    return values[0][1] if values else None
+
+
+def loop_lag(before: Dict, after: Dict) -> Dict[str, Any]:
+    """Event loop lag during a phase, from the difference of two lag histogram scrapes."""
+    name = "pulsehub_event_loop_lag_seconds"
+    old = {labels["le"]: value for labels, value in before.get(name + "_bucket", ())}
+    buckets = [(float(labels["le"]), value - old.get(labels["le"], 0))
+               for labels, value in after.get(name + "_bucket", ())]
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return {"samples": 0, "stallSeconds": None, "lagP99Ms": None, "lagMaxMs": None}
+
+    def bound(q: float) -> Optional[float]:
+        for le, cumulative in buckets:
+            if cumulative >= q * total:
+                return None if le == float("inf") else round(le * 1000, 1)
+        return None
+
+    highest = next((le for le, cumulative in buckets if cumulative >= total), float("inf"))
+    return {
+        "samples": int(total),
+        # Total time the loop ran late: how long it was unavailable to other work
+        "stallSeconds": round((metric_value(after, name + "_sum") or 0) - (metric_value(before, name + "_sum") or 0), 4),
+        "lagP99Ms": bound(0.99),
+        # Upper bound of the bucket holding the worst sample
+        "lagMaxMs": None if highest == float("inf") else round(highest * 1000, 1),
+    }
+
+
+async def scrape(http: httpx.AsyncClient) -> Dict:
+    try:
+        response = await http.get("/metrics")
+        return parse_metrics(response.text) if response.status_code == 200 else {}
+    except httpx.HTTPError:
+        return {}
+
+
+async def run_clients(ws_url: str, count: int, slow: int, slow_delay: float, duration: float,
+                      connect_concurrency: int) -> Dict[str, Any]:
+    """``count`` WebSocket clients, the first ``slow`` of them slow; runs in one process."""
+    result = {"connected": 0, "failed": 0, "evicted": 0, "closed": 0, "messages": 0, "articles": 0,
+              "slowMessages": 0}
+    latencies = array("d")
+    slow_latencies = array("d")
+    handshakes = asyncio.Semaphore(connect_concurrency)
+    ready = asyncio.Event()
+    window: Dict[str, float] = {}
+
+    async def client(is_slow: bool) -> None:
+        try:
+            async with handshakes:
+                # A slow reader's small queue makes it push back on the server sooner
+                ws = await websockets.connect(ws_url, max_queue=4 if is_slow else 64, ping_interval=None,
+                                              open_timeout=60, close_timeout=1)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+            result["failed"] += 1
+            return
+        result["connected"] += 1
+        try:
+            await ready.wait()
+            while True:
+                remaining = window["end"] - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(ws.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                received_us = time.time_ns() // 1000
+                if not isinstance(message, str) or '"replay":true' in message[:64]:
+                    continue
+                match = _SEQ.search(message)
+                if match is None or int(match.group(1)) < window["start_us"]:
+                    continue
+                latency = (received_us - int(match.group(1))) / 1000
+                if is_slow:
+                    slow_latencies.append(latency)
+                    result["slowMessages"] += 1
+                    await asyncio.sleep(slow_delay)
+                else:
+                    latencies.append(latency)
+                    result["messages"] += 1
+                    result["articles"] += message.count('"seq":')
+        except websockets.ConnectionClosed as e:
+            # 1013: the server evicted a client that fell too far behind
+            result["evicted" if e.code == 1013 else "closed"] += 1
+        finally:
+            await ws.close()
+
+    tasks = [asyncio.create_task(client(i < slow)) for i in range(count)]
+    # Measure only once everyone is connected; earlier messages are ignored
+    while result["connected"] + result["failed"] < count:
+        await asyncio.sleep(0.05)
+    window["start_us"] = time.time_ns() // 1000
+    window["end"] = time.time() + duration
+    ready.set()
+    await asyncio.gather(*tasks)
+    result["latencies"] = latencies
+    result["slowLatencies"] = slow_latencies
+    return result
+
+
+def _client_process(arguments: tuple) -> Dict[str, Any]:
+    return asyncio.run(run_clients(*arguments))
+
+
+async def fanout_phase(server: Server, args, http: httpx.AsyncClient) -> Tuple[Dict[str, Any], Dict]:
+    ws_url = server.url.replace("http", "ws", 1) + "/ws"
+    slow = int(args.clients * args.slow_share)
+    processes = max(1, args.client_processes)
+    shares = [(args.clients // processes + (i < args.clients % processes),
+               slow // processes + (i < slow % processes)) for i in range(processes)]
+    before = await scrape(http)
+    started = time.monotonic()
+    if processes == 1:
+        parts = [await run_clients(ws_url, args.clients, slow, args.slow_delay, args.duration,
+                                   args.connect_concurrency)]
+    else:
+        loop = asyncio.get_running_loop()
+        with multiprocessing.Pool(processes) as pool:
+            parts = await loop.run_in_executor(None, pool.map, _client_process, [
+                (ws_url, count, slow_count, args.slow_delay, args.duration, args.connect_concurrency)
+                for count, slow_count in shares
+            ])
+    elapsed = time.monotonic() - started
+    after = await scrape(http)
+
+    total = {key: sum(part[key] for part in parts) for key in parts[0] if not key.endswith("atencies")}
+    latencies = array("d")
+    slow_latencies = array("d")
+    for part in parts:
+        latencies.extend(part["latencies"])
+        slow_latencies.extend(part["slowLatencies"])
+    ws_stats = {}
+    try:
+        ws_stats = (await http.get("/ws/stats")).json()
+    except (httpx.HTTPError, ValueError):
+        pass
+    return {
+        "clients": args.clients,
+        "slowClients": slow,
+        "connected": total["connected"],
+        "connectFailures": total["failed"],
+        "evicted": total["evicted"],
+        "closedByServer": total["closed"],
+        "phaseSeconds": round(elapsed, 1),
+        "messages": total["messages"],
+        "articles": total["articles"],
+        "messagesPerSecond": round(total["messages"] / args.duration, 1),
+        "articlesPerSecond": round(total["articles"] / args.duration, 1),
+        "latencyMs": percentiles(latencies),
+        "slowLatencyMs": percentiles(slow_latencies),
+        "serverClientsEvicted": ws_stats.get("clientsEvicted"),
+    }, loop_lag(before, after)
+
+
+async def country_phase(http: httpx.AsyncClient, names, requests: int, concurrency: int) -> Tuple[Dict, Dict]:
+    latencies = array("d")
+    statuses: Dict[str, int] = {}
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        for i in pending:
+            started = time.perf_counter()
+            try:
+                response = await http.post("/country-info", json={"country": names(i)})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    before = await scrape(http)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await scrape(http)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "errors": requests - statuses.get("200", 0),
+        "requestsPerSecond": round(requests / elapsed, 1),
+        "latencyMs": percentiles(latencies),
+    }, loop_lag(before, after)
+
+
+def lookup(results: Dict, path: str) -> Optional[float]:
+    value: Any = results
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[Dict[str, Any]]:
+    """Each checked metric against the baseline; ``regression`` when worse by more than ``tolerance``."""
+    rows = []
+    for path, higher_is_better, floor in CHECKS:
+        new, old = lookup(results, path), lookup(baseline, path)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": path,
+            "baseline": old,
+            "current": new,
+            "change": round(change, 3),
+            "regression": worse > tolerance and (higher_is_better or new > floor),
+        })
+    return rows
+
+
+async def run(args) -> Dict[str, Any]:
+    server = Server(args)
+    server.start()
+    try:
+        async with httpx.AsyncClient(
+            base_url=server.url, timeout=120,
+            limits=httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4),
+        ) as http:
+            print(f"fan-out: {args.clients} clients for {args.duration}s against {server.url}", file=sys.stderr)
+            websocket, fanout_lag = await fanout_phase(server, args, http)
+            rss = metric_value(await scrape(http), "process_resident_memory_bytes")
+
+            print(f"country-info: {args.country_requests} hot, {args.cold_requests} cold requests", file=sys.stderr)
+            # Load the hot set once so that phase measures cache hits only
+            await asyncio.gather(*(http.post("/country-info", json={"country": name}) for name in HOT_COUNTRIES))
+            hot, hot_lag = await country_phase(
+                http, lambda i: HOT_COUNTRIES[i % len(HOT_COUNTRIES)], args.country_requests, args.concurrency)
+            cold, cold_lag = await country_phase(
+                http, lambda i: f"Atlantis {i}", args.cold_requests, args.concurrency)
+    finally:
+        peak = server.peak_rss_mb()
+        server.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "server": "url" if args.url else "in-process" if args.in_process else "uvicorn",
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        },
+        "websocket": websocket,
+        "countryInfo": {"hot": hot, "cold": cold},
+        "eventLoop": {"fanout": fanout_lag, "countryInfoHot": hot_lag, "countryInfoCold": cold_lag},
+        "server": {"rssMb": round(rss / 2 ** 20, 1) if rss else None, "peakRssMb": peak},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--in-process", action="store_true", help="run the server in a thread of this process")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="seconds per stub model call")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    parser.add_argument("--client-processes", type=int, default=1)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--feed-batch", type=int, default=10)
+    parser.add_argument("--feed-interval", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--country-requests", type=int, default=5000)
+    parser.add_argument("--cold-requests", type=int, default=200)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        regressions = sum(row["regression"] for row in rows)
+        results["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance,
+                                 "regressions": regressions, "metrics": rows}
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:40s} {row['baseline']:>10} -> {row['current']:>10} "
+                  f"({row['change']:+.1%}) {flag}", file=sys.stderr)
+
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
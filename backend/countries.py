@@ -0,0 +1,372 @@
+import bisect
+import difflib
+import functools
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Country codes mapping with native names
+COUNTRY_CODES = {
+    # Europe
+    "France": {"code": "FR", "english": "France", "native": "France"},
+    "Deutschland": {"code": "DE", "english": "Germany", "native": "Deutschland"},
+    "Germany": {"code": "DE", "english": "Germany", "native": "Deutschland"},
+    "España": {"code": "ES", "english": "Spain", "native": "España"},
+    "Spain": {"code": "ES", "english": "Spain", "native": "España"},
+    "Italia": {"code": "IT", "english": "Italy", "native": "Italia"},
+    "Italy": {"code": "IT", "english": "Italy", "native": "Italia"},
+    "United Kingdom": {"code": "GB", "english": "United Kingdom", "native": "United Kingdom"},
+    "Great Britain": {"code": "GB", "english": "United Kingdom", "native": "United Kingdom"},
+    "Portugal": {"code": "PT", "english": "Portugal", "native": "Portugal"},
+    "Nederland": {"code": "NL", "english": "Netherlands", "native": "Nederland"},
+    "Netherlands": {"code": "NL", "english": "Netherlands", "native": "Nederland"},
+    "Polska": {"code": "PL", "english": "Poland", "native": "Polska"},
+    "Poland": {"code": "PL", "english": "Poland", "native": "Polska"},
+    "Sverige": {"code": "SE", "english": "Sweden", "native": "Sverige"},
+    "Sweden": {"code": "SE", "english": "Sweden", "native": "Sverige"},
+    "Norge": {"code": "NO", "english": "Norway", "native": "Norge"},
+    "Norway": {"code": "NO", "english": "Norway", "native": "Norge"},
+    "Slovensko": {"code": "SK", "english": "Slovakia", "native": "Slovensko"},
+    "Slovakia": {"code": "SK", "english": "Slovakia", "native": "Slovensko"},
+    "België": {"code": "BE", "english": "Belgium", "native": "België"},
+    "Belgium": {"code": "BE", "english": "Belgium", "native": "België"},
+    "Belgique": {"code": "BE", "english": "Belgium", "native": "België"},
+    "Україна": {"code": "UA", "english": "Ukraine", "native": "Україна"},
+    "Ukraine": {"code": "UA", "english": "Ukraine", "native": "Україна"},
+    "Беларусь": {"code": "BY", "english": "Belarus", "native": "Беларусь"},
+    "Belarus": {"code": "BY", "english": "Belarus", "native": "Беларусь"},
+    "România": {"code": "RO", "english": "Romania", "native": "România"},
+    "Romania": {"code": "RO", "english": "Romania", "native": "România"},
+    "България": {"code": "BG", "english": "Bulgaria", "native": "България"},
+    "Bulgaria": {"code": "BG", "english": "Bulgaria", "native": "България"},
+    "Ελλάδα": {"code": "GR", "english": "Greece", "native": "Ελλάδα"},
+    "Greece": {"code": "GR", "english": "Greece", "native": "Ελλάδα"},
+    "Suomi": {"code": "FI", "english": "Finland", "native": "Suomi"},
+    "Finland": {"code": "FI", "english": "Finland", "native": "Suomi"},
+    "Danmark": {"code": "DK", "english": "Denmark", "native": "Danmark"},
+    "Denmark": {"code": "DK", "english": "Denmark", "native": "Danmark"},
+    "Österreich": {"code": "AT", "english": "Austria", "native": "Österreich"},
+    "Austria": {"code": "AT", "english": "Austria", "native": "Österreich"},
+    "Schweiz": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
+    "Switzerland": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
+    "Suisse": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
+    "Ireland": {"code": "IE", "english": "Ireland", "native": "Ireland"},
+    "Éire": {"code": "IE", "english": "Ireland", "native": "Éire"},
+    "Česko": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
+    "Czech Republic": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
+    "Česká republika": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
+    "Magyarország": {"code": "HU", "english": "Hungary", "native": "Magyarország"},
+    "Hungary": {"code": "HU", "english": "Hungary", "native": "Magyarország"},
+    "Slovenija": {"code": "SI", "english": "Slovenia", "native": "Slovenija"},
+    "Slovenia": {"code": "SI", "english": "Slovenia", "native": "Slovenija"},
+    "Hrvatska": {"code": "HR", "english": "Croatia", "native": "Hrvatska"},
+    "Croatia": {"code": "HR", "english": "Croatia", "native": "Hrvatska"},
+    "Србија": {"code": "RS", "english": "Serbia", "native": "Србија"},
+    "Serbia": {"code": "RS", "english": "Serbia", "native": "Србија"},
+    "Црна Гора": {"code": "ME", "english": "Montenegro", "native": "Црна Гора"},
+    "Montenegro": {"code": "ME", "english": "Montenegro", "native": "Црна Гора"},
+    "Северна Македонија": {"code": "MK", "english": "North Macedonia", "native": "Северна Македонија"},
+    "North Macedonia": {"code": "MK", "english": "North Macedonia", "native": "Северна Македонија"},
+    "Albania": {"code": "AL", "english": "Albania", "native": "Shqipëria"},
+    "Shqipëria": {"code": "AL", "english": "Albania", "native": "Shqipëria"},
+    "Moldova": {"code": "MD", "english": "Moldova", "native": "Moldova"},
+    "Latvija": {"code": "LV", "english": "Latvia", "native": "Latvija"},
+    "Latvia": {"code": "LV", "english": "Latvia", "native": "Latvija"},
+    "Eesti": {"code": "EE", "english": "Estonia", "native": "Eesti"},
+    "Estonia": {"code": "EE", "english": "Estonia", "native": "Eesti"},
+    "Lietuva": {"code": "LT", "english": "Lithuania", "native": "Lietuva"},
+    "Lithuania": {"code": "LT", "english": "Lithuania", "native": "Lietuva"},
+    "Iceland": {"code": "IS", "english": "Iceland", "native": "Ísland"},
+    "Ísland": {"code": "IS", "english": "Iceland", "native": "Ísland"},
+    
+    # Asia
+    "中国": {"code": "CN", "english": "China", "native": "中国"},
+    "China": {"code": "CN", "english": "China", "native": "中国"},
+    "日本": {"code": "JP", "english": "Japan", "native": "日本"},
+    "Japan": {"code": "JP", "english": "Japan", "native": "日本"},
+    "대한민국": {"code": "KR", "english": "South Korea", "native": "대한민국"},
+    "South Korea": {"code": "KR", "english": "South Korea", "native": "대한민국"},
+    "Korea": {"code": "KR", "english": "South Korea", "native": "대한민국"},
+    "조선민주주의인민공화국": {"code": "KP", "english": "North Korea", "native": "조선민주주의인민공화국"},
+    "North Korea": {"code": "KP", "english": "North Korea", "native": "조선민주주의인민공화국"},
+    "भारत": {"code": "IN", "english": "India", "native": "भारत"},
+    "India": {"code": "IN", "english": "India", "native": "भारत"},
+    "Indonesia": {"code": "ID", "english": "Indonesia", "native": "Indonesia"},
+    "Vietnam": {"code": "VN", "english": "Vietnam", "native": "Việt Nam"},
+    "Việt Nam": {"code": "VN", "english": "Vietnam", "native": "Việt Nam"},
+    "Thailand": {"code": "TH", "english": "Thailand", "native": "ประเทศไทย"},
+    "ประเทศไทย": {"code": "TH", "english": "Thailand", "native": "ประเทศไทย"},
+    "Malaysia": {"code": "MY", "english": "Malaysia", "native": "Malaysia"},
+    "Philippines": {"code": "PH", "english": "Philippines", "native": "Philippines"},
+    "Pilipinas": {"code": "PH", "english": "Philippines", "native": "Pilipinas"},
+    "Singapore": {"code": "SG", "english": "Singapore", "native": "Singapore"},
+    "Pakistan": {"code": "PK", "english": "Pakistan", "native": "پاکستان"},
+    "Bangladesh": {"code": "BD", "english": "Bangladesh", "native": "বাংলাদেশ"},
+    "Sri Lanka": {"code": "LK", "english": "Sri Lanka", "native": "ශ්‍රී ලංකා"},
+    "Myanmar": {"code": "MM", "english": "Myanmar", "native": "မြန်မာ"},
+    "Cambodia": {"code": "KH", "english": "Cambodia", "native": "កម្ពុជា"},
+    "Laos": {"code": "LA", "english": "Laos", "native": "ລາວ"},
+    "Mongolia": {"code": "MN", "english": "Mongolia", "native": "Монгол"},
+    "Taiwan": {"code": "TW", "english": "Taiwan", "native": "臺灣"},
+    "臺灣": {"code": "TW", "english": "Taiwan", "native": "臺灣"},
+    "Kazakhstan": {"code": "KZ", "english": "Kazakhstan", "native": "Қазақстан"},
+    "Қазақстан": {"code": "KZ", "english": "Kazakhstan", "native": "Қазақстан"},
+    "Uzbekistan": {"code": "UZ", "english": "Uzbekistan", "native": "O'zbekiston"},
+    "O'zbekiston": {"code": "UZ", "english": "Uzbekistan", "native": "O'zbekiston"},
+    "Kyrgyzstan": {"code": "KG", "english": "Kyrgyzstan", "native": "Кыргызстан"},
+    "Кыргызстан": {"code": "KG", "english": "Kyrgyzstan", "native": "Кыргызстан"},
+    "Tajikistan": {"code": "TJ", "english": "Tajikistan", "native": "Тоҷикистон"},
+    "Тоҷикистон": {"code": "TJ", "english": "Tajikistan", "native": "Тоҷикистон"},
+    "Turkmenistan": {"code": "TM", "english": "Turkmenistan", "native": "Türkmenistan"},
+    "Türkmenistan": {"code": "TM", "english": "Turkmenistan", "native": "Türkmenistan"},
+    
+    # Americas
+    "United States": {"code": "US", "english": "United States", "native": "United States"},
+    "USA": {"code": "US", "english": "United States", "native": "United States"},
+    "Canada": {"code": "CA", "english": "Canada", "native": "Canada"},
+    "Brasil": {"code": "BR", "english": "Brazil", "native": "Brasil"},
+    "Brazil": {"code": "BR", "english": "Brazil", "native": "Brasil"},
+    "México": {"code": "MX", "english": "Mexico", "native": "México"},
+    "Mexico": {"code": "MX", "english": "Mexico", "native": "México"},
+    "Argentina": {"code": "AR", "english": "Argentina", "native": "Argentina"},
+    "Colombia": {"code": "CO", "english": "Colombia", "native": "Colombia"},
+    "Chile": {"code": "CL", "english": "Chile", "native": "Chile"},
+    "Peru": {"code": "PE", "english": "Peru", "native": "Perú"},
+    "Perú": {"code": "PE", "english": "Peru", "native": "Perú"},
+    "Venezuela": {"code": "VE", "english": "Venezuela", "native": "Venezuela"},
+    "Ecuador": {"code": "EC", "english": "Ecuador", "native": "Ecuador"},
+    "Bolivia": {"code": "BO", "english": "Bolivia", "native": "Bolivia"},
+    "Paraguay": {"code": "PY", "english": "Paraguay", "native": "Paraguay"},
+    "Uruguay": {"code": "UY", "english": "Uruguay", "native": "Uruguay"},
+    "Cuba": {"code": "CU", "english": "Cuba", "native": "Cuba"},
+    "Dominican Republic": {"code": "DO", "english": "Dominican Republic", "native": "República Dominicana"},
+    "República Dominicana": {"code": "DO", "english": "Dominican Republic", "native": "República Dominicana"},
+    "Haiti": {"code": "HT", "english": "Haiti", "native": "Haïti"},
+    "Haïti": {"code": "HT", "english": "Haiti", "native": "Haïti"},
+    "Guatemala": {"code": "GT", "english": "Guatemala", "native": "Guatemala"},
+    "El Salvador": {"code": "SV", "english": "El Salvador", "native": "El Salvador"},
+    "Honduras": {"code": "HN", "english": "Honduras", "native": "Honduras"},
+    "Nicaragua": {"code": "NI", "english": "Nicaragua", "native": "Nicaragua"},
+    "Costa Rica": {"code": "CR", "english": "Costa Rica", "native": "Costa Rica"},
+    "Panama": {"code": "PA", "english": "Panama", "native": "Panamá"},
+    "Panamá": {"code": "PA", "english": "Panama", "native": "Panamá"},
+    
+    # Middle East
+    "مصر": {"code": "EG", "english": "Egypt", "native": "مصر"},
+    "Egypt": {"code": "EG", "english": "Egypt", "native": "مصر"},
+    "السعودية": {"code": "SA", "english": "Saudi Arabia", "native": "السعودية"},
+    "Saudi Arabia": {"code": "SA", "english": "Saudi Arabia", "native": "السعودية"},
+    "ایران": {"code": "IR", "english": "Iran", "native": "ایران"},
+    "Iran": {"code": "IR", "english": "Iran", "native": "ایران"},
+    "Türkiye": {"code": "TR", "english": "Turkey", "native": "Türkiye"},
+    "Turkey": {"code": "TR", "english": "Turkey", "native": "Türkiye"},
+    "العراق": {"code": "IQ", "english": "Iraq", "native": "العراق"},
+    "Iraq": {"code": "IQ", "english": "Iraq", "native": "العراق"},
+    "سوريا": {"code": "SY", "english": "Syria", "native": "سوريا"},
+    "Syria": {"code": "SY", "english": "Syria", "native": "سوريا"},
+    "الأردن": {"code": "JO", "english": "Jordan", "native": "الأردن"},
+    "Jordan": {"code": "JO", "english": "Jordan", "native": "الأردن"},
+    "لبنان": {"code": "LB", "english": "Lebanon", "native": "لبنان"},
+    "Lebanon": {"code": "LB", "english": "Lebanon", "native": "لبنان"},
+    "Israel": {"code": "IL", "english": "Israel", "native": "ישראל"},
+    "ישראל": {"code": "IL", "english": "Israel", "native": "ישראל"},
+    "الإمارات": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
+    "United Arab Emirates": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
+    "UAE": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
+    "قطر": {"code": "QA", "english": "Qatar", "native": "قطر"},
+    "Qatar": {"code": "QA", "english": "Qatar", "native": "قطر"},
+    "البحرين": {"code": "BH", "english": "Bahrain", "native": "البحرين"},
+    "Bahrain": {"code": "BH", "english": "Bahrain", "native": "البحرين"},
+    "عمان": {"code": "OM", "english": "Oman", "native": "عمان"},
+    "Oman": {"code": "OM", "english": "Oman", "native": "عمان"},
+    "الكويت": {"code": "KW", "english": "Kuwait", "native": "الكويت"},
+    "Kuwait": {"code": "KW", "english": "Kuwait", "native": "الكويت"},
+    "اليمن": {"code": "YE", "english": "Yemen", "native": "اليمن"},
+    "Yemen": {"code": "YE", "english": "Yemen", "native": "اليمن"},
+    
+    # Africa
+    "South Africa": {"code": "ZA", "english": "South Africa", "native": "South Africa"},
+    "Nigeria": {"code": "NG", "english": "Nigeria", "native": "Nigeria"},
+    "Kenya": {"code": "KE", "english": "Kenya", "native": "Kenya"},
+    "المغرب": {"code": "MA", "english": "Morocco", "native": "المغرب"},
+    "Morocco": {"code": "MA", "english": "Morocco", "native": "المغرب"},
+    "Maroc": {"code": "MA", "english": "Morocco", "native": "المغرب"},
+    "ليبيا": {"code": "LY", "english": "Libya", "native": "ليبيا"},
+    "Libya": {"code": "LY", "english": "Libya", "native": "ليبيا"},
+    "تونس": {"code": "TN", "english": "Tunisia", "native": "تونس"},
+    "Tunisia": {"code": "TN", "english": "Tunisia", "native": "تونس"},
+    "الجزائر": {"code": "DZ", "english": "Algeria", "native": "الجزائر"},
+    "Algeria": {"code": "DZ", "english": "Algeria", "native": "الجزائر"},
+    "Ethiopia": {"code": "ET", "english": "Ethiopia", "native": "ኢትዮጵያ"},
+    "Ghana": {"code": "GH", "english": "Ghana", "native": "Ghana"},
+    "Tanzania": {"code": "TZ", "english": "Tanzania", "native": "Tanzania"},
+    "Uganda": {"code": "UG", "english": "Uganda", "native": "Uganda"},
+    "Angola": {"code": "AO", "english": "Angola", "native": "Angola"},
+    "Mozambique": {"code": "MZ", "english": "Mozambique", "native": "Moçambique"},
+    "Zimbabwe": {"code": "ZW", "english": "Zimbabwe", "native": "Zimbabwe"},
+    "Sudan": {"code": "SD", "english": "Sudan", "native": "السودان"},
+    "السودان": {"code": "SD", "english": "Sudan", "native": "السودان"},
+    "Senegal": {"code": "SN", "english": "Senegal", "native": "Sénégal"},
+    "Sénégal": {"code": "SN", "english": "Senegal", "native": "Sénégal"},
+    "Cameroon": {"code": "CM", "english": "Cameroon", "native": "Cameroun"},
+    "Cameroun": {"code": "CM", "english": "Cameroon", "native": "Cameroun"},
+    "Côte d'Ivoire": {"code": "CI", "english": "Ivory Coast", "native": "Côte d'Ivoire"},
+    "Ivory Coast": {"code": "CI", "english": "Ivory Coast", "native": "Côte d'Ivoire"},
+    "Madagascar": {"code": "MG", "english": "Madagascar", "native": "Madagascar"},
+    "Mali": {"code": "ML", "english": "Mali", "native": "Mali"},
+    "Burkina Faso": {"code": "BF", "english": "Burkina Faso", "native": "Burkina Faso"},
+    "Niger": {"code": "NE", "english": "Niger", "native": "Niger"},
+    "Chad": {"code": "TD", "english": "Chad", "native": "Tchad"},
+    "Tchad": {"code": "TD", "english": "Chad", "native": "Tchad"},
+    "Somalia": {"code": "SO", "english": "Somalia", "native": "Soomaaliya"},
+    "Soomaaliya": {"code": "SO", "english": "Somalia", "native": "Soomaaliya"},
+    
+    # Oceania
+    "Australia": {"code": "AU", "english": "Australia", "native": "Australia"},
+    "New Zealand": {"code": "NZ", "english": "New Zealand", "native": "New Zealand"},
+    "Papua New Guinea": {"code": "PG", "english": "Papua New Guinea", "native": "Papua New Guinea"},
+    "Fiji": {"code": "FJ", "english": "Fiji", "native": "Fiji"},
+    "Solomon Islands": {"code": "SB", "english": "Solomon Islands", "native": "Solomon Islands"},
+    "Vanuatu": {"code": "VU", "english": "Vanuatu", "native": "Vanuatu"},
+    "New Caledonia": {"code": "NC", "english": "New Caledonia", "native": "Nouvelle-Calédonie"},
+    "Nouvelle-Calédonie": {"code": "NC", "english": "New Caledonia", "native": "Nouvelle-Calédonie"},
+    "French Polynesia": {"code": "PF", "english": "French Polynesia", "native": "Polynésie française"},
+    "Polynésie française": {"code": "PF", "english": "French Polynesia", "native": "Polynésie française"},
+    
+    # Others
+    "Россия": {"code": "RU", "english": "Russia", "native": "Россия"},
+    "Russia": {"code": "RU", "english": "Russia", "native": "Россия"}
+}
+
+
+# Common alternative spellings that aren't keys of COUNTRY_CODES
+COUNTRY_ALIASES = {
+    "US": "US", "U.S.": "US", "U.S.A.": "US", "United States of America": "US", "America": "US",
+    "UK": "GB", "U.K.": "GB", "Britain": "GB", "England": "GB", "Scotland": "GB", "Wales": "GB",
+    "Republic of Korea": "KR", "Korea, South": "KR", "ROK": "KR",
+    "Democratic People's Republic of Korea": "KP", "DPRK": "KP", "Korea, North": "KP",
+    "Russian Federation": "RU",
+    "People's Republic of China": "CN", "PRC": "CN",
+    "Republic of China": "TW",
+    "Czechia": "CZ",
+    "Holland": "NL", "The Netherlands": "NL",
+    "Persia": "IR", "Islamic Republic of Iran": "IR",
+    "Burma": "MM",
+    "Viet Nam": "VN",
+    "Lao PDR": "LA",
+    "Syrian Arab Republic": "SY",
+    "Emirates": "AE",
+    "Republic of Ireland": "IE",
+    "Macedonia": "MK",
+    "Türkiye Cumhuriyeti": "TR",
+    "Republic of the Philippines": "PH",
+    "Kyrgyz Republic": "KG",
+}
+
+_SEPARATORS = re.compile(r"[\s\-_/,;:()\[\]]+")
+_DROPPED = re.compile(r"[.'’`\"]")
+
+
+def normalize_country_name(name: str) -> str:
+    """Case-fold and strip accents and punctuation: "Côte d'Ivoire" -> "cote divoire"."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _DROPPED.sub("", text.casefold())
+    text = _SEPARATORS.sub(" ", text).strip()
+    if text.startswith("the "):
+        text = text[4:]
+    return text
+
+
+class CountryIndex:
+    """Resolves free-form country names to a canonical COUNTRY_CODES record.
+
+    Exact normalized matches are a single dict lookup. Anything else falls back
+    to a whole-word prefix of exactly one name and then a typo-distance fuzzy
+    match, and the result of that slow path is memoized. Names that match
+    neither resolve to None rather than to a merely similar country.
+    """
+
+    def __init__(self, country_codes: Dict[str, Dict[str, str]], aliases: Optional[Dict[str, str]] = None,
+                 fuzzy_cutoff: float = 0.9, max_length_difference: int = 2, max_fuzzy_length: int = 64,
+                 memo_size: int = 2048):
+        # Canonical record per ISO code: prefer the entry keyed by the English name
+        self.countries: Dict[str, Dict[str, str]] = {}
+        for name, data in country_codes.items():
+            if data["code"] not in self.countries or name == data["english"]:
+                self.countries[data["code"]] = {
+                    "code": data["code"], "english": data["english"], "native": data["native"]
+                }
+
+        self.names: Dict[str, str] = {}
+        for name, data in country_codes.items():
+            for variant in (name, data["english"], data["native"]):
+                self.names.setdefault(normalize_country_name(variant), data["code"])
+        for alias, code in (aliases or {}).items():
+            if code in self.countries:
+                self.names.setdefault(normalize_country_name(alias), code)
+        self.names.pop("", None)
+
+        self._sorted_names: List[str] = sorted(self.names)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.max_length_difference = max_length_difference
+        self.max_fuzzy_length = max_fuzzy_length
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    def resolve_code(self, name: str) -> Optional[str]:
+        """Return the ISO code for ``name``, or None if it can't be resolved."""
+        if not name:
+            return None
+        stripped = name.strip()
+        if len(stripped) == 2 and stripped.isupper() and stripped in self.countries:
+            return stripped
+        key = normalize_country_name(stripped)
+        code = self.names.get(key)
+        if code is not None or not key:
+            return code
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        code = self._slow_resolve(key)
+        self._memo[key] = code
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return code
+
+    def resolve(self, name: str) -> Optional[Dict[str, str]]:
+        """Return the canonical {"code", "english", "native"} record for ``name``."""
+        code = self.resolve_code(name)
+        return self.countries[code] if code else None
+
+    def _slow_resolve(self, key: str) -> Optional[str]:
+        if len(key) > self.max_fuzzy_length:
+            return None
+        # Whole-word prefix of exactly one name: "czech" -> "czech republic",
+        # but not "dominica" -> "dominican republic" or "south" -> any of several
+        prefix = key + " "
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        candidates = [name for name in self._sorted_names[start:start + 2] if name.startswith(prefix)]
+        if len(candidates) == 1:
+            return self.names[candidates[0]]
+        # Typos only: a near-identical spelling of about the same length
+        close = [name for name in difflib.get_close_matches(key, self._sorted_names, n=3, cutoff=self.fuzzy_cutoff)
+                 if abs(len(name) - len(key)) <= self.max_length_difference]
+        return self.names[close[0]] if close else None
+
+    def as_dict(self) -> Dict[str, object]:
+        """Compact form for clients: canonical records plus every normalized name."""
+        return {
+            "countries": list(self.countries.values()),
+            "names": self.names,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def default_country_index() -> CountryIndex:
+    """The index over COUNTRY_CODES and COUNTRY_ALIASES, built on first use and then shared."""
+    return CountryIndex(COUNTRY_CODES, COUNTRY_ALIASES)
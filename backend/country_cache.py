@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class _SQLiteStore:
+    """Persistent key/value tier. All access goes through one worker thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="country-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS country_info ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        row = self._connect().execute(
+            "SELECT value, fetched_at FROM country_info WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _put(self, key: str, value: Dict[str, Any], fetched_at: float) -> None:
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO country_info (key, value, fetched_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), fetched_at),
+        )
+        conn.commit()
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._get, key)
+
+    async def put(self, key: str, value: Dict[str, Any], fetched_at: float) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._put, key, value, fetched_at)
+
+
+class CountryInfoCache:
+    """Two-tier (in-memory LRU + SQLite) cache for generated country information.
+
+    Entries younger than ``ttl`` are served as-is. Entries older than ``ttl`` but
+    within ``stale_ttl`` are served immediately while a background refresh runs.
+    Anything older is treated as a miss and loaded synchronously. A key has at
+    most one load or refresh in flight; concurrent callers share it.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 512,
+                 ttl: float = 7 * 24 * 3600, stale_ttl: float = 30 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._memory: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._disk = _SQLiteStore(path) if path else None
+        # Loads and background refreshes in flight, one per key
+        self._loads: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+        self.counters = {
+            "memoryHits": 0,
+            "diskHits": 0,
+            "staleHits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refreshFailures": 0,
+        }
+
+    def _remember(self, key: str, value: Dict[str, Any], fetched_at: float) -> None:
+        self._memory[key] = (value, fetched_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, key: str, count: bool = True) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            if count:
+                self.counters["memoryHits"] += 1
+            return entry
+        if self._disk is not None:
+            try:
+                entry = await self._disk.get(key)
+            except sqlite3.Error as e:
+                logger.error(f"Country cache disk read failed: {e}")
+                entry = None
+            if entry is not None:
+                if count:
+                    self.counters["diskHits"] += 1
+                self._remember(key, *entry)
+                return entry
+        return None
+
+    async def _store(self, key: str, value: Dict[str, Any]) -> None:
+        fetched_at = time.time()
+        self._remember(key, value, fetched_at)
+        if self._disk is not None:
+            try:
+                await self._disk.put(key, value, fetched_at)
+            except sqlite3.Error as e:
+                logger.error(f"Country cache disk write failed: {e}")
+
+    async def _load(self, key: str, loader: Loader) -> Dict[str, Any]:
+        value = await loader()
+        await self._store(key, value)
+        return value
+
+    def _load_done(self, key: str, task: "asyncio.Task[Dict[str, Any]]", background: bool) -> None:
+        if self._loads.get(key) is task:
+            del self._loads[key]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if not background:
+            # Waiting callers get the error themselves
+            return
+        if error is None:
+            self.counters["refreshes"] += 1
+        else:
+            self.counters["refreshFailures"] += 1
+            logger.warning(f"Background refresh failed for {key}: {error!r}")
+
+    def _start_load(self, key: str, loader: Loader, background: bool = False) -> "asyncio.Task[Dict[str, Any]]":
+        """The load in flight for ``key``, started if there is none, so a key is only loaded once at a time."""
+        task = self._loads.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._loads[key] = task
+            task.add_done_callback(lambda done: self._load_done(key, done, background))
+        return task
+
+    async def get(self, key: str, loader: Loader) -> Dict[str, Any]:
+        """Return the cached value for ``key``, calling ``loader`` on a miss."""
+        entry = await self._lookup(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                return value
+            if age < self.stale_ttl:
+                self.counters["staleHits"] += 1
+                self._start_load(key, loader, background=True)
+                return value
+        self.counters["misses"] += 1
+        # Shielded so one caller going away doesn't cancel the load for the others
+        return await asyncio.shield(self._start_load(key, loader))
+
+    async def prewarm(self, loaders: Iterable[Tuple[str, Loader]], concurrency: int = 4) -> int:
+        """Load every key that is missing or expired. Returns the number loaded."""
+        semaphore = asyncio.Semaphore(concurrency)
+        loaded = 0
+
+        async def warm(key: str, loader: Loader) -> None:
+            nonlocal loaded
+            entry = await self._lookup(key, count=False)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                return
+            async with semaphore:
+                try:
+                    await asyncio.shield(self._start_load(key, loader))
+                    loaded += 1
+                except Exception as e:
+                    logger.warning(f"Pre-warm failed for {key}: {e}")
+
+        await asyncio.gather(*(warm(key, loader) for key, loader in loaders))
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self.counters[k] for k in ("memoryHits", "diskHits", "misses"))
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "memoryEntries": len(self._memory),
+            "hitRatio": round(hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,241 @@
+import hashlib
+import re
+import time
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+Article = Dict[str, Any]
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+# Dropped from URLs by exact name, plus anything starting with utm_
+_TRACKING_PARAMS = frozenset(("fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "referrer", "cmpid", "ocid"))
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of an article URL: no tracking params, fragment, www. or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, urlencode(sorted(query)), ""))
+
+
+def _tokens(article: Article) -> List[str]:
+    text = f"{article.get('title') or ''} {article.get('description') or ''}"
+    return _WORDS.findall(text.casefold())
+
+
+def content_hash(tokens: List[str]) -> bytes:
+    return hashlib.sha1(" ".join(tokens).encode("utf-8")).digest()
+
+
+def article_hash(article: Article) -> bytes:
+    """Content hash of an article's normalized title and description."""
+    return content_hash(_tokens(article))
+
+
+def _shingles(tokens: List[str], shingle_size: int) -> Set[str]:
+    if len(tokens) < shingle_size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    Each shingle is hashed once with SHAKE-128 and the digest is read as
+    ``num_perm`` independent 32-bit hash values, so the per-position minimum
+    can be taken with ``map(min, zip(...))`` without a Python-level loop.
+    """
+
+    def __init__(self, num_perm: int = 32, shingle_size: int = 2):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signature(self, tokens: List[str]) -> array:
+        size = 4 * self.num_perm
+        rows = [
+            array("I", hashlib.shake_128(shingle.encode("utf-8")).digest(size))
+            for shingle in _shingles(tokens, self.shingle_size)
+        ]
+        return array("I", map(min, zip(*rows)))
+
+
+def band_probability(similarity: float, bands: int, rows: int) -> float:
+    """Chance that two signatures with this Jaccard similarity share at least one band."""
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def lsh_bands(num_perm: int, threshold: float, min_recall: float = 0.9) -> Tuple[int, int]:
+    """(bands, rows) with the most rows per band, so the fewest unrelated
+    candidates, that still find pairs at ``threshold`` with probability at
+    least ``min_recall``."""
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if band_probability(threshold, bands, rows) >= min_recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class _Entry:
+    __slots__ = ("article_id", "signature", "content_hash", "url", "seen_at", "duplicates", "sources")
+
+    def __init__(self, article_id: str, signature: array, digest: bytes, url: str, seen_at: float):
+        self.article_id = article_id
+        self.signature = signature
+        self.content_hash = digest
+        self.url = url
+        self.seen_at = seen_at
+        self.duplicates = 0
+        self.sources: Optional[Set[str]] = None
+
+
+class DuplicateIndex:
+    """Time-windowed, memory-bounded index of recently seen articles.
+
+    An article is a duplicate if its normalized URL or content hash was seen
+    before, or the estimated Jaccard similarity of its title+description
+    shingles to a recent article is at least ``threshold``. Near-duplicate
+    candidates come from MinHash LSH: the signature is split into ``bands``
+    bands and only entries sharing a band are compared.
+
+    A pair with similarity s shares a band with probability 1 - (1 - s^rows)^bands.
+    By default ``bands`` is the fewest that still give ``min_recall`` at the
+    threshold. At 0.5 with 32 permutations that is 16 bands of 2 rows, so
+    about 99% of pairs at the threshold are compared, and more above it.
+    Permutations left over from the bands still count when candidates are
+    verified.
+    """
+
+    def __init__(self, window_seconds: float = 6 * 3600, max_entries: int = 200000,
+                 threshold: float = 0.5, num_perm: int = 32, bands: Optional[int] = None,
+                 min_recall: float = 0.9):
+        if bands is None:
+            bands, rows = lsh_bands(num_perm, threshold, min_recall)
+        elif 1 <= bands <= num_perm:
+            rows = num_perm // bands
+        else:
+            raise ValueError("bands must be between 1 and num_perm")
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self._bands = bands
+        self._rows = rows
+        self.expected_recall = band_probability(threshold, bands, self._rows)
+        self._order: Deque[_Entry] = deque()
+        self._by_url: Dict[str, _Entry] = {}
+        self._by_hash: Dict[bytes, _Entry] = {}
+        self._by_id: Dict[str, _Entry] = {}
+        # Band key -> entries; a list because almost every bucket holds one entry
+        self._buckets: List[Dict[int, List[_Entry]]] = [{} for _ in range(self._bands)]
+        self.unique = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _band_keys(self, signature: array):
+        rows = self._rows
+        for band in range(self._bands):
+            # Candidates are verified against the full signature, so hash collisions are harmless
+            yield band, hash(signature[band * rows:(band + 1) * rows].tobytes())
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._order and (self._order[0].seen_at < cutoff or len(self._order) > self.max_entries):
+            entry = self._order.popleft()
+            if self._by_url.get(entry.url) is entry:
+                del self._by_url[entry.url]
+            if self._by_hash.get(entry.content_hash) is entry:
+                del self._by_hash[entry.content_hash]
+            if self._by_id.get(entry.article_id) is entry:
+                del self._by_id[entry.article_id]
+            for band, key in self._band_keys(entry.signature):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None and entry in bucket:
+                    bucket.remove(entry)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def _find_near(self, signature: array) -> Optional[_Entry]:
+        needed = self.threshold * len(signature)
+        checked: Set[int] = set()
+        for band, key in self._band_keys(signature):
+            for entry in self._buckets[band].get(key, ()):
+                if id(entry) in checked:
+                    continue
+                checked.add(id(entry))
+                if sum(x == y for x, y in zip(entry.signature, signature)) >= needed:
+                    return entry
+        return None
+
+    def check(self, article: Article, now: Optional[float] = None) -> Tuple[bool, str]:
+        """Record ``article`` and return (is_duplicate, canonical article id)."""
+        now = time.time() if now is None else now
+        self._expire(now)
+        url = normalize_url(article.get("url") or "")
+        tokens = _tokens(article)
+        digest = content_hash(tokens)
+        source = article.get("source") or ""
+
+        canonical = self._by_hash.get(digest)
+        if canonical is None and url != "/":
+            # The same story re-fetched with an edited headline or description
+            canonical = self._by_url.get(url)
+        if canonical is not None:
+            self.exact_duplicates += 1
+        else:
+            signature = self.hasher.signature(tokens)
+            canonical = self._find_near(signature)
+            if canonical is not None:
+                self.near_duplicates += 1
+        if canonical is not None:
+            canonical.duplicates += 1
+            if source:
+                if canonical.sources is None:
+                    canonical.sources = set()
+                canonical.sources.add(source)
+            return True, canonical.article_id
+
+        article_id = str(article.get("id") or digest.hex()[:16])
+        entry = _Entry(article_id, signature, digest, url, now)
+        if source:
+            entry.sources = {source}
+        self._order.append(entry)
+        self._by_url[url] = entry
+        self._by_hash[digest] = entry
+        self._by_id[article_id] = entry
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(entry)
+        self.unique += 1
+        return False, article_id
+
+    def cluster(self, article_id: str) -> Optional[Dict[str, Any]]:
+        """Duplicate count and sources for a canonical article still in the window."""
+        entry = self._by_id.get(article_id)
+        if entry is None:
+            return None
+        return {"duplicates": entry.duplicates, "sources": sorted(entry.sources or ())}
+
+    async def stage(self, batch: List[Article]) -> List[Article]:
+        """Ingestion stage: pass through only articles not seen before."""
+        return [article for article in batch if not self.check(article)[0]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._order),
+            "unique": self.unique,
+            "exactDuplicates": self.exact_duplicates,
+            "nearDuplicates": self.near_duplicates,
+            "bands": self._bands,
+            "expectedRecall": round(self.expected_recall, 3),
+        }
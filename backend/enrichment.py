@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from llm import LLMClient, StubModel
+
+logger = logging.getLogger(__name__)
+
+Article = Dict[str, Any]
+
+SENTIMENTS = ("positive", "neutral", "negative")
+CATEGORIES = ("politics", "business", "technology", "science", "health", "sports", "general")
+
+# Same keyword rules as newsProcessor.js, used when the model isn't available
+POSITIVE_WORDS = ("success", "breakthrough", "peace", "agreement", "positive", "progress", "wins", "recovery")
+NEGATIVE_WORDS = ("crisis", "conflict", "war", "death", "disaster", "tragedy", "killed", "attack")
+CATEGORY_KEYWORDS = {
+    "politics": ("government", "president", "election", "policy", "minister"),
+    "technology": ("tech", "innovation", "digital", "software", "cyber"),
+    "business": ("market", "economy", "company", "stock", "trade"),
+    "sports": ("game", "tournament", "player", "team", "sport"),
+    "health": ("medical", "health", "disease", "treatment", "vaccine"),
+    "science": ("research", "study", "discovery", "scientist", "space"),
+}
+
+_WORDS = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+PROMPT_HEADER = """You label news articles. For every article below return one JSON object with:
+"id" (copied from the input), "sentiment" (one of: positive, neutral, negative),
+"category" (one of: politics, business, technology, science, health, sports, general),
+"summary" (one sentence, at most 30 words).
+Reply with only a JSON array of these objects, in any order.
+ARTICLES:
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to ``capacity``."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available; infinite if it never fits."""
+        self._refill()
+        if amount > self.capacity:
+            return float("inf")
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one model quota."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttled = 0
+        self.rejected = 0
+
+    async def acquire(self, tokens: int, max_wait: float = 0.0) -> bool:
+        """Reserve one request and ``tokens``, waiting up to ``max_wait`` seconds.
+
+        Returns False, reserving nothing, if that would take longer.
+        """
+        while True:
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait == 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return True
+            if wait > max_wait:
+                self.rejected += 1
+                return False
+            self.throttled += 1
+            max_wait -= wait
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requestsAvailable": int(self.requests.tokens),
+            "tokensAvailable": int(self.tokens.tokens),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+        }
+
+
+def classify_locally(article: Article) -> Dict[str, str]:
+    """Keyword sentiment and category plus the first sentence as summary."""
+    text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
+    words = set(_WORDS.findall(text))
+    positive = sum(1 for word in POSITIVE_WORDS if word in words)
+    negative = sum(1 for word in NEGATIVE_WORDS if word in words)
+    sentiment = "positive" if positive > negative else "negative" if negative > positive else "neutral"
+    category = next(
+        (name for name, keywords in CATEGORY_KEYWORDS.items() if any(k in words for k in keywords)), "general"
+    )
+    description = article.get("description") or article.get("title") or ""
+    summary = _SENTENCE_END.split(description, 1)[0][:240]
+    return {"sentiment": sentiment, "category": category, "summary": summary}
+
+
+def offline_model(latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None) -> StubModel:
+    """A stub model that answers enrichment prompts with the local classifier.
+
+    ``failure_rate`` drops that share of the items from each reply, to
+    exercise the retry path.
+    """
+    rng = random.Random(seed)
+
+    def respond(prompt: str) -> str:
+        items = json.loads(prompt.split("ARTICLES:\n", 1)[1])
+        results = [
+            {"id": item["id"], **classify_locally({"title": item["title"], "description": item["text"]})}
+            for item in items if rng.random() >= failure_rate
+        ]
+        return "```json\n" + json.dumps(results) + "\n```"
+
+    return StubModel(respond, latency=latency)
+
+
+def parse_response(text: str, count: int) -> Dict[int, Dict[str, str]]:
+    """Valid per-article results from a batched reply, by input index."""
+    content = text.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else content[3:]
+        content = content.rsplit("```", 1)[0]
+    try:
+        items = json.loads(content)
+    except json.JSONDecodeError:
+        return {}
+    if isinstance(items, dict):
+        items = items.get("results") or items.get("articles") or []
+    results = {}
+    for item in items if isinstance(items, list) else ():
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        sentiment = str(item.get("sentiment", "")).lower()
+        category = str(item.get("category", "")).lower()
+        summary = item.get("summary")
+        if 0 <= index < count and sentiment in SENTIMENTS and category in CATEGORIES and isinstance(summary, str):
+            results[index] = {"sentiment": sentiment, "category": category, "summary": summary.strip()}
+    return results
+
+
+class Enricher:
+    """Adds sentiment, category and summary to articles, many articles per model call.
+
+    Articles are packed into prompts of at most ``max_prompt_tokens``, with
+    ``output_tokens_per_article`` reserved for each answer. Items missing or
+    invalid in a reply are retried in a later batch, up to ``max_retries``
+    times. When the rate limiter can't fit a call within ``max_wait`` seconds,
+    or the model keeps failing, articles get the local keyword classifier.
+    """
+
+    def __init__(self, llm: Optional[LLMClient], limiter: Optional[RateLimiter] = None,
+                 max_prompt_tokens: int = 6000, output_tokens_per_article: int = 80,
+                 max_output_tokens: int = 4096, max_text_chars: int = 600, max_retries: int = 1,
+                 max_wait: float = 2.0, cost_per_1k_input: float = 0.0, cost_per_1k_output: float = 0.0):
+        self.llm = llm
+        self.limiter = limiter
+        self.max_prompt_tokens = max_prompt_tokens
+        self.output_tokens_per_article = output_tokens_per_article
+        self.max_batch = max(1, max_output_tokens // output_tokens_per_article)
+        self.max_text_chars = max_text_chars
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.cost_per_1k_input = cost_per_1k_input
+        self.cost_per_1k_output = cost_per_1k_output
+        self._header_tokens = estimate_tokens(PROMPT_HEADER)
+        self.calls = 0
+        self.failed_calls = 0
+        self.enriched = 0
+        self.retried = 0
+        self.fallbacks = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def _item(self, index: int, article: Article) -> Dict[str, Any]:
+        text = article.get("description") or article.get("content") or ""
+        return {"id": index, "title": article.get("title") or "", "text": text[:self.max_text_chars]}
+
+    def pack(self, articles: List[Article]) -> List[List[Article]]:
+        """Split articles into batches that fit the prompt budget."""
+        # A call must also fit in a full tokens-per-minute bucket, or it could never run
+        total_budget = self.limiter.tokens.capacity if self.limiter is not None else float("inf")
+        output = self.output_tokens_per_article
+        batches: List[List[Article]] = []
+        batch: List[Article] = []
+        used = self._header_tokens
+        for article in articles:
+            cost = estimate_tokens(json.dumps(self._item(len(batch), article), ensure_ascii=False))
+            if batch and (used + cost > self.max_prompt_tokens or len(batch) >= self.max_batch
+                          or used + cost + output * (len(batch) + 1) > total_budget):
+                batches.append(batch)
+                batch, used = [], self._header_tokens
+            batch.append(article)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _fallback(self, articles: List[Article]) -> None:
+        for article in articles:
+            article.update(classify_locally(article))
+            article["enrichedBy"] = "local"
+        self.fallbacks += len(articles)
+
+    async def _call(self, articles: List[Article]) -> List[Article]:
+        """One model call for a batch. Returns the articles it didn't enrich."""
+        items = [self._item(index, article) for index, article in enumerate(articles)]
+        prompt = PROMPT_HEADER + json.dumps(items, ensure_ascii=False)
+        input_tokens = estimate_tokens(prompt)
+        reserved = input_tokens + self.output_tokens_per_article * len(articles)
+        if self.limiter is not None and not await self.limiter.acquire(reserved, self.max_wait):
+            # Out of quota: don't retry, degrade right away
+            self._fallback(articles)
+            return []
+
+        self.calls += 1
+        self.input_tokens += input_tokens
+        try:
+            response = await self.llm.generate(prompt)
+        except Exception as e:
+            self.failed_calls += 1
+            logger.warning(f"Enrichment call for {len(articles)} articles failed: {e!r}")
+            return articles
+        self.output_tokens += estimate_tokens(response)
+
+        results = parse_response(response, len(articles))
+        failed = []
+        for index, article in enumerate(articles):
+            result = results.get(index)
+            if result is None:
+                failed.append(article)
+                continue
+            article.update(result)
+            article["enrichedBy"] = "llm"
+        self.enriched += len(results)
+        return failed
+
+    async def enrich(self, articles: List[Article]) -> List[Article]:
+        """Enrich ``articles`` in place and return them."""
+        if self.llm is None:
+            self._fallback(articles)
+            return articles
+        pending = articles
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                self.retried += len(pending)
+            failed = await asyncio.gather(*(self._call(batch) for batch in self.pack(pending)))
+            pending = [article for batch in failed for article in batch]
+        if pending:
+            self._fallback(pending)
+        return articles
+
+    async def stage(self, batch: List[Article]) -> List[Article]:
+        """Ingestion stage: enrich articles that haven't been enriched yet."""
+        await self.enrich([article for article in batch if "enrichedBy" not in article])
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        cost = (self.input_tokens * self.cost_per_1k_input + self.output_tokens * self.cost_per_1k_output) / 1000
+        stats = {
+            "calls": self.calls,
+            "failedCalls": self.failed_calls,
+            "enriched": self.enriched,
+            "retried": self.retried,
+            "fallbacks": self.fallbacks,
+            "articlesPerCall": round(self.enriched / self.calls, 2) if self.calls else 0.0,
+            "inputTokens": self.input_tokens,
+            "outputTokens": self.output_tokens,
+            "tokensPerArticle": round((self.input_tokens + self.output_tokens) / self.enriched, 1)
+            if self.enriched else 0.0,
+            "costPerArticle": round(cost / self.enriched, 6) if self.enriched else 0.0,
+        }
+        if self.limiter is not None:
+            stats["rateLimit"] = self.limiter.stats()
+        return stats
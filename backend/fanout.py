@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from instrumentation import COUNT_BUCKETS, histogram
+from wire import JSON, Payload, encode_articles
+
+logger = logging.getLogger(__name__)
+
+SEND_SECONDS = histogram("pulsehub_ws_send_seconds", "Time to write one message to a client socket")
+QUEUE_WAIT_SECONDS = histogram("pulsehub_ws_queue_wait_seconds", "Time a message waited in a client's queue")
+FANOUT_CLIENTS = histogram("pulsehub_fanout_clients", "Clients a published message was queued for",
+                           buckets=COUNT_BUCKETS)
+
+
+def encode_message(message: Any) -> str:
+    """Serialize a message once so every client can share the same payload."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """A connected WebSocket client with its own bounded outbound queue."""
+
+    __slots__ = (
+        "websocket", "queue", "max_queue", "evict_after_drops", "send_timeout",
+        "sent", "dropped", "consecutive_drops", "connected_at", "last_send_at",
+        "wire_format", "compression", "on_failure", "_wakeup", "_task", "_closed",
+    )
+
+    def __init__(self, websocket: WebSocket, max_queue: int, evict_after_drops: int, send_timeout: float,
+                 wire_format: str = JSON, compression: Optional[str] = None):
+        self.websocket = websocket
+        # Negotiated encoding for article batches; other messages are always JSON
+        self.wire_format = wire_format
+        self.compression = compression
+        # Called with the client when a send fails, before the socket is closed
+        self.on_failure: Optional[Callable[["ClientConnection"], None]] = None
+        # Entries are (enqueued_at, payload); the payload string is shared between clients
+        self.queue: Deque[Tuple[float, Payload]] = deque()
+        self.max_queue = max_queue
+        self.evict_after_drops = evict_after_drops
+        self.send_timeout = send_timeout
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.connected_at = time.time()
+        self.last_send_at: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest undelivered message has been waiting."""
+        if not self.queue:
+            return 0.0
+        return time.monotonic() - self.queue[0][0]
+
+    def enqueue(self, payload: Payload) -> bool:
+        """Queue a payload without blocking. Returns False if the client should be evicted."""
+        if self._closed:
+            return False
+        if len(self.queue) >= self.max_queue:
+            # Slow consumer: drop the oldest pending message so the newest state wins
+            self.queue.popleft()
+            self.dropped += 1
+            self.consecutive_drops += 1
+            if self.consecutive_drops >= self.evict_after_drops:
+                return False
+        self.queue.append((time.monotonic(), payload))
+        self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._sender())
+
+    async def _sender(self) -> None:
+        try:
+            while not self._closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                enqueued_at, payload = self.queue.popleft()
+                if isinstance(payload, bytes):
+                    send = self.websocket.send_bytes(payload)
+                else:
+                    send = self.websocket.send_text(payload)
+                started = time.monotonic()
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+                QUEUE_WAIT_SECONDS.observe(started - enqueued_at)
+                SEND_SECONDS.observe(time.monotonic() - started)
+                self.sent += 1
+                self.consecutive_drops = 0
+                self.last_send_at = time.time()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Closing client after send failure: {e!r}")
+            if self.on_failure is not None:
+                self.on_failure(self)
+            # 1011 = "internal error"; usually the socket is already gone
+            await self.close(code=1011)
+
+    async def close(self, code: int = 1000) -> None:
+        """Stop the sender and close the socket. Safe to call more than once."""
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.clear()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.wire_format,
+            "queued": len(self.queue),
+            "lagSeconds": round(self.lag, 3),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "connectedAt": datetime.fromtimestamp(self.connected_at).isoformat(),
+            "lastSendAt": datetime.fromtimestamp(self.last_send_at).isoformat() if self.last_send_at else None,
+        }
+
+
+class Broadcaster:
+    """Fans messages out to all clients, encoding each message only once.
+
+    Publishing never awaits a socket: the payload is appended to every client's
+    queue and each client's sender task delivers it independently, so one stalled
+    socket cannot hold up the others. Clients that keep overflowing their queue
+    are disconnected.
+    """
+
+    def __init__(self, max_queue: int = 32, evict_after_drops: int = 64, send_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.evict_after_drops = evict_after_drops
+        self.send_timeout = send_timeout
+        self.clients: Dict[int, ClientConnection] = {}
+        self.messages_published = 0
+        self.clients_evicted = 0
+        self.clients_disconnected = 0
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def register(self, websocket: WebSocket, wire_format: str = JSON,
+                 compression: Optional[str] = None) -> ClientConnection:
+        client = ClientConnection(
+            websocket, self.max_queue, self.evict_after_drops, self.send_timeout, wire_format, compression
+        )
+        client.on_failure = self._disconnected
+        self.clients[id(client)] = client
+        client.start()
+        return client
+
+    async def unregister(self, client: ClientConnection) -> None:
+        self._disconnected(client)
+        await client.close()
+
+    def _disconnected(self, client: ClientConnection) -> None:
+        if self.clients.pop(id(client), None) is not None:
+            self.clients_disconnected += 1
+
+    def publish(self, message: Any) -> int:
+        """Encode ``message`` once and queue it for every client. Returns the fan-out size."""
+        if not self.clients:
+            return 0
+        payload = message if isinstance(message, str) else encode_message(message)
+        delivered = self.publish_encoded(payload, list(self.clients.values()))
+        FANOUT_CLIENTS.observe(delivered)
+        return delivered
+
+    def publish_encoded(self, payload: Payload, clients: List[ClientConnection]) -> int:
+        """Queue an already encoded payload for the given clients."""
+        self.messages_published += 1
+        evicted = []
+        for client in clients:
+            if not client.enqueue(payload):
+                evicted.append(client)
+        for client in evicted:
+            self._evict(client)
+        return len(clients) - len(evicted)
+
+    def publish_articles(self, articles: List[Dict[str, Any]], index: Any) -> int:
+        """Queue each client only the articles its subscription matches.
+
+        ``index.match(article)`` returns the clients interested in an article.
+        Clients that matched the same subset of articles and negotiated the same
+        wire format share one encoded payload.
+        """
+        matched: Dict[ClientConnection, List[int]] = {}
+        for position, article in enumerate(articles):
+            for client in index.match(article):
+                matched.setdefault(client, []).append(position)
+        groups: Dict[Tuple[Tuple[int, ...], str, Optional[str]], List[ClientConnection]] = {}
+        for client, positions in matched.items():
+            key = (tuple(positions), client.wire_format, client.compression)
+            groups.setdefault(key, []).append(client)
+        delivered = 0
+        for (positions, wire_format, compression), clients in groups.items():
+            message = {"type": "articles", "articles": [articles[p] for p in positions]}
+            payload = encode_articles(message, wire_format, compression)
+            delivered += self.publish_encoded(payload, clients)
+        FANOUT_CLIENTS.observe(delivered)
+        return delivered
+
+    def _evict(self, client: ClientConnection) -> None:
+        if self.clients.pop(id(client), None) is None:
+            return
+        self.clients_evicted += 1
+        logger.warning(f"Evicting slow WebSocket client after {client.dropped} dropped messages")
+        # 1013 = "try again later"; the client is expected to reconnect
+        asyncio.create_task(client.close(code=1013))
+
+    def stats(self) -> Dict[str, Any]:
+        clients = list(self.clients.values())
+        return {
+            "clients": len(clients),
+            "messagesPublished": self.messages_published,
+            "clientsEvicted": self.clients_evicted,
+            "clientsDisconnected": self.clients_disconnected,
+            "maxLagSeconds": round(max((c.lag for c in clients), default=0.0), 3),
+            "totalDropped": sum(c.dropped for c in clients),
+            "perClient": [c.stats() for c in clients],
+        }
@@ -0,0 +1,307 @@
+import asyncio
+import csv
+import logging
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Article = Dict[str, Any]
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_DROPPED = re.compile(r"[.'’`\"]")
+_WORD = re.compile(r"[^\W_]+")
+
+# Multi-word names that contain a gazetteer name but mean something else.
+# They win the longest-match rule and are then discarded.
+BLOCKED_NAMES = (
+    "North America", "South America", "Central America", "Latin America",
+    "New Mexico", "New England", "New South Wales", "South Sudan",
+    "Equatorial Guinea", "Guinea-Bissau", "Papua", "West Virginia",
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Words of ``text`` with accents and in-word punctuation removed, case preserved."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WORD.findall(_DROPPED.sub("", text))
+
+
+class Place:
+    __slots__ = ("name", "code", "lon", "lat", "kind", "population")
+
+    def __init__(self, name: str, code: str, lon: float, lat: float, kind: str = "city", population: int = 0):
+        self.name = name
+        self.code = code
+        self.lon = lon
+        self.lat = lat
+        self.kind = kind
+        self.population = population
+
+    def to_location(self) -> Dict[str, Any]:
+        """The ``location`` shape articles already use, plus the ISO code."""
+        return {"name": self.name, "countryCode": self.code, "coordinates": [self.lon, self.lat]}
+
+
+class LocationExtractor:
+    """Finds gazetteer places in article text in one pass.
+
+    Names are compiled into a word-level Aho-Corasick automaton, so a text is
+    scanned once no matter how many names the gazetteer holds, and matches
+    always fall on word boundaries. Overlapping matches keep the longest
+    ("Papua New Guinea" over "Guinea"). A match must be capitalized in the
+    original text, and all-caps names ("US", "UK") must appear in capitals.
+    A name shared by several places goes to a country, then to a place in a
+    country mentioned elsewhere in the text, then to the most populous.
+    """
+
+    def __init__(self, title_weight: int = 2):
+        self.title_weight = title_weight
+        self.places: List[Place] = []
+        self._patterns: Dict[Tuple[str, ...], int] = {}
+        self._pattern_places: List[List[int]] = []
+        self._pattern_lengths: List[int] = []
+        self._acronyms: List[bool] = []
+        self._goto: Optional[List[Dict[str, int]]] = None
+        self._fail: List[int] = []
+        self._out: List[Tuple[int, ...]] = []
+        self._vocabulary: frozenset = frozenset()
+        self.scanned = 0
+        self.tagged = 0
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _pattern(self, name: str) -> Optional[int]:
+        words = tokenize(name)
+        if not words:
+            return None
+        key = tuple(word.casefold() for word in words)
+        pattern = self._patterns.get(key)
+        if pattern is None:
+            pattern = self._patterns[key] = len(self._pattern_places)
+            self._pattern_places.append([])
+            self._pattern_lengths.append(len(key))
+            self._acronyms.append(True)
+        # Only all-caps if every spelling of the name is ("US" but not "Us")
+        is_acronym = all(word.isupper() for word in words)
+        self._acronyms[pattern] = self._acronyms[pattern] and is_acronym
+        self._goto = None
+        return pattern
+
+    def add(self, place: Place, names: Iterable[str] = ()) -> None:
+        """Add a place under its own name and any alternate ``names``."""
+        index = len(self.places)
+        self.places.append(place)
+        for name in (place.name, *names):
+            pattern = self._pattern(name)
+            if pattern is not None and index not in self._pattern_places[pattern]:
+                self._pattern_places[pattern].append(index)
+
+    def block(self, names: Iterable[str]) -> None:
+        """Names that should suppress the shorter gazetteer names they contain."""
+        for name in names:
+            self._pattern(name)
+
+    def compile(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for words, pattern in self._patterns.items():
+            state = 0
+            for word in words:
+                following = goto[state].get(word)
+                if following is None:
+                    following = goto[state][word] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(pattern)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, following in goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+                while fallback and word not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[following] = goto[fallback].get(word, 0)
+                outputs[following].extend(outputs[fail[following]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(output) for output in outputs]
+        self._vocabulary = frozenset(word for words in self._patterns for word in words)
+
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """Non-overlapping (start word, end word, pattern) matches in ``text``."""
+        if self._goto is None:
+            self.compile()
+        goto, fail, out, vocabulary = self._goto, self._fail, self._out, self._vocabulary
+        lengths, acronyms = self._pattern_lengths, self._acronyms
+        words = tokenize(text)
+        matches = []
+        state = 0
+        for end, word in enumerate(words, 1):
+            folded = word.casefold()
+            if folded not in vocabulary:
+                state = 0
+                continue
+            while state and folded not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(folded, 0)
+            for pattern in out[state]:
+                start = end - lengths[pattern]
+                original = words[start:end]
+                if acronyms[pattern]:
+                    if not all(word.isupper() for word in original):
+                        continue
+                elif original[0][0].islower():
+                    continue
+                matches.append((start, end, pattern))
+
+        # Leftmost-longest: drop matches inside an earlier or longer one
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        kept = []
+        covered = 0
+        for match in matches:
+            if match[0] >= covered:
+                kept.append(match)
+                covered = match[1]
+        return kept
+
+    def _choose(self, candidates: List[int], context: set) -> Place:
+        places = self.places
+        best = max(candidates, key=lambda i: (
+            places[i].kind == "country", places[i].code in context, places[i].population
+        ))
+        return places[best]
+
+    def locate(self, title: str, description: str = "") -> Optional[Place]:
+        """The place an article is about, or None if it mentions none."""
+        self.scanned += 1
+        mentions: List[Tuple[int, int, List[int]]] = []
+        for weight, text in ((self.title_weight, title), (1, description)):
+            if text:
+                for start, _, pattern in self.find(text):
+                    if self._pattern_places[pattern]:
+                        mentions.append((weight, start, self._pattern_places[pattern]))
+        if not mentions:
+            return None
+
+        places = self.places
+        context = {places[c].code for _, _, candidates in mentions for c in candidates
+                   if places[c].kind == "country"}
+        scores: Dict[str, int] = {}
+        chosen = []
+        for order, (weight, _, candidates) in enumerate(mentions):
+            place = self._choose(candidates, context)
+            scores[place.code] = scores.get(place.code, 0) + weight
+            chosen.append((place, weight, order))
+        # Earliest mention breaks ties; title mentions come first
+        code = max(scores, key=lambda c: (scores[c], -min(o for p, _, o in chosen if p.code == c)))
+        in_country = [(weight, -order, place) for place, weight, order in chosen if place.code == code]
+        cities = [entry for entry in in_country if entry[2].kind != "country"]
+        self.tagged += 1
+        return max(cities or in_country, key=lambda entry: entry[:2])[2]
+
+    def locate_many(self, texts: Sequence[Tuple[str, str]]) -> List[Optional[Place]]:
+        """``locate`` over (title, description) pairs, compiling the automaton once."""
+        if self._goto is None:
+            self.compile()
+        return [self.locate(title, description) for title, description in texts]
+
+    def tag(self, articles: List[Article]) -> int:
+        """Fill in ``location`` and ``countryCode`` on articles that have no location."""
+        untagged = [article for article in articles if not article.get("location")]
+        places = self.locate_many([(a.get("title") or "", a.get("description") or "") for a in untagged])
+        for article, place in zip(untagged, places):
+            if place is not None:
+                article["location"] = place.to_location()
+                article["countryCode"] = place.code
+        return sum(1 for place in places if place is not None)
+
+    async def stage(self, batch: List[Article], chunk_size: int = 256) -> List[Article]:
+        """Ingestion stage: geotag a batch, yielding to the event loop between chunks."""
+        for start in range(0, len(batch), chunk_size):
+            self.tag(batch[start:start + chunk_size])
+            await asyncio.sleep(0)
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "places": len(self.places),
+            "names": len(self._patterns),
+            "scanned": self.scanned,
+            "tagged": self.tagged,
+        }
+
+
+def load_country_centroids(path: str) -> Dict[str, Tuple[float, float]]:
+    """ISO code -> (lon, lat) from a ``code,latitude,longitude`` CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row["code"]: (float(row["longitude"]), float(row["latitude"])) for row in csv.DictReader(f)}
+
+
+def load_cities(path: str) -> List[Tuple[Place, List[str]]]:
+    """Cities from a CSV or a GeoNames dump (e.g. cities15000.txt).
+
+    The CSV needs ``name,country_code,latitude,longitude`` columns and may have
+    ``population`` and ``alternate_names`` (separated by ``|``). GeoNames
+    alternate names are ignored; they include codes and every language.
+    """
+    cities = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".txt"):
+            for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(row) < 15:
+                    continue
+                place = Place(row[1], row[8], float(row[5]), float(row[4]), "city", int(row[14] or 0))
+                cities.append((place, [row[2]] if row[2] != row[1] else []))
+            return cities
+        for row in csv.DictReader(f):
+            place = Place(
+                row["name"], row["country_code"], float(row["longitude"]), float(row["latitude"]),
+                "city", int(row.get("population") or 0),
+            )
+            aliases = [alias for alias in (row.get("alternate_names") or "").split("|") if alias]
+            cities.append((place, aliases))
+    return cities
+
+
+def build_extractor(country_codes: Dict[str, Dict[str, str]], aliases: Optional[Dict[str, str]] = None,
+                    city_files: Sequence[str] = ()) -> LocationExtractor:
+    """Gazetteer of every COUNTRY_CODES name and alias plus the bundled and given city files."""
+    extractor = LocationExtractor()
+    centroids = load_country_centroids(os.path.join(DATA_DIR, "countries.csv"))
+    names: Dict[str, List[str]] = {}
+    english: Dict[str, str] = {}
+    for name, data in country_codes.items():
+        names.setdefault(data["code"], []).extend((name, data["native"]))
+        english[data["code"]] = data["english"]
+    for alias, code in (aliases or {}).items():
+        names.setdefault(code, []).append(alias)
+    for code, variants in names.items():
+        if code not in centroids or code not in english:
+            continue
+        lon, lat = centroids[code]
+        extractor.add(Place(english[code], code, lon, lat, "country"), variants)
+
+    for path in (os.path.join(DATA_DIR, "cities.csv"), *city_files):
+        try:
+            cities = load_cities(path)
+        except (OSError, KeyError, ValueError) as e:
+            logger.error(f"Could not load gazetteer file {path}: {e!r}")
+            continue
+        for place, city_aliases in cities:
+            extractor.add(place, city_aliases)
+    extractor.block(BLOCKED_NAMES)
+    extractor.compile()
+    return extractor
@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import html
+import json
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from instrumentation import histogram
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = histogram("pulsehub_ingestion_stage_seconds", "Time an ingestion stage spent on one batch",
+                          labels=("stage",))
+
+Article = Dict[str, Any]
+Batch = List[Article]
+StageFn = Callable[[Batch], Awaitable[Batch]]
+
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"\s+")
+
+
+def clean_text(value: Optional[str]) -> str:
+    """Strip markup and collapse whitespace."""
+    if not value:
+        return ""
+    return _SPACES.sub(" ", html.unescape(_TAGS.sub(" ", value))).strip()
+
+
+def parse_date(value: Optional[str]) -> Optional[str]:
+    """RFC 822 (RSS) or ISO 8601 (Atom, JSON APIs) to an ISO 8601 string."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.isoformat()
+
+
+class ConditionalHTTPClient:
+    """One pooled HTTP client for every source, remembering ETag/Last-Modified per URL."""
+
+    def __init__(self, max_connections: int = 20, timeout: float = 15.0):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # Built on the first request: httpx and its TLS setup cost ~0.2s that the sample feed never needs
+        self._client = None
+        self._validators: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.requests = 0
+        self.not_modified = 0
+
+    async def get(self, url: str, params: Optional[Dict[str, str]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+        """Return the response body, or None if the resource hasn't changed."""
+        headers = dict(headers or {})
+        etag, last_modified = self._validators.get(url, (None, None))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        self.requests += 1
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": "PulseHub24/1.0"},
+            )
+        response = await self._client.get(url, params=params, headers=headers)
+        if response.status_code == 304:
+            self.not_modified += 1
+            return None
+        response.raise_for_status()
+        self._validators[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.content
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class Source:
+    """Base class for article sources polled by the pipeline."""
+
+    def __init__(self, name: str, source_type: str, interval: float, seen_limit: int = 2000):
+        self.name = name
+        self.source_type = source_type
+        self.interval = interval
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.seen_limit = seen_limit
+
+    async def fetch(self, http: ConditionalHTTPClient) -> Batch:
+        raise NotImplementedError
+
+    def only_new(self, items: Batch) -> Batch:
+        """Drop items this source already emitted on an earlier poll."""
+        fresh = []
+        for item in items:
+            key = item.get("url") or item.get("title") or ""
+            if key in self._seen:
+                continue
+            self._seen[key] = None
+            fresh.append(item)
+        while len(self._seen) > self.seen_limit:
+            self._seen.popitem(last=False)
+        return fresh
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element: ET.Element, *names: str) -> Optional[str]:
+    for child in element:
+        if _local(child.tag) in names and child.text:
+            return child.text
+    return None
+
+
+def parse_feed(body: bytes) -> Batch:
+    """Parse an RSS 2.0 or Atom document into raw article dicts."""
+    root = ET.fromstring(body)
+    items = []
+    for element in root.iter():
+        tag = _local(element.tag)
+        if tag == "item":
+            link = _child_text(element, "link")
+        elif tag == "entry":
+            link = None
+            for child in element:
+                if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                    break
+        else:
+            continue
+        items.append({
+            "title": _child_text(element, "title"),
+            "description": _child_text(element, "description", "summary"),
+            "content": _child_text(element, "encoded", "content"),
+            "url": link,
+            "publishedAt": _child_text(element, "pubDate", "published", "updated", "date"),
+        })
+    return items
+
+
+class RSSSource(Source):
+    """An RSS or Atom feed."""
+
+    def __init__(self, url: str, name: Optional[str] = None, source_type: str = "big_media",
+                 interval: float = 300.0):
+        super().__init__(name or url, source_type, interval)
+        self.url = url
+
+    async def fetch(self, http: ConditionalHTTPClient) -> Batch:
+        body = await http.get(self.url)
+        if body is None:
+            return []
+        # Parsing is CPU-bound; keep it off the event loop
+        items = await asyncio.get_running_loop().run_in_executor(None, parse_feed, body)
+        for item in items:
+            item["source"] = self.name
+            item["sourceType"] = self.source_type
+        return self.only_new(items)
+
+
+class NewsAPISource(Source):
+    """A NewsAPI-style JSON endpoint returning ``{"articles": [...]}``."""
+
+    def __init__(self, api_key: str, url: str = "https://newsapi.org/v2/top-headlines",
+                 params: Optional[Dict[str, str]] = None, name: str = "NewsAPI",
+                 source_type: str = "big_media", interval: float = 300.0):
+        super().__init__(name, source_type, interval)
+        self.url = url
+        self.api_key = api_key
+        self.params = params or {"language": "en", "pageSize": "100"}
+
+    async def fetch(self, http: ConditionalHTTPClient) -> Batch:
+        body = await http.get(self.url, params=self.params, headers={"X-Api-Key": self.api_key})
+        if body is None:
+            return []
+        items = []
+        for raw in json.loads(body).get("articles", []):
+            items.append({
+                "title": raw.get("title"),
+                "description": raw.get("description"),
+                "content": raw.get("content"),
+                "url": raw.get("url"),
+                "publishedAt": raw.get("publishedAt"),
+                "source": (raw.get("source") or {}).get("name") or self.name,
+                "sourceType": self.source_type,
+            })
+        return self.only_new(items)
+
+
+class FixtureSource(Source):
+    """Local source for development and tests: ``factory()`` yields one article."""
+
+    def __init__(self, factory: Callable[[], Article], count: int = 3, interval: float = 5.0,
+                 name: str = "fixture"):
+        super().__init__(name, "fixture", interval)
+        self.factory = factory
+        self.count = count
+
+    async def fetch(self, http: ConditionalHTTPClient) -> Batch:
+        return [self.factory() for _ in range(self.count)]
+
+
+def normalize_article(raw: Article) -> Optional[Article]:
+    """Bring a raw item into the shape clients expect; None if it's unusable."""
+    title = clean_text(raw.get("title"))
+    url = (raw.get("url") or "").strip()
+    if not title or not url:
+        return None
+    article = dict(raw)
+    article["title"] = title
+    article["url"] = url
+    article["description"] = clean_text(raw.get("description"))
+    article["content"] = clean_text(raw.get("content")) or article["description"]
+    article["publishedAt"] = parse_date(raw.get("publishedAt")) or datetime.now(timezone.utc).isoformat()
+    article.setdefault("id", hashlib.sha1(url.encode("utf-8")).hexdigest()[:16])
+    article.setdefault("sentiment", "neutral")
+    article.setdefault("category", "general")
+    article.setdefault("location", None)
+    return article
+
+
+async def normalize_stage(batch: Batch) -> Batch:
+    return [a for a in (normalize_article(raw) for raw in batch) if a is not None]
+
+
+class StageStats:
+    __slots__ = ("batches", "items_in", "items_out", "errors", "busy_seconds")
+
+    def __init__(self):
+        self.batches = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+
+class IngestionPipeline:
+    """Sources -> normalize -> [stages...] -> publish, connected by bounded queues.
+
+    Each source polls on its own schedule and every stage runs in its own task,
+    so fetching, parsing and publishing overlap. A full queue makes the stage
+    before it wait, which propagates backpressure all the way to the fetchers.
+    """
+
+    def __init__(self, sources: List[Source], publish: StageFn, queue_size: int = 16,
+                 http: Optional[ConditionalHTTPClient] = None):
+        self.sources = sources
+        self.queue_size = queue_size
+        self.http = http or ConditionalHTTPClient()
+        self.stages: List[Tuple[str, StageFn]] = [("normalize", normalize_stage)]
+        self._publish = publish
+        self.stats_by_stage: Dict[str, StageStats] = {}
+        self.fetch_errors: Dict[str, int] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+
+    def add_stage(self, name: str, fn: StageFn) -> None:
+        """Add a batch stage before publish. Must be called before ``start``."""
+        self.stages.append((name, fn))
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._started_at = time.monotonic()
+        stages = self.stages + [("publish", self._publish)]
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        for position, (name, fn) in enumerate(stages):
+            self.stats_by_stage[name] = StageStats()
+            output = self._queues[position + 1] if position + 1 < len(stages) else None
+            self._tasks.append(asyncio.create_task(self._run_stage(name, fn, self._queues[position], output)))
+        for source in self.sources:
+            self._tasks.append(asyncio.create_task(self._poll(source, self._queues[0])))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def close(self) -> None:
+        await self.stop()
+        await self.http.close()
+
+    async def _poll(self, source: Source, output: asyncio.Queue) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                batch = await source.fetch(self.http)
+                if batch:
+                    await output.put(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.fetch_errors[source.name] = self.fetch_errors.get(source.name, 0) + 1
+                logger.warning(f"Fetching {source.name} failed: {e!r}")
+            await asyncio.sleep(max(0.0, source.interval - (time.monotonic() - started)))
+
+    async def _run_stage(self, name: str, fn: StageFn, input: asyncio.Queue,
+                         output: Optional[asyncio.Queue]) -> None:
+        stats = self.stats_by_stage[name]
+        while True:
+            batch = await input.get()
+            started = time.perf_counter()
+            try:
+                result = await fn(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Ingestion stage {name} failed on a batch of {len(batch)}: {e!r}")
+                continue
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.busy_seconds += elapsed
+                STAGE_SECONDS.observe(elapsed, name)
+            stats.batches += 1
+            stats.items_in += len(batch)
+            stats.items_out += len(result or ())
+            if output is not None and result:
+                await output.put(result)
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        stages = {}
+        for position, (name, stats) in enumerate(self.stats_by_stage.items()):
+            stages[name] = {
+                "batches": stats.batches,
+                "itemsIn": stats.items_in,
+                "itemsOut": stats.items_out,
+                "errors": stats.errors,
+                "queueDepth": self._queues[position].qsize() if position < len(self._queues) else 0,
+                "itemsPerSecond": round(stats.items_in / uptime, 3) if uptime else 0.0,
+                "busySeconds": round(stats.busy_seconds, 3),
+            }
+        return {
+            "running": self.running,
+            "sources": [source.name for source in self.sources],
+            "fetchErrors": self.fetch_errors,
+            "httpRequests": self.http.requests,
+            "httpNotModified": self.http.not_modified,
+            "stages": stages,
+        }
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from instrumentation import COUNT_BUCKETS, histogram
+
+logger = logging.getLogger(__name__)
+
+CALL_SECONDS = histogram("pulsehub_llm_call_seconds",
+                         "Model call duration, from getting a slot to the answer or timeout", labels=("client",))
+CONCURRENCY = histogram("pulsehub_llm_concurrency", "Calls in flight when a call starts", labels=("client",),
+                        buckets=COUNT_BUCKETS)
+
+
+class TextResponse:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """Offline stand-in for a generative model: ``respond(prompt)`` returns the text.
+
+    ``latency`` simulates a slow upstream; it blocks, like the real client does.
+    """
+
+    def __init__(self, respond: Callable[[str], str], latency: float = 0.0):
+        self.respond = respond
+        self.latency = latency
+        self.prompts = 0
+
+    def generate_content(self, prompt: str) -> TextResponse:
+        self.prompts += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return TextResponse(self.respond(prompt))
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one shared call."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller going away doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+
+class LLMClient:
+    """Runs blocking model calls off the event loop with a concurrency cap and timeout.
+
+    Calls beyond ``max_concurrency`` wait for a slot, and ``timeout`` only
+    starts once they have one. A call that times out holds its slot until the
+    model actually returns, so the cap counts every busy worker thread.
+    Identical prompts issued while a call is already in flight share its result.
+    ``name`` labels the client's metrics.
+    """
+
+    def __init__(self, model: Any, max_concurrency: int = 4, timeout: float = 30.0, name: str = "default"):
+        self.model = model
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.in_flight = 0
+        self.calls = 0
+        self.deduplicated = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        # Created on first use, inside the event loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._single_flight = SingleFlight()
+
+    def _generate_sync(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt)
+        return response.text
+
+    def _finished(self, future: "asyncio.Future[str]") -> None:
+        # The worker is done, even if the caller stopped waiting for it long ago
+        self.in_flight -= 1
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()
+
+    async def _generate(self, prompt: str) -> str:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        # Wait for a slot before the timeout starts, so queueing behind a burst doesn't count
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, self._generate_sync, prompt)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.calls += 1
+        self.in_flight += 1
+        CONCURRENCY.observe(self.in_flight, self.name)
+        future.add_done_callback(self._finished)
+        started = time.perf_counter()
+        try:
+            # Shielded: a timed-out call keeps its slot until its worker thread returns
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        finally:
+            CALL_SECONDS.observe(time.perf_counter() - started, self.name)
+
+    async def generate(self, prompt: str, key: Optional[str] = None) -> str:
+        """Return the model's text response for ``prompt``.
+
+        Raises ``asyncio.TimeoutError`` if the call takes longer than ``timeout``.
+        """
+        key = key or prompt
+        if key in self._single_flight:
+            self.deduplicated += 1
+        return await self._single_flight.do(key, lambda: self._generate(prompt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inFlight": self.in_flight,
+            "maxConcurrency": self.max_concurrency,
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -1,307 +1,51 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import asyncio
+import hashlib
 import json
 from datetime import datetime
 import random
 import logging
-import google.generativeai as genai
-import os
+import time
+import sys
 from dotenv import load_dotenv
-from typing import List
+from typing import Optional
 from fastapi.responses import JSONResponse
+from backplane import create_backplane
+from countries import COUNTRY_ALIASES, COUNTRY_CODES, default_country_index
+from country_cache import CountryInfoCache
+from dedup import DuplicateIndex
+from enrichment import Enricher, RateLimiter
+from fanout import Broadcaster
+from geotag import build_extractor
+from instrumentation import (REGISTRY, SamplingProfiler, configure_logging, gauge, histogram, monitor_event_loop,
+                             resident_memory_bytes)
+from ingestion import FixtureSource, IngestionPipeline, NewsAPISource, RSSSource
+from llm import LLMClient
+from persistence import ArticleWriter
+from providers import ProviderNotConfigured, create_provider
+from settings import Settings
+from store import ArticleStore, SequenceGenerator, records_to_json
+from subscriptions import Subscription, SubscriptionError, SubscriptionIndex
+from viewport import PostGISViewport, TileCache, ViewportError, ViewportIndex, tiles_for_bbox
+from wire import JSON, MEDIA_TYPES, encode_articles, format_from_accept, negotiate
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
-# Configure Gemini API
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    logger.error("GEMINI_API_KEY environment variable is not set")
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
-
-logger.info("Configuring Gemini API...")
-try:
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel('gemini-pro')
-    logger.info("Gemini API configured successfully")
-except Exception as e:
-    logger.error(f"Failed to configure Gemini API: {str(e)}")
-    raise
-
-app = FastAPI()
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"]
+# Hot-path metrics, served at /metrics
+BROADCAST_TICK_SECONDS = histogram("pulsehub_broadcast_tick_seconds",
+                                   "Time to store and fan out one article batch")
+COUNTRY_INFO_SECONDS = histogram(
+    "pulsehub_country_info_seconds",
+    "/country-info time by phase: cache (lookup, or waiting on a shared fetch), llm, parse and total",
+    labels=("phase",),
 )
 
-# Store connected WebSocket clients
-connected_clients: List[WebSocket] = []
+# Load environment variables
+load_dotenv()
 
-async def broadcast_news():
-    """Periodically broadcast news to all connected clients."""
-    while True:
-        if connected_clients:
-            articles = [generate_news_article() for _ in range(3)]
-            message = {"type": "articles", "articles": articles}
-            
-            # Broadcast to all connected clients
-            disconnected_clients = []
-            for client in connected_clients:
-                try:
-                    await client.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to client: {e}")
-                    disconnected_clients.append(client)
-            
-            # Remove disconnected clients
-            for client in disconnected_clients:
-                connected_clients.remove(client)
-        
-        await asyncio.sleep(5)  # Send updates every 5 seconds
-
-# Add country codes mapping with native names
-COUNTRY_CODES = {
-    # Europe
-    "France": {"code": "FR", "english": "France", "native": "France"},
-    "Deutschland": {"code": "DE", "english": "Germany", "native": "Deutschland"},
-    "Germany": {"code": "DE", "english": "Germany", "native": "Deutschland"},
-    "España": {"code": "ES", "english": "Spain", "native": "España"},
-    "Spain": {"code": "ES", "english": "Spain", "native": "España"},
-    "Italia": {"code": "IT", "english": "Italy", "native": "Italia"},
-    "Italy": {"code": "IT", "english": "Italy", "native": "Italia"},
-    "United Kingdom": {"code": "GB", "english": "United Kingdom", "native": "United Kingdom"},
-    "Great Britain": {"code": "GB", "english": "United Kingdom", "native": "United Kingdom"},
-    "Portugal": {"code": "PT", "english": "Portugal", "native": "Portugal"},
-    "Nederland": {"code": "NL", "english": "Netherlands", "native": "Nederland"},
-    "Netherlands": {"code": "NL", "english": "Netherlands", "native": "Nederland"},
-    "Polska": {"code": "PL", "english": "Poland", "native": "Polska"},
-    "Poland": {"code": "PL", "english": "Poland", "native": "Polska"},
-    "Sverige": {"code": "SE", "english": "Sweden", "native": "Sverige"},
-    "Sweden": {"code": "SE", "english": "Sweden", "native": "Sverige"},
-    "Norge": {"code": "NO", "english": "Norway", "native": "Norge"},
-    "Norway": {"code": "NO", "english": "Norway", "native": "Norge"},
-    "Slovensko": {"code": "SK", "english": "Slovakia", "native": "Slovensko"},
-    "Slovakia": {"code": "SK", "english": "Slovakia", "native": "Slovensko"},
-    "België": {"code": "BE", "english": "Belgium", "native": "België"},
-    "Belgium": {"code": "BE", "english": "Belgium", "native": "België"},
-    "Belgique": {"code": "BE", "english": "Belgium", "native": "België"},
-    "Україна": {"code": "UA", "english": "Ukraine", "native": "Україна"},
-    "Ukraine": {"code": "UA", "english": "Ukraine", "native": "Україна"},
-    "Беларусь": {"code": "BY", "english": "Belarus", "native": "Беларусь"},
-    "Belarus": {"code": "BY", "english": "Belarus", "native": "Беларусь"},
-    "România": {"code": "RO", "english": "Romania", "native": "România"},
-    "Romania": {"code": "RO", "english": "Romania", "native": "România"},
-    "България": {"code": "BG", "english": "Bulgaria", "native": "България"},
-    "Bulgaria": {"code": "BG", "english": "Bulgaria", "native": "България"},
-    "Ελλάδα": {"code": "GR", "english": "Greece", "native": "Ελλάδα"},
-    "Greece": {"code": "GR", "english": "Greece", "native": "Ελλάδα"},
-    "Suomi": {"code": "FI", "english": "Finland", "native": "Suomi"},
-    "Finland": {"code": "FI", "english": "Finland", "native": "Suomi"},
-    "Danmark": {"code": "DK", "english": "Denmark", "native": "Danmark"},
-    "Denmark": {"code": "DK", "english": "Denmark", "native": "Danmark"},
-    "Österreich": {"code": "AT", "english": "Austria", "native": "Österreich"},
-    "Austria": {"code": "AT", "english": "Austria", "native": "Österreich"},
-    "Schweiz": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
-    "Switzerland": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
-    "Suisse": {"code": "CH", "english": "Switzerland", "native": "Schweiz"},
-    "Ireland": {"code": "IE", "english": "Ireland", "native": "Ireland"},
-    "Éire": {"code": "IE", "english": "Ireland", "native": "Éire"},
-    "Česko": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
-    "Czech Republic": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
-    "Česká republika": {"code": "CZ", "english": "Czech Republic", "native": "Česko"},
-    "Magyarország": {"code": "HU", "english": "Hungary", "native": "Magyarország"},
-    "Hungary": {"code": "HU", "english": "Hungary", "native": "Magyarország"},
-    "Slovenija": {"code": "SI", "english": "Slovenia", "native": "Slovenija"},
-    "Slovenia": {"code": "SI", "english": "Slovenia", "native": "Slovenija"},
-    "Hrvatska": {"code": "HR", "english": "Croatia", "native": "Hrvatska"},
-    "Croatia": {"code": "HR", "english": "Croatia", "native": "Hrvatska"},
-    "Србија": {"code": "RS", "english": "Serbia", "native": "Србија"},
-    "Serbia": {"code": "RS", "english": "Serbia", "native": "Србија"},
-    "Црна Гора": {"code": "ME", "english": "Montenegro", "native": "Црна Гора"},
-    "Montenegro": {"code": "ME", "english": "Montenegro", "native": "Црна Гора"},
-    "Северна Македонија": {"code": "MK", "english": "North Macedonia", "native": "Северна Македонија"},
-    "North Macedonia": {"code": "MK", "english": "North Macedonia", "native": "Северна Македонија"},
-    "Albania": {"code": "AL", "english": "Albania", "native": "Shqipëria"},
-    "Shqipëria": {"code": "AL", "english": "Albania", "native": "Shqipëria"},
-    "Moldova": {"code": "MD", "english": "Moldova", "native": "Moldova"},
-    "Latvija": {"code": "LV", "english": "Latvia", "native": "Latvija"},
-    "Latvia": {"code": "LV", "english": "Latvia", "native": "Latvija"},
-    "Eesti": {"code": "EE", "english": "Estonia", "native": "Eesti"},
-    "Estonia": {"code": "EE", "english": "Estonia", "native": "Eesti"},
-    "Lietuva": {"code": "LT", "english": "Lithuania", "native": "Lietuva"},
-    "Lithuania": {"code": "LT", "english": "Lithuania", "native": "Lietuva"},
-    "Iceland": {"code": "IS", "english": "Iceland", "native": "Ísland"},
-    "Ísland": {"code": "IS", "english": "Iceland", "native": "Ísland"},
-    
-    # Asia
-    "中国": {"code": "CN", "english": "China", "native": "中国"},
-    "China": {"code": "CN", "english": "China", "native": "中国"},
-    "日本": {"code": "JP", "english": "Japan", "native": "日本"},
-    "Japan": {"code": "JP", "english": "Japan", "native": "日本"},
-    "대한민국": {"code": "KR", "english": "South Korea", "native": "대한민국"},
-    "South Korea": {"code": "KR", "english": "South Korea", "native": "대한민국"},
-    "Korea": {"code": "KR", "english": "South Korea", "native": "대한민국"},
-    "조선민주주의인민공화국": {"code": "KP", "english": "North Korea", "native": "조선민주주의인민공화국"},
-    "North Korea": {"code": "KP", "english": "North Korea", "native": "조선민주주의인민공화국"},
-    "भारत": {"code": "IN", "english": "India", "native": "भारत"},
-    "India": {"code": "IN", "english": "India", "native": "भारत"},
-    "Indonesia": {"code": "ID", "english": "Indonesia", "native": "Indonesia"},
-    "Vietnam": {"code": "VN", "english": "Vietnam", "native": "Việt Nam"},
-    "Việt Nam": {"code": "VN", "english": "Vietnam", "native": "Việt Nam"},
-    "Thailand": {"code": "TH", "english": "Thailand", "native": "ประเทศไทย"},
-    "ประเทศไทย": {"code": "TH", "english": "Thailand", "native": "ประเทศไทย"},
-    "Malaysia": {"code": "MY", "english": "Malaysia", "native": "Malaysia"},
-    "Philippines": {"code": "PH", "english": "Philippines", "native": "Philippines"},
-    "Pilipinas": {"code": "PH", "english": "Philippines", "native": "Pilipinas"},
-    "Singapore": {"code": "SG", "english": "Singapore", "native": "Singapore"},
-    "Pakistan": {"code": "PK", "english": "Pakistan", "native": "پاکستان"},
-    "Bangladesh": {"code": "BD", "english": "Bangladesh", "native": "বাংলাদেশ"},
-    "Sri Lanka": {"code": "LK", "english": "Sri Lanka", "native": "ශ්‍රී ලංකා"},
-    "Myanmar": {"code": "MM", "english": "Myanmar", "native": "မြန်မာ"},
-    "Cambodia": {"code": "KH", "english": "Cambodia", "native": "កម្ពុជា"},
-    "Laos": {"code": "LA", "english": "Laos", "native": "ລາວ"},
-    "Mongolia": {"code": "MN", "english": "Mongolia", "native": "Монгол"},
-    "Taiwan": {"code": "TW", "english": "Taiwan", "native": "臺灣"},
-    "臺灣": {"code": "TW", "english": "Taiwan", "native": "臺灣"},
-    "Kazakhstan": {"code": "KZ", "english": "Kazakhstan", "native": "Қазақстан"},
-    "Қазақстан": {"code": "KZ", "english": "Kazakhstan", "native": "Қазақстан"},
-    "Uzbekistan": {"code": "UZ", "english": "Uzbekistan", "native": "O'zbekiston"},
-    "O'zbekiston": {"code": "UZ", "english": "Uzbekistan", "native": "O'zbekiston"},
-    "Kyrgyzstan": {"code": "KG", "english": "Kyrgyzstan", "native": "Кыргызстан"},
-    "Кыргызстан": {"code": "KG", "english": "Kyrgyzstan", "native": "Кыргызстан"},
-    "Tajikistan": {"code": "TJ", "english": "Tajikistan", "native": "Тоҷикистон"},
-    "Тоҷикистон": {"code": "TJ", "english": "Tajikistan", "native": "Тоҷикистон"},
-    "Turkmenistan": {"code": "TM", "english": "Turkmenistan", "native": "Türkmenistan"},
-    "Türkmenistan": {"code": "TM", "english": "Turkmenistan", "native": "Türkmenistan"},
-    
-    # Americas
-    "United States": {"code": "US", "english": "United States", "native": "United States"},
-    "USA": {"code": "US", "english": "United States", "native": "United States"},
-    "Canada": {"code": "CA", "english": "Canada", "native": "Canada"},
-    "Brasil": {"code": "BR", "english": "Brazil", "native": "Brasil"},
-    "Brazil": {"code": "BR", "english": "Brazil", "native": "Brasil"},
-    "México": {"code": "MX", "english": "Mexico", "native": "México"},
-    "Mexico": {"code": "MX", "english": "Mexico", "native": "México"},
-    "Argentina": {"code": "AR", "english": "Argentina", "native": "Argentina"},
-    "Colombia": {"code": "CO", "english": "Colombia", "native": "Colombia"},
-    "Chile": {"code": "CL", "english": "Chile", "native": "Chile"},
-    "Peru": {"code": "PE", "english": "Peru", "native": "Perú"},
-    "Perú": {"code": "PE", "english": "Peru", "native": "Perú"},
-    "Venezuela": {"code": "VE", "english": "Venezuela", "native": "Venezuela"},
-    "Ecuador": {"code": "EC", "english": "Ecuador", "native": "Ecuador"},
-    "Bolivia": {"code": "BO", "english": "Bolivia", "native": "Bolivia"},
-    "Paraguay": {"code": "PY", "english": "Paraguay", "native": "Paraguay"},
-    "Uruguay": {"code": "UY", "english": "Uruguay", "native": "Uruguay"},
-    "Cuba": {"code": "CU", "english": "Cuba", "native": "Cuba"},
-    "Dominican Republic": {"code": "DO", "english": "Dominican Republic", "native": "República Dominicana"},
-    "República Dominicana": {"code": "DO", "english": "Dominican Republic", "native": "República Dominicana"},
-    "Haiti": {"code": "HT", "english": "Haiti", "native": "Haïti"},
-    "Haïti": {"code": "HT", "english": "Haiti", "native": "Haïti"},
-    "Guatemala": {"code": "GT", "english": "Guatemala", "native": "Guatemala"},
-    "El Salvador": {"code": "SV", "english": "El Salvador", "native": "El Salvador"},
-    "Honduras": {"code": "HN", "english": "Honduras", "native": "Honduras"},
-    "Nicaragua": {"code": "NI", "english": "Nicaragua", "native": "Nicaragua"},
-    "Costa Rica": {"code": "CR", "english": "Costa Rica", "native": "Costa Rica"},
-    "Panama": {"code": "PA", "english": "Panama", "native": "Panamá"},
-    "Panamá": {"code": "PA", "english": "Panama", "native": "Panamá"},
-    
-    # Middle East
-    "مصر": {"code": "EG", "english": "Egypt", "native": "مصر"},
-    "Egypt": {"code": "EG", "english": "Egypt", "native": "مصر"},
-    "السعودية": {"code": "SA", "english": "Saudi Arabia", "native": "السعودية"},
-    "Saudi Arabia": {"code": "SA", "english": "Saudi Arabia", "native": "السعودية"},
-    "ایران": {"code": "IR", "english": "Iran", "native": "ایران"},
-    "Iran": {"code": "IR", "english": "Iran", "native": "ایران"},
-    "Türkiye": {"code": "TR", "english": "Turkey", "native": "Türkiye"},
-    "Turkey": {"code": "TR", "english": "Turkey", "native": "Türkiye"},
-    "العراق": {"code": "IQ", "english": "Iraq", "native": "العراق"},
-    "Iraq": {"code": "IQ", "english": "Iraq", "native": "العراق"},
-    "سوريا": {"code": "SY", "english": "Syria", "native": "سوريا"},
-    "Syria": {"code": "SY", "english": "Syria", "native": "سوريا"},
-    "الأردن": {"code": "JO", "english": "Jordan", "native": "الأردن"},
-    "Jordan": {"code": "JO", "english": "Jordan", "native": "الأردن"},
-    "لبنان": {"code": "LB", "english": "Lebanon", "native": "لبنان"},
-    "Lebanon": {"code": "LB", "english": "Lebanon", "native": "لبنان"},
-    "Israel": {"code": "IL", "english": "Israel", "native": "ישראל"},
-    "ישראל": {"code": "IL", "english": "Israel", "native": "ישראל"},
-    "الإمارات": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
-    "United Arab Emirates": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
-    "UAE": {"code": "AE", "english": "United Arab Emirates", "native": "الإمارات"},
-    "قطر": {"code": "QA", "english": "Qatar", "native": "قطر"},
-    "Qatar": {"code": "QA", "english": "Qatar", "native": "قطر"},
-    "البحرين": {"code": "BH", "english": "Bahrain", "native": "البحرين"},
-    "Bahrain": {"code": "BH", "english": "Bahrain", "native": "البحرين"},
-    "عمان": {"code": "OM", "english": "Oman", "native": "عمان"},
-    "Oman": {"code": "OM", "english": "Oman", "native": "عمان"},
-    "الكويت": {"code": "KW", "english": "Kuwait", "native": "الكويت"},
-    "Kuwait": {"code": "KW", "english": "Kuwait", "native": "الكويت"},
-    "اليمن": {"code": "YE", "english": "Yemen", "native": "اليمن"},
-    "Yemen": {"code": "YE", "english": "Yemen", "native": "اليمن"},
-    
-    # Africa
-    "South Africa": {"code": "ZA", "english": "South Africa", "native": "South Africa"},
-    "Nigeria": {"code": "NG", "english": "Nigeria", "native": "Nigeria"},
-    "Kenya": {"code": "KE", "english": "Kenya", "native": "Kenya"},
-    "المغرب": {"code": "MA", "english": "Morocco", "native": "المغرب"},
-    "Morocco": {"code": "MA", "english": "Morocco", "native": "المغرب"},
-    "Maroc": {"code": "MA", "english": "Morocco", "native": "المغرب"},
-    "ليبيا": {"code": "LY", "english": "Libya", "native": "ليبيا"},
-    "Libya": {"code": "LY", "english": "Libya", "native": "ليبيا"},
-    "تونس": {"code": "TN", "english": "Tunisia", "native": "تونس"},
-    "Tunisia": {"code": "TN", "english": "Tunisia", "native": "تونس"},
-    "الجزائر": {"code": "DZ", "english": "Algeria", "native": "الجزائر"},
-    "Algeria": {"code": "DZ", "english": "Algeria", "native": "الجزائر"},
-    "Ethiopia": {"code": "ET", "english": "Ethiopia", "native": "ኢትዮጵያ"},
-    "Ghana": {"code": "GH", "english": "Ghana", "native": "Ghana"},
-    "Tanzania": {"code": "TZ", "english": "Tanzania", "native": "Tanzania"},
-    "Uganda": {"code": "UG", "english": "Uganda", "native": "Uganda"},
-    "Angola": {"code": "AO", "english": "Angola", "native": "Angola"},
-    "Mozambique": {"code": "MZ", "english": "Mozambique", "native": "Moçambique"},
-    "Zimbabwe": {"code": "ZW", "english": "Zimbabwe", "native": "Zimbabwe"},
-    "Sudan": {"code": "SD", "english": "Sudan", "native": "السودان"},
-    "السودان": {"code": "SD", "english": "Sudan", "native": "السودان"},
-    "Senegal": {"code": "SN", "english": "Senegal", "native": "Sénégal"},
-    "Sénégal": {"code": "SN", "english": "Senegal", "native": "Sénégal"},
-    "Cameroon": {"code": "CM", "english": "Cameroon", "native": "Cameroun"},
-    "Cameroun": {"code": "CM", "english": "Cameroon", "native": "Cameroun"},
-    "Côte d'Ivoire": {"code": "CI", "english": "Ivory Coast", "native": "Côte d'Ivoire"},
-    "Ivory Coast": {"code": "CI", "english": "Ivory Coast", "native": "Côte d'Ivoire"},
-    "Madagascar": {"code": "MG", "english": "Madagascar", "native": "Madagascar"},
-    "Mali": {"code": "ML", "english": "Mali", "native": "Mali"},
-    "Burkina Faso": {"code": "BF", "english": "Burkina Faso", "native": "Burkina Faso"},
-    "Niger": {"code": "NE", "english": "Niger", "native": "Niger"},
-    "Chad": {"code": "TD", "english": "Chad", "native": "Tchad"},
-    "Tchad": {"code": "TD", "english": "Chad", "native": "Tchad"},
-    "Somalia": {"code": "SO", "english": "Somalia", "native": "Soomaaliya"},
-    "Soomaaliya": {"code": "SO", "english": "Somalia", "native": "Soomaaliya"},
-    
-    # Oceania
-    "Australia": {"code": "AU", "english": "Australia", "native": "Australia"},
-    "New Zealand": {"code": "NZ", "english": "New Zealand", "native": "New Zealand"},
-    "Papua New Guinea": {"code": "PG", "english": "Papua New Guinea", "native": "Papua New Guinea"},
-    "Fiji": {"code": "FJ", "english": "Fiji", "native": "Fiji"},
-    "Solomon Islands": {"code": "SB", "english": "Solomon Islands", "native": "Solomon Islands"},
-    "Vanuatu": {"code": "VU", "english": "Vanuatu", "native": "Vanuatu"},
-    "New Caledonia": {"code": "NC", "english": "New Caledonia", "native": "Nouvelle-Calédonie"},
-    "Nouvelle-Calédonie": {"code": "NC", "english": "New Caledonia", "native": "Nouvelle-Calédonie"},
-    "French Polynesia": {"code": "PF", "english": "French Polynesia", "native": "Polynésie française"},
-    "Polynésie française": {"code": "PF", "english": "French Polynesia", "native": "Polynésie française"},
-    
-    # Others
-    "Россия": {"code": "RU", "english": "Russia", "native": "Россия"},
-    "Russia": {"code": "RU", "english": "Russia", "native": "Россия"}
-}
+ARTICLES_CHANNEL = "articles"
 
 # Sample news data
 def generate_news_article():
@@ -333,113 +77,640 @@ def generate_news_article():
         "location": location
     }
 
-@app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    connected_clients.append(websocket)
-    try:
+def parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+def parse_filters(categories: Optional[str], sentiments: Optional[str]) -> Subscription:
+    """Comma-separated category and sentiment query parameters as a subscription."""
+    message = {}
+    if categories:
+        message["categories"] = categories.split(",")
+    if sentiments:
+        message["sentiments"] = sentiments.split(",")
+    return Subscription.from_message(message)
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the app and its components from ``settings``, by default the environment.
+
+    Nothing here calls a model or opens a connection: the LLM provider is built
+    on the first model call, and the backplane, feed and database start with
+    the server.
+    """
+    settings = settings or Settings()
+    # LOG_FORMAT=json writes one JSON object per line
+    configure_logging(settings.log_level, settings.log_format)
+    
+    # One provider for every model call; its SDK is imported on first use
+    model = create_provider(settings)
+    if not getattr(model, "configured", True):
+        logger.warning(f"The {settings.llm_provider} provider has no API key; /country-info will answer 503")
+    llm = LLMClient(
+        model,
+        max_concurrency=settings.llm_max_concurrency,
+        timeout=settings.llm_timeout,
+        name="country-info",
+    )
+    
+    app = FastAPI()
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"]
+    )
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+    # Name -> ISO code resolution, built once per process and shared by every app
+    country_index = default_country_index()
+
+    # Country information cache: bounded in-memory LRU backed by SQLite
+    country_cache = CountryInfoCache(
+        path=settings.country_cache_path,
+        max_entries=settings.country_cache_size,
+        ttl=settings.country_cache_ttl,
+        stale_ttl=settings.country_cache_stale_ttl,
+    )
+
+    # Fan-out engine for connected WebSocket clients
+    broadcaster = Broadcaster(
+        max_queue=settings.ws_client_queue_size,
+        evict_after_drops=settings.ws_evict_after_drops,
+        send_timeout=settings.ws_send_timeout,
+    )
+
+    # Per-client subscription filters, indexed by map grid cell
+    subscriptions = SubscriptionIndex(cell_size=settings.ws_grid_cell_degrees)
+
+    # Article batches travel over the backplane so every worker process sees the same feed
+    backplane = create_backplane(settings.backplane_url)
+
+    async def produce_news():
+        """Run the ingestion pipeline while this process is the elected leader."""
         while True:
-            data = await websocket.receive_text()
+            if await backplane.is_leader():
+                pipeline.start()
+            elif pipeline.running:
+                logger.info("Lost backplane leadership, stopping ingestion")
+                await pipeline.stop()
+            
+            await asyncio.sleep(5)  # Leadership is re-checked every 5 seconds
+
+    # Map clustering over the stored articles, kept in step with the store
+    viewport_index = ViewportIndex(
+        max_level=settings.viewport_max_level,
+        points_zoom=settings.viewport_points_zoom,
+        max_points=settings.viewport_max_points,
+    )
+
+    # Recent articles in this worker, for snapshots, resume and history queries
+    article_store = ArticleStore(capacity=settings.article_store_size, listeners=[viewport_index])
+    next_seq = SequenceGenerator()
+
+    async def broadcast_news():
+        """Broadcast news from the backplane to this worker's connected clients."""
+        async for data in backplane.subscribe(ARTICLES_CHANNEL):
+            started = time.perf_counter()
+            try:
+                articles = json.loads(data)
+                article_store.extend(articles)
+                if len(broadcaster):
+                    # Routed by subscription, encoded once per distinct article set and queued
+                    # per client; slow clients never block the loop
+                    broadcaster.publish_articles(articles, subscriptions)
+            except Exception:
+                # One bad batch must not stop this worker's live feed
+                logger.exception(f"Broadcasting a batch of {len(data)} bytes failed")
+                continue
+            BROADCAST_TICK_SECONDS.observe(time.perf_counter() - started)
+
+    def configured_sources() -> list:
+        """Sources from the environment; the sample generator if none are configured."""
+        sources = [RSSSource(url) for url in settings.rss_feeds]
+        if settings.news_api_key:
+            sources.append(NewsAPISource(settings.news_api_key))
+        if not sources:
+            # SAMPLE_BATCH_SIZE/SAMPLE_INTERVAL let load tests raise the sample feed rate
+            sources.append(FixtureSource(
+                generate_news_article,
+                count=settings.sample_batch_size,
+                interval=settings.sample_interval,
+            ))
+        return sources
+
+    async def publish_to_backplane(articles: list) -> list:
+        # The cursor clients use to resume; assigned once here so every worker agrees
+        for article in articles:
+            article["seq"] = next_seq()
+        await backplane.publish(ARTICLES_CHANNEL, json.dumps(articles).encode("utf-8"))
+        return articles
+
+    # Fetch -> normalize -> dedup -> geotag -> enrich -> persist -> publish, each stage in its own task behind a bounded queue
+    pipeline = IngestionPipeline(
+        configured_sources(),
+        publish_to_backplane,
+        queue_size=settings.ingest_queue_size,
+    )
+
+    # Exact and near-duplicate detection over a sliding window of recent articles
+    dedup_index = DuplicateIndex(
+        window_seconds=settings.dedup_window_seconds,
+        max_entries=settings.dedup_max_entries,
+        threshold=settings.dedup_threshold,
+    )
+    # The sample generator repeats the same few headlines by design, so it skips dedup
+    if not all(isinstance(source, FixtureSource) for source in pipeline.sources):
+        pipeline.add_stage("dedup", dedup_index.stage)
+
+    # Gazetteer geotagging for articles that arrive without a location;
+    # GAZETTEER_CITIES adds comma-separated city files (CSV or GeoNames dumps)
+    location_extractor = build_extractor(
+        COUNTRY_CODES, COUNTRY_ALIASES,
+        city_files=settings.gazetteer_cities,
+    )
+    pipeline.add_stage("geotag", location_extractor.stage)
+
+    # Sentiment, category and summary, many articles per model call within the
+    # quota; ENRICH_WITH_LLM=0 (the default) uses the local keyword classifier only
+    enrichment_llm = None
+    if settings.enrich_with_llm:
+        enrichment_llm = LLMClient(
+            model,
+            max_concurrency=settings.enrich_max_concurrency,
+            timeout=settings.enrich_timeout,
+            name="enrichment",
+        )
+    enricher = Enricher(
+        enrichment_llm,
+        RateLimiter(
+            requests_per_minute=settings.enrich_requests_per_minute,
+            tokens_per_minute=settings.enrich_tokens_per_minute,
+        ),
+        max_prompt_tokens=settings.enrich_max_prompt_tokens,
+        cost_per_1k_input=settings.enrich_cost_per_1k_input,
+        cost_per_1k_output=settings.enrich_cost_per_1k_output,
+    )
+    # Sample articles already carry sentiment and category
+    if not all(isinstance(source, FixtureSource) for source in pipeline.sources):
+        pipeline.add_stage("enrich", enricher.stage)
+
+    # Optional Postgres persistence, batched in the background so it never holds up the feed
+    database_url = settings.database_url
+    article_writer = None
+    if database_url:
+        article_writer = ArticleWriter(
+            database_url,
+            batch_size=settings.db_batch_size,
+            flush_interval=settings.db_flush_interval,
+            pool_size=settings.db_pool_size,
+            partitioned=settings.db_partitioned,
+            retention_days=settings.db_retention_days,
+        )
+        pipeline.add_stage("persist", article_writer.stage)
+
+    # Viewport tiles, cached briefly per tile and filters. VIEWPORT_BACKEND=postgis
+    # clusters everything persisted in the last VIEWPORT_WINDOW_HOURS instead
+    viewport_source = viewport_index
+    if settings.viewport_backend == "postgis":
+        if database_url:
+            viewport_source = PostGISViewport(
+                database_url,
+                window_hours=settings.viewport_window_hours,
+                points_zoom=viewport_index.points_zoom,
+                max_points=viewport_index.max_points,
+            )
+        else:
+            logger.warning("VIEWPORT_BACKEND=postgis needs DATABASE_URL; using the in-memory index")
+    viewport_tiles = TileCache(viewport_source, ttl=settings.viewport_cache_ttl)
+
+    def replay_articles(client, subscription=None, cursor: Optional[int] = None,
+                        limit: Optional[int] = None) -> None:
+        """Queue stored articles for one client: everything after ``cursor``, or the latest snapshot."""
+        predicate = None
+        if subscription is not None:
+            predicate = lambda r: subscription.matches_fields(r.category, r.sentiment, r.source_type, r.lon, r.lat)
+        if limit is None:
+            limit = settings.ws_snapshot_size
+        next_cursor = None
+        if cursor is not None:
+            records = article_store.query(after=cursor, limit=settings.ws_replay_limit, predicate=predicate)
+            if len(records) == settings.ws_replay_limit:
+                # More are stored after this page; the client sends {"type": "update", "cursor": nextCursor}
+                # for the next one, skipping any seq it has already had live
+                next_cursor = records[-1].seq
+        else:
+            records = list(reversed(article_store.query(limit=limit, predicate=predicate)))
+        message = {
+            "type": "articles",
+            "replay": True,
+            # The client missed articles that are no longer in memory
+            "truncated": cursor is not None and cursor < article_store.last_evicted_seq,
+            "nextCursor": next_cursor,
+            "articles": [record.article() for record in records],
+        }
+        client.enqueue(encode_articles(message, client.wire_format, client.compression))
+
+    def handle_client_message(client, data: str) -> None:
+        """Apply a subscribe/update message from a WebSocket client."""
+        try:
+            message = json.loads(data)
+        except json.JSONDecodeError:
+            message = None
+        if not isinstance(message, dict) or message.get("type") not in ("subscribe", "update"):
             # Echo the received data back to the client
-            await websocket.send_text(f"Message text was: {data}")
-    except WebSocketDisconnect:
-        connected_clients.remove(websocket)
-        logger.info("Client disconnected")
-
-@app.get("/")
-async def root():
-    """Health check endpoint"""
-    return {"status": "ok", "message": "PulseHub24 Backend API"}
-
-@app.post("/country-info")
-async def get_country_info(request: Request):
-    try:
-        logger.info(f"Received request to /country-info at {datetime.now()}")
+            client.enqueue(f"Message text was: {data}")
+            return
         
-        # Handle preflight requests
-        if request.method == "OPTIONS":
-            return Response(
-                status_code=200,
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                }
-            )
+        # "subscribe" replaces the filters, "update" only changes the fields it carries
+        base = subscriptions.subscriptions.get(client) if message["type"] == "update" else None
+        try:
+            subscription = Subscription.from_message(message, base)
+        except SubscriptionError as e:
+            client.enqueue(json.dumps({"type": "error", "error": str(e)}))
+            return
+        subscriptions.subscribe(client, subscription)
+        client.enqueue(json.dumps({"type": "subscribed", "subscription": subscription.to_dict()}))
         
-        data = await request.json()
-        logger.info(f"Request data: {data}")
+        # Optionally send what's already in memory that matches the new filters
+        if isinstance(message.get("cursor"), int):
+            replay_articles(client, subscription, cursor=message["cursor"])
+        elif isinstance(message.get("snapshot"), int) and message["snapshot"] > 0:
+            replay_articles(client, subscription, limit=min(message["snapshot"], settings.ws_replay_limit))
+
+    @app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        await websocket.accept()
+        # Article batches use the requested encoding (?format=columnar|msgpack&compression=zstd)
+        wire_format, compression = negotiate(
+            websocket.query_params.get("format"), websocket.query_params.get("compression")
+        )
+        client = broadcaster.register(websocket, wire_format, compression)
+        # Until the client subscribes it receives every article
+        subscriptions.subscribe(client, Subscription())
         
-        country = data.get("country")
-        if not country:
-            logger.error("Country name is missing")
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Country name is required"}
-            )
+        # Reconnects pass ?cursor=<last seq seen> to get only what they missed;
+        # new clients get the latest ?snapshot=N articles (0 to skip)
+        try:
+            cursor = int(websocket.query_params["cursor"]) if "cursor" in websocket.query_params else None
+            snapshot = int(websocket.query_params.get("snapshot", settings.ws_snapshot_size))
+        except ValueError:
+            cursor, snapshot = None, settings.ws_snapshot_size
+        if cursor is not None:
+            replay_articles(client, cursor=cursor)
+        elif snapshot > 0:
+            replay_articles(client, limit=min(snapshot, settings.ws_replay_limit))
+        try:
+            while True:
+                data = await websocket.receive_text()
+                handle_client_message(client, data)
+        except WebSocketDisconnect:
+            logger.info("Client disconnected")
+        finally:
+            subscriptions.remove(client)
+            await broadcaster.unregister(client)
+
+    @app.get("/articles/history")
+    async def article_history(request: Request, country: Optional[str] = None, category: Optional[str] = None,
+                              sentiment: Optional[str] = None, since: Optional[str] = None,
+                              until: Optional[str] = None, cursor: Optional[int] = None, limit: int = 100):
+        """Recent articles, newest first. Pass the returned nextCursor as cursor for the next page."""
+        try:
+            since_ts, until_ts = parse_time(since), parse_time(until)
+        except ValueError:
+            return JSONResponse(status_code=400, content={"error": "since/until must be ISO 8601 timestamps"})
+        if country is not None:
+            country = country_index.resolve_code(country) or country
         
-        logger.info(f"Processing request for country: {country}")
+        records = article_store.query(
+            country=country, category=category, sentiment=sentiment, since=since_ts, until=until_ts,
+            before=cursor, limit=max(1, min(limit, 1000)),
+        )
+        next_cursor = records[-1].seq if len(records) == max(1, min(limit, 1000)) else None
         
-        # Get country code and names
-        country_data = COUNTRY_CODES.get(country, {"code": "UN", "english": country, "native": country})
-        logger.info(f"Country data: {country_data}")
+        wire_format = format_from_accept(request.headers.get("accept"))
+        if wire_format == JSON:
+            # Stored articles are already JSON-encoded; splice them instead of re-encoding
+            body = b'{"articles":' + records_to_json(records) + b',"nextCursor":' + json.dumps(next_cursor).encode() + b"}"
+            return Response(content=body, media_type=MEDIA_TYPES[JSON])
+        message = {"type": "articles", "nextCursor": next_cursor, "articles": [r.article() for r in records]}
+        return Response(content=encode_articles(message, wire_format), media_type=MEDIA_TYPES[wire_format])
+
+    @app.get("/articles/viewport")
+    async def articles_in_viewport(bbox: str, zoom: int, categories: Optional[str] = None,
+                                   sentiments: Optional[str] = None):
+        """Articles in a map viewport (bbox=west,south,east,north): clusters with their
+        sentiment mix, or the articles themselves once zoomed in far enough."""
+        if not 0 <= zoom <= 22:
+            return JSONResponse(status_code=400, content={"error": "zoom must be between 0 and 22"})
+        try:
+            filters = parse_filters(categories, sentiments)
+            viewport = Subscription.from_message({"bbox": bbox.split(",")})
+            tiles = tiles_for_bbox(viewport.bbox, zoom, settings.viewport_max_tiles)
+        except (SubscriptionError, ViewportError) as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+        
+        try:
+            results = await asyncio.gather(*(
+                viewport_tiles.get(zoom, x, y, filters.categories, filters.sentiments) for x, y in tiles
+            ))
+        except Exception as e:
+            logger.error(f"Viewport query failed: {e!r}")
+            return JSONResponse(status_code=503, content={"error": "Viewport data is unavailable"})
+        return JSONResponse(
+            content={
+                "zoom": zoom,
+                "tiles": [[zoom, x, y] for x, y in tiles],
+                "clusters": [cluster for result in results for cluster in result["clusters"]],
+                "articles": [article for result in results for article in result["articles"]],
+                "truncated": any(result.get("truncated") for result in results),
+            },
+            headers={"Cache-Control": f"public, max-age={int(settings.viewport_cache_ttl)}"}
+        )
+
+    @app.get("/articles/tiles/{z}/{x}/{y}")
+    async def article_tile(request: Request, z: int, x: int, y: int, categories: Optional[str] = None,
+                           sentiments: Optional[str] = None):
+        """One viewport tile; the stable URL lets browsers and CDNs cache it."""
+        if not (0 <= z <= 22 and 0 <= x < 1 << z and 0 <= y < 1 << z):
+            return JSONResponse(status_code=400, content={"error": "Tile is out of range"})
+        try:
+            filters = parse_filters(categories, sentiments)
+        except SubscriptionError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
         
         try:
-            # Create the prompt for Gemini
-            prompt = f"""Provide information about {country_data['english']} in the following JSON format:
-            {{
-                "summary": "A brief 2-sentence summary of the country",
-                "capital": "The capital city",
-                "area": "The total area in square kilometers",
-                "funFact": "An interesting fun fact about the country"
-            }}"""
+            result = await viewport_tiles.get(z, x, y, filters.categories, filters.sentiments)
+        except Exception as e:
+            logger.error(f"Tile {z}/{x}/{y} failed: {e!r}")
+            return JSONResponse(status_code=503, content={"error": "Viewport data is unavailable"})
+        body = json.dumps({"zoom": z, "x": x, "y": y, **result}, separators=(",", ":")).encode()
+        headers = {
+            "Cache-Control": f"public, max-age={int(settings.viewport_cache_ttl)}",
+            "ETag": '"' + hashlib.sha1(body).hexdigest() + '"',
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @app.get("/articles/{article_id}/cluster")
+    async def article_cluster(article_id: str):
+        """How many copies of an article the dedup stage dropped, and from which sources.
+
+        Only the worker producing the feed sees them, and only within DEDUP_WINDOW_SECONDS."""
+        cluster = dedup_index.cluster(article_id)
+        if cluster is None:
+            return JSONResponse(status_code=404, content={"error": "Article is not in the dedup window"})
+        return {"id": article_id, **cluster}
+
+    @app.get("/ws/stats")
+    async def websocket_stats():
+        """Fan-out statistics, including per-client lag and drop counts"""
+        return {**broadcaster.stats(), "backplane": backplane.stats(), "store": article_store.stats(),
+                "viewport": viewport_tiles.stats()}
+
+    @app.get("/")
+    async def root():
+        """Health check endpoint"""
+        return {"status": "ok", "message": "PulseHub24 Backend API"}
+
+    async def fetch_country_info(country_data: dict) -> dict:
+        """Generate country information with the configured model. Raises on upstream or parse errors."""
+        # Create the prompt
+        prompt = f"""Provide information about {country_data['english']} in the following JSON format:
+        {{
+            "summary": "A brief 2-sentence summary of the country",
+            "capital": "The capital city",
+            "area": "The total area in square kilometers",
+            "funFact": "An interesting fun fact about the country"
+        }}"""
+        
+        # Call the model
+        logger.info("Calling %s for country: %s", settings.llm_provider, country_data["english"],
+                    extra={"country": country_data["code"]})
+        # Runs in a worker thread; concurrent requests for the same country share one call
+        started = time.perf_counter()
+        response_text = await llm.generate(prompt)
+        COUNTRY_INFO_SECONDS.observe(time.perf_counter() - started, "llm")
+        
+        # Lazy arguments: the response is only formatted when DEBUG is on
+        logger.debug("Raw response content: %s", response_text)
+        
+        # Parse the response
+        started = time.perf_counter()
+        content = response_text.strip()
+        if content.startswith("```json"):
+            content = content[7:-3]
+        elif content.startswith("```"):
+            content = content[3:-3]
+        content = content.strip()
+        
+        result = json.loads(content)
+        result["code"] = country_data["code"]
+        result["native"] = country_data["native"]
+        COUNTRY_INFO_SECONDS.observe(time.perf_counter() - started, "parse")
+        logger.debug("Processed result: %s", result)
+        return result
+
+    async def prewarm_country_cache() -> int:
+        """Fill the country cache for every known country that is missing or expired."""
+        countries = country_index.countries
+        if not getattr(model, "configured", True):
+            logger.warning(f"Skipping country cache pre-warm: the {settings.llm_provider} provider has no API key")
+            return 0
+        loaded = await country_cache.prewarm(
+            ((code, lambda data=data: fetch_country_info(data)) for code, data in countries.items()),
+            concurrency=llm.max_concurrency,
+        )
+        logger.info(f"Country cache pre-warm loaded {loaded} of {len(countries)} countries")
+        return loaded
+
+    # The full list never changes, so it is encoded once
+    countries_body = json.dumps(country_index.as_dict(), ensure_ascii=False, separators=(",", ":")).encode()
+    countries_headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": '"' + hashlib.sha1(countries_body).hexdigest() + '"',
+    }
+    
+    @app.get("/countries")
+    async def list_countries(request: Request, name: Optional[str] = None):
+        """Known countries and every normalized name that resolves to them, or resolve one name"""
+        if name is not None:
+            resolved = country_index.resolve(name)
+            if resolved is None:
+                return JSONResponse(status_code=404, content={"error": "Unknown country"})
+            return resolved
+        if request.headers.get("if-none-match") == countries_headers["ETag"]:
+            return Response(status_code=304, headers=countries_headers)
+        return Response(content=countries_body, media_type="application/json", headers=countries_headers)
+
+    @app.post("/country-info")
+    async def get_country_info(request: Request):
+        started = time.perf_counter()
+        try:
+            
+            # Handle preflight requests
+            if request.method == "OPTIONS":
+                return Response(
+                    status_code=200,
+                    headers={
+                        "Access-Control-Allow-Origin": "*",
+                        "Access-Control-Allow-Methods": "POST, OPTIONS",
+                        "Access-Control-Allow-Headers": "Content-Type",
+                    }
+                )
+            
+            data = await request.json()
+            logger.debug("Request data: %s", data)
+            
+            country = data.get("country")
+            if not country:
+                logger.error("Country name is missing")
+                return JSONResponse(
+                    status_code=400,
+                    content={"error": "Country name is required"}
+                )
             
-            # Call Gemini API
-            logger.info(f"Calling Gemini API for country: {country_data['english']}")
-            response = model.generate_content(prompt)
+            # Get country code and names
+            country_data = country_index.resolve(country) or {"code": "UN", "english": country, "native": country}
+            logger.debug("Country data: %s", country_data)
             
-            logger.info("Gemini API response received")
-            logger.info(f"Raw response content: {response.text}")
+            loader_seconds = 0.0
             
-            # Parse the response
-            content = response.text.strip()
-            if content.startswith("```json"):
-                content = content[7:-3]
-            elif content.startswith("```"):
-                content = content[3:-3]
-            content = content.strip()
+            async def load() -> dict:
+                nonlocal loader_seconds
+                loader_started = time.perf_counter()
+                try:
+                    return await fetch_country_info(country_data)
+                finally:
+                    loader_seconds = time.perf_counter() - loader_started
             
             try:
-                result = json.loads(content)
-                result["code"] = country_data["code"]
-                result["native"] = country_data["native"]
-                logger.info(f"Processed result: {result}")
+                if country_data["code"] == "UN":
+                    # Unknown names are free-form input; don't let them grow the cache
+                    result = await load()
+                else:
+                    cache_started = time.perf_counter()
+                    result = await country_cache.get(country_data["code"], load)
+                    COUNTRY_INFO_SECONDS.observe(time.perf_counter() - cache_started - loader_seconds, "cache")
                 return JSONResponse(content=result)
+            except ProviderNotConfigured as e:
+                logger.error(f"Country information is unavailable: {e}")
+                return JSONResponse(
+                    status_code=503,
+                    content={"error": "Country information is not configured"}
+                )
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse Gemini response as JSON: {str(e)}")
+                logger.error(f"Failed to parse model response as JSON: {str(e)}")
                 return JSONResponse(
                     status_code=500,
                     content={"error": "Failed to process country information"}
                 )
+            except asyncio.TimeoutError:
+                logger.error(f"Model call timed out for country: {country_data['english']}")
+                return JSONResponse(
+                    status_code=504,
+                    content={"error": "Timed out fetching country information"}
+                )
+            except Exception as e:
+                logger.error(f"Error calling {settings.llm_provider}: {str(e)}")
+                return JSONResponse(
+                    status_code=500,
+                    content={"error": "Failed to fetch country information"}
+                )
                 
         except Exception as e:
-            logger.error(f"Error calling Gemini API: {str(e)}")
+            logger.error(f"Error processing request: {str(e)}")
             return JSONResponse(
                 status_code=500,
-                content={"error": "Failed to fetch country information"}
+                content={"error": "Internal server error"}
             )
-            
-    except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"error": "Internal server error"}
-        )
+        finally:
+            COUNTRY_INFO_SECONDS.observe(time.perf_counter() - started, "total")
+
+    @app.get("/ingestion/stats")
+    async def ingestion_stats():
+        """Per-stage throughput and queue depth of the ingestion pipeline"""
+        return {**pipeline.stats(), "dedup": dedup_index.stats(), "geotag": location_extractor.stats(),
+                "enrichment": enricher.stats(),
+                "persistence": article_writer.stats() if article_writer else None}
+
+    @app.get("/country-info/stats")
+    async def country_info_stats():
+        """Cache and LLM counters for /country-info"""
+        return {"cache": country_cache.stats(), "llm": llm.stats()}
+
+    # Gauges are read when /metrics is scraped, so they cost nothing in between
+    gauge("pulsehub_ws_clients", "Connected WebSocket clients", callback=lambda: len(broadcaster))
+    gauge("pulsehub_ws_queued_messages", "Messages waiting in client queues",
+          callback=lambda: sum(len(client.queue) for client in broadcaster.clients.values()))
+    gauge("pulsehub_ws_max_lag_seconds", "Age of the oldest undelivered client message",
+          callback=lambda: max((client.lag for client in broadcaster.clients.values()), default=0.0))
+    gauge("pulsehub_backplane_queued_batches", "Article batches waiting for this worker's broadcaster",
+          callback=lambda: backplane.stats()["queued"])
+    gauge("pulsehub_ingestion_queue_depth", "Batches waiting in front of each ingestion stage", labels=("stage",),
+          callback=lambda: {name: stage["queueDepth"] for name, stage in pipeline.stats()["stages"].items()})
+    gauge("pulsehub_persistence_pending_articles", "Articles waiting to be written to Postgres",
+          callback=lambda: article_writer.stats()["pending"] if article_writer else 0)
+    gauge("pulsehub_llm_in_flight", "Model calls in flight", labels=("client",),
+          callback=lambda: {c.name: c.in_flight for c in (llm, enrichment_llm) if c is not None})
+    gauge("pulsehub_store_articles", "Articles in the recent-article store", callback=lambda: len(article_store))
+    gauge("process_resident_memory_bytes", "Resident memory of this worker", callback=resident_memory_bytes)
+
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus text exposition of the hot-path histograms and gauges"""
+        return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    # Opt-in sampling profiler: PROFILER_ENABLED=1 exposes /debug/profile
+    profiler = SamplingProfiler(interval=settings.profiler_interval)
+
+    @app.get("/debug/profile")
+    async def debug_profile(seconds: float = 10.0):
+        """Sample the event loop for a few seconds; returns folded stacks for a flame graph"""
+        if not settings.profiler_enabled:
+            return JSONResponse(status_code=404, content={"error": "Profiler is disabled"})
+        if profiler.running:
+            return JSONResponse(status_code=409, content={"error": "A profile is already running"})
+        stacks = await profiler.profile(max(0.1, min(seconds, 60.0)))
+        return Response(content=stacks, media_type="text/plain")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await pipeline.close()
+        if article_writer is not None:
+            await article_writer.close()
+        if isinstance(viewport_source, PostGISViewport):
+            await viewport_source.close()
+        await backplane.close()
+        for client in (llm, enrichment_llm):
+            if client is not None:
+                client.shutdown()
+
+    @app.on_event("startup")
+    async def startup_event():
+        await backplane.start()
+        asyncio.create_task(monitor_event_loop(settings.loop_monitor_interval))
+        asyncio.create_task(broadcast_news())
+        asyncio.create_task(produce_news())
+        if settings.country_cache_prewarm:
+            asyncio.create_task(prewarm_country_cache())
+    
+    app.state.settings = settings
+    app.state.prewarm_country_cache = prewarm_country_cache
+    return app
 
-@app.on_event("startup")
-async def startup_event():
-    asyncio.create_task(broadcast_news())
+# `uvicorn main:app`; the factory itself is `uvicorn main:create_app --factory`
+app = create_app()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if "--prewarm" in sys.argv:
+        # Populate the persistent cache ahead of a deploy: python main.py --prewarm
+        asyncio.run(app.state.prewarm_country_cache())
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
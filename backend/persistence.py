@@ -0,0 +1,475 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Mapping, Optional, Set, Tuple
+from urllib.parse import quote
+
+from dedup import article_hash
+
+logger = logging.getLogger(__name__)
+
+Article = Dict[str, Any]
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "db", "schema.sql")
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+# Idempotent writes need a unique content hash; older databases lack it
+CONTENT_HASH_MIGRATION = """
+ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS content_hash BYTEA;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_news_articles_content_hash ON news_articles (content_hash);
+"""
+
+# Same tables as schema.sql, but range-partitioned by published_at so old
+# articles can be dropped a partition at a time. Unique keys on a partitioned
+# table must include the partition key, so category links carry published_at.
+PARTITIONED_SCHEMA = """
+CREATE EXTENSION IF NOT EXISTS postgis;
+DO $$ BEGIN
+    CREATE TYPE news_status AS ENUM ('pending', 'processed', 'published');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN
+    CREATE TYPE sentiment_type AS ENUM ('positive', 'negative', 'neutral');
+EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+
+CREATE TABLE IF NOT EXISTS news_articles (
+    id BIGSERIAL,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    summary TEXT,
+    source_url TEXT NOT NULL,
+    published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    status news_status DEFAULT 'pending',
+    sentiment sentiment_type,
+    location_point GEOGRAPHY(POINT),
+    location_name TEXT,
+    country_code CHAR(2),
+    content_hash BYTEA NOT NULL,
+    PRIMARY KEY (id, published_at),
+    UNIQUE (content_hash, published_at)
+) PARTITION BY RANGE (published_at);
+
+CREATE TABLE IF NOT EXISTS news_categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS article_categories (
+    article_id BIGINT NOT NULL,
+    published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    category_id INTEGER REFERENCES news_categories(id) ON DELETE CASCADE,
+    PRIMARY KEY (article_id, published_at, category_id)
+) PARTITION BY RANGE (published_at);
+
+CREATE INDEX IF NOT EXISTS idx_news_articles_location ON news_articles USING GIST (location_point);
+CREATE INDEX IF NOT EXISTS idx_news_articles_published_at ON news_articles (published_at);
+CREATE INDEX IF NOT EXISTS idx_news_articles_content_hash ON news_articles (content_hash);
+"""
+
+# Partitioned tables created before the content hash lookup below
+PARTITIONED_MIGRATION = """
+CREATE INDEX IF NOT EXISTS idx_news_articles_content_hash ON news_articles (content_hash);
+"""
+
+# Partitioned tables can only be unique on (content_hash, published_at). A story
+# already stored keeps its published_at, so a re-fetch still hits the conflict
+# target when the source gave no date and it was stamped with the fetch time
+ADOPT_PUBLISHED_AT = """
+UPDATE article_staging s SET published_at = a.published_at
+FROM news_articles a
+WHERE a.content_hash = s.content_hash AND a.published_at <> s.published_at
+"""
+
+# Rows are COPY'd here first, then merged into the real tables in one statement
+STAGING_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS article_staging (
+    content_hash BYTEA,
+    title TEXT,
+    content TEXT,
+    summary TEXT,
+    source_url TEXT,
+    published_at TIMESTAMP WITH TIME ZONE,
+    sentiment TEXT,
+    category TEXT,
+    lon DOUBLE PRECISION,
+    lat DOUBLE PRECISION,
+    location_name TEXT,
+    country_code TEXT
+) ON COMMIT DELETE ROWS
+"""
+
+STAGING_COLUMNS = (
+    "content_hash", "title", "content", "summary", "source_url", "published_at",
+    "sentiment", "category", "lon", "lat", "location_name", "country_code",
+)
+
+ADD_CATEGORIES = """
+INSERT INTO news_categories (name)
+SELECT DISTINCT category FROM article_staging WHERE category IS NOT NULL
+ON CONFLICT (name) DO NOTHING
+"""
+
+# Insert new articles, refresh changed ones (e.g. re-enriched), and link
+# categories for every row that was written, in one round trip
+MERGE = """
+WITH upserted AS (
+    INSERT INTO news_articles AS a (
+        content_hash, title, content, summary, source_url, published_at, status,
+        sentiment, location_point, location_name, country_code
+    )
+    SELECT
+        content_hash, title, content, summary, source_url, published_at, 'published',
+        sentiment::sentiment_type,
+        CASE WHEN lon IS NULL THEN NULL ELSE ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography END,
+        location_name, country_code
+    FROM article_staging
+    ON CONFLICT ({conflict}) DO UPDATE SET
+        summary = COALESCE(EXCLUDED.summary, a.summary),
+        sentiment = COALESCE(EXCLUDED.sentiment, a.sentiment),
+        location_point = COALESCE(EXCLUDED.location_point, a.location_point),
+        location_name = COALESCE(EXCLUDED.location_name, a.location_name),
+        country_code = COALESCE(EXCLUDED.country_code, a.country_code)
+    WHERE (a.summary, a.sentiment, a.location_name, a.country_code)
+        IS DISTINCT FROM (EXCLUDED.summary, EXCLUDED.sentiment, EXCLUDED.location_name, EXCLUDED.country_code)
+    RETURNING a.id, a.content_hash, a.published_at
+), linked AS (
+    INSERT INTO article_categories (article_id, {link_columns}category_id)
+    SELECT u.id, {link_values}c.id
+    FROM upserted u
+    JOIN article_staging s ON s.content_hash = u.content_hash
+    JOIN news_categories c ON c.name = s.category
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM upserted), (SELECT count(*) FROM linked)
+"""
+
+
+def database_url_from_env(env: Optional[Mapping[str, str]] = None) -> Optional[str]:
+    """DATABASE_URL, or a URL built from the POSTGRES_* variables the Node backend uses."""
+    env = os.environ if env is None else env
+    if env.get("DATABASE_URL"):
+        return env["DATABASE_URL"]
+    if not env.get("POSTGRES_HOST"):
+        return None
+    user = quote(env.get("POSTGRES_USER", "postgres"), safe="")
+    password = quote(env.get("POSTGRES_PASSWORD", ""), safe="")
+    credentials = f"{user}:{password}" if password else user
+    return (f"postgresql://{credentials}@{env['POSTGRES_HOST']}:{env.get('POSTGRES_PORT', '5432')}"
+            f"/{env.get('POSTGRES_DB', 'postgres')}")
+
+
+def import_asyncpg(feature: str) -> Any:
+    """The asyncpg module, imported on first use so workers without a database never load it."""
+    try:
+        import asyncpg
+    except ImportError:
+        raise RuntimeError(f"asyncpg is required {feature}") from None
+    return asyncpg
+
+
+def _published_at(value: Any) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.now(timezone.utc)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def article_row(article: Article) -> Tuple:
+    """Staging row for an article, in STAGING_COLUMNS order."""
+    location = article.get("location") or {}
+    lon, lat = location.get("coordinates") or (None, None)
+    country = article.get("countryCode") or location.get("countryCode")
+    sentiment = article.get("sentiment")
+    title = article.get("title") or ""
+    return (
+        article_hash(article),
+        title[:255],
+        article.get("content") or article.get("description") or title,
+        article.get("summary"),
+        article.get("url") or "",
+        _published_at(article.get("publishedAt")),
+        sentiment if sentiment in SENTIMENTS else None,
+        (article.get("category") or None) and article["category"][:50],
+        float(lon) if lon is not None else None,
+        float(lat) if lat is not None else None,
+        location.get("name"),
+        country if isinstance(country, str) and len(country) == 2 else None,
+    )
+
+
+def _day(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class ArticleWriter:
+    """Writes articles to Postgres in the background, in batches.
+
+    ``write`` only appends to an in-memory queue, so callers never wait on the
+    database. A background task flushes whenever ``batch_size`` articles are
+    waiting or ``flush_interval`` seconds have passed: each batch is COPY'd
+    into a temporary table and merged with one upsert keyed on the content
+    hash, so replays and retries never create duplicates. Up to ``pool_size``
+    batches are written concurrently.
+
+    When ``partitioned`` is set and the tables don't exist yet, they are
+    created partitioned by day of ``published_at``. Partitions are added as
+    articles arrive and dropped once older than ``retention_days``. Stories
+    are still deduplicated on the content hash alone, as long as the stored
+    copy's partition hasn't been dropped.
+    """
+
+    def __init__(self, dsn: str, batch_size: int = 500, flush_interval: float = 1.0, pool_size: int = 4,
+                 max_pending: int = 50000, max_attempts: int = 3, partitioned: bool = False,
+                 retention_days: Optional[int] = None):
+        self.dsn = dsn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool_size = pool_size
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.partitioned = partitioned
+        self.retention_days = retention_days
+        self._pool = None
+        self._pending: Deque[Tuple[Article, int]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._starting: Optional[asyncio.Task] = None
+        self._retry_start_at = 0.0
+        self._flushes: Set[asyncio.Task] = set()
+        self._partitions: Set[datetime] = set()
+        self._partition_lock: Optional[asyncio.Lock] = None
+        self._merge = ""
+        self._last_retention = 0.0
+        self.rows_written = 0
+        self.links_written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.expired = 0
+        self.flush_seconds = 0.0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        asyncpg = import_asyncpg("to persist articles")
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._partition_lock = asyncio.Lock()
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size,
+                                               init=lambda connection: connection.execute(STAGING_TABLE))
+        await self.ensure_schema()
+        self._task = asyncio.create_task(self._run())
+
+    async def ensure_schema(self) -> None:
+        """Create the tables if needed and detect whether they are partitioned."""
+        async with self._pool.acquire() as connection:
+            kind = await connection.fetchval("SELECT relkind::text FROM pg_class WHERE relname = 'news_articles'")
+            if kind is None:
+                if self.partitioned:
+                    await connection.execute(PARTITIONED_SCHEMA)
+                else:
+                    with open(SCHEMA_PATH, encoding="utf-8") as f:
+                        await connection.execute(f.read())
+                kind = await connection.fetchval("SELECT relkind::text FROM pg_class WHERE relname = 'news_articles'")
+            if self.partitioned and kind != "p":
+                logger.warning("news_articles already exists unpartitioned; writing to it as is")
+            self.partitioned = kind == "p"
+            if self.partitioned:
+                await connection.execute(PARTITIONED_MIGRATION)
+            else:
+                await connection.execute(CONTENT_HASH_MIGRATION)
+        if self.partitioned:
+            self._merge = MERGE.format(conflict="content_hash, published_at",
+                                       link_columns="published_at, ", link_values="u.published_at, ")
+        else:
+            self._merge = MERGE.format(conflict="content_hash", link_columns="", link_values="")
+
+    def write(self, articles: List[Article]) -> None:
+        """Queue articles for writing; never blocks. Drops the oldest if too far behind."""
+        for article in articles:
+            self._pending.append((article, 0))
+        overflow = len(self._pending) - self.max_pending
+        for _ in range(max(0, overflow)):
+            self._pending.popleft()
+            self.dropped += 1
+        if self._wake is not None and len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def stage(self, batch: List[Article]) -> List[Article]:
+        """Ingestion stage: queue the batch for persistence and pass it on unchanged.
+
+        The first batch starts the writer in the background, so only the process
+        running the pipeline connects, and an unreachable database never holds
+        up the feed.
+        """
+        if self._task is None and self._starting is None and time.monotonic() >= self._retry_start_at:
+            self._starting = asyncio.create_task(self._start_in_background())
+        self.write(batch)
+        return batch
+
+    async def _start_in_background(self) -> None:
+        try:
+            await self.start()
+        except Exception as e:
+            logger.error(f"Could not start the article writer, retrying in 30s: {e!r}")
+            if self._pool is not None:
+                await self._pool.close()
+                self._pool = None
+            self._retry_start_at = time.monotonic() + 30
+        finally:
+            self._starting = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._pending:
+                await self._slots.acquire()
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                task = asyncio.create_task(self._flush(batch))
+                self._flushes.add(task)
+                task.add_done_callback(self._flushes.discard)
+            if self.partitioned and self.retention_days and time.monotonic() - self._last_retention > 3600:
+                self._last_retention = time.monotonic()
+                try:
+                    await self.drop_expired_partitions()
+                except Exception as e:
+                    logger.error(f"Dropping expired partitions failed: {e!r}")
+
+    async def _flush(self, batch: List[Tuple[Article, int]]) -> None:
+        started = time.perf_counter()
+        try:
+            # Last write wins for duplicates within a batch; an upsert can't touch a row twice
+            rows = {}
+            for position, (article, _) in enumerate(batch, 1):
+                row = article_row(article)
+                rows[row[0]] = row
+                if position % 64 == 0:
+                    # Hashing a whole batch at once would stall the event loop
+                    await asyncio.sleep(0)
+            records = list(rows.values())
+            if self.partitioned and self.retention_days:
+                # Their partitions would be dropped again right away
+                cutoff = _day(datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+                kept = [record for record in records if record[5] >= cutoff]
+                self.expired += len(records) - len(kept)
+                records = kept
+            if not records:
+                return
+            if self.partitioned:
+                await self._ensure_partitions(record[5] for record in records)
+            async with self._pool.acquire() as connection:
+                async with connection.transaction():
+                    await connection.copy_records_to_table(
+                        "article_staging", records=records, columns=STAGING_COLUMNS
+                    )
+                    if self.partitioned:
+                        await connection.execute(ADOPT_PUBLISHED_AT)
+                    await connection.execute(ADD_CATEGORIES)
+                    written, linked = await connection.fetchrow(self._merge)
+            self.rows_written += written
+            self.links_written += linked
+            self.batches += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Writing {len(batch)} articles failed: {e!r}")
+            retry = [(article, attempts + 1) for article, attempts in batch if attempts + 1 < self.max_attempts]
+            self.dropped += len(batch) - len(retry)
+            self._pending.extendleft(reversed(retry))
+            await asyncio.sleep(1)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.flush_seconds += elapsed
+            self.last_flush_ms = elapsed * 1000
+            self._slots.release()
+
+    async def _ensure_partitions(self, timestamps) -> None:
+        days = {_day(timestamp) for timestamp in timestamps} - self._partitions
+        if not days:
+            return
+        async with self._partition_lock, self._pool.acquire() as connection:
+            for day in sorted(days - self._partitions):
+                suffix = day.strftime("%Y%m%d")
+                bounds = f"FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                for table in ("news_articles", "article_categories"):
+                    await connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {table}_p{suffix} PARTITION OF {table} FOR VALUES {bounds}"
+                    )
+                self._partitions.add(day)
+
+    async def drop_expired_partitions(self) -> List[str]:
+        """Drop daily partitions entirely older than ``retention_days``."""
+        cutoff = _day(datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+        dropped = []
+        async with self._pool.acquire() as connection:
+            names = await connection.fetch(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname IN ('news_articles', 'article_categories')"
+            )
+            for (name,) in names:
+                try:
+                    day = datetime.strptime(name.rsplit("_p", 1)[1], "%Y%m%d").replace(tzinfo=timezone.utc)
+                except (IndexError, ValueError):
+                    continue
+                if day + timedelta(days=1) <= cutoff:
+                    await connection.execute(f"DROP TABLE IF EXISTS {name}")
+                    self._partitions.discard(day)
+                    dropped.append(name)
+        if dropped:
+            logger.info(f"Dropped {len(dropped)} expired partitions")
+        return dropped
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Flush what's queued (up to ``timeout`` seconds) and close the pool."""
+        if self._starting is not None:
+            self._starting.cancel()
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        try:
+            while self._pending or self._flushes:
+                if self._pending:
+                    await self._slots.acquire()
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                    task = asyncio.create_task(self._flush(batch))
+                    self._flushes.add(task)
+                    task.add_done_callback(self._flushes.discard)
+                await asyncio.wait_for(asyncio.gather(*self._flushes), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Closing with {len(self._pending)} articles not written")
+        await self._pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "partitioned": self.partitioned,
+            "pending": len(self._pending),
+            "rowsWritten": self.rows_written,
+            "categoryLinks": self.links_written,
+            "batches": self.batches,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "rowsPerSecond": round(self.rows_written / self.flush_seconds, 1) if self.flush_seconds else 0.0,
+            "lastFlushMs": round(self.last_flush_ms, 1),
+        }
@@ -0,0 +1,131 @@
+import json
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from llm import StubModel, TextResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderNotConfigured(RuntimeError):
+    """The provider can't make calls, e.g. because its API key is missing."""
+
+
+class Provider:
+    """A text model behind the ``generate_content(prompt).text`` interface ``LLMClient`` calls.
+
+    The SDK client is built on the first call, which ``LLMClient`` makes in a
+    worker thread, so neither the SDK import nor a missing key holds up startup.
+    """
+
+    name = "provider"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        """False if calls are bound to fail with ``ProviderNotConfigured``."""
+        return bool(self.api_key)
+
+    def connect(self) -> Any:
+        """Build the SDK client; raises ``ProviderNotConfigured`` if it can't be."""
+        raise NotImplementedError
+
+    def complete(self, client: Any, prompt: str) -> str:
+        raise NotImplementedError
+
+    def generate_content(self, prompt: str) -> TextResponse:
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.connect()
+                    logger.info(f"{self.name} client ready")
+                client = self._client
+        return TextResponse(self.complete(client, prompt))
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model: str = "gemini-pro"):
+        super().__init__(api_key)
+        self.model = model
+
+    def connect(self) -> Any:
+        if not self.api_key:
+            raise ProviderNotConfigured("GEMINI_API_KEY is not set")
+        # The SDK pulls in gRPC and protobuf, most of a second on import
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(self.model)
+
+    def complete(self, client: Any, prompt: str) -> str:
+        return client.generate_content(prompt).text
+
+
+class OpenAIProvider(Provider):
+    """Any OpenAI-compatible chat completions API, as the Node routes use."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str = "gpt-3.5-turbo", base_url: str = "https://api.openai.com/v1",
+                 timeout: float = 30.0):
+        super().__init__(api_key)
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def connect(self) -> Any:
+        if not self.api_key:
+            raise ProviderNotConfigured("OPENAI_API_KEY is not set")
+        import httpx
+        return httpx.Client(base_url=self.base_url, timeout=self.timeout,
+                            headers={"Authorization": f"Bearer {self.api_key}"})
+
+    def complete(self, client: Any, prompt: str) -> str:
+        response = client.post("/chat/completions", json={
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+        })
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+_COUNTRY_PROMPT = re.compile(r"information about (.+?) in the following JSON format")
+
+
+def stub_reply(prompt: str) -> str:
+    """Canned answers: the local classifier for enrichment prompts, placeholder facts otherwise."""
+    if "ARTICLES:\n" in prompt:
+        from enrichment import offline_model
+        return offline_model().respond(prompt)
+    match = _COUNTRY_PROMPT.search(prompt)
+    country = match.group(1) if match else "This country"
+    return "```json\n" + json.dumps({
+        "summary": f"{country} is described by the local stub model. Set LLM_PROVIDER to a real model for facts.",
+        "capital": "Unknown",
+        "area": "0",
+        "funFact": "This answer came from the stub model.",
+    }) + "\n```"
+
+
+PROVIDERS: Dict[str, Callable[[Any], Any]] = {
+    "gemini": lambda settings: GeminiProvider(settings.gemini_api_key, settings.gemini_model),
+    "openai": lambda settings: OpenAIProvider(settings.openai_api_key, settings.openai_model,
+                                              settings.openai_base_url, settings.llm_timeout),
+    "stub": lambda settings: StubModel(stub_reply, latency=settings.llm_stub_latency),
+}
+
+
+def create_provider(settings: Any) -> Any:
+    """The model for ``settings.llm_provider``; nothing is imported or connected yet."""
+    factory = PROVIDERS.get(settings.llm_provider)
+    if factory is None:
+        raise ValueError(f"Unknown LLM_PROVIDER {settings.llm_provider!r}; expected one of {', '.join(PROVIDERS)}")
+    return factory(settings)
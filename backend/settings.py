@@ -0,0 +1,104 @@
+import os
+from typing import List, Mapping, Optional
+
+from persistence import database_url_from_env
+
+
+def _list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+class Settings:
+    """Every setting the app reads from the environment, parsed once.
+
+    ``env`` defaults to ``os.environ``; pass a mapping to build an app with
+    other settings without touching the process environment.
+    """
+
+    def __init__(self, env: Optional[Mapping[str, str]] = None):
+        env = os.environ if env is None else env
+        get = env.get
+
+        # Logging; LOG_FORMAT=json writes one JSON object per line
+        self.log_level = get("LOG_LEVEL", "INFO")
+        self.log_format = get("LOG_FORMAT", "text")
+
+        # Model provider for /country-info and LLM enrichment: gemini, openai or stub.
+        # Its client is only built on the first model call
+        self.llm_provider = get("LLM_PROVIDER", "gemini").strip().lower()
+        self.gemini_api_key = get("GEMINI_API_KEY") or None
+        self.gemini_model = get("GEMINI_MODEL", "gemini-pro")
+        # Any OpenAI-compatible chat completions endpoint
+        self.openai_api_key = get("OPENAI_API_KEY") or None
+        self.openai_model = get("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.openai_base_url = get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        # Seconds each stub answer takes, to imitate a real model
+        self.llm_stub_latency = float(get("LLM_STUB_LATENCY", "0"))
+        self.llm_max_concurrency = int(get("LLM_MAX_CONCURRENCY", "4"))
+        self.llm_timeout = float(get("LLM_TIMEOUT", "30"))
+
+        # Country information cache: bounded in-memory LRU backed by SQLite
+        self.country_cache_path = get("COUNTRY_CACHE_PATH", "country_cache.sqlite3") or None
+        self.country_cache_size = int(get("COUNTRY_CACHE_SIZE", "512"))
+        self.country_cache_ttl = float(get("COUNTRY_CACHE_TTL", str(7 * 24 * 3600)))
+        self.country_cache_stale_ttl = float(get("COUNTRY_CACHE_STALE_TTL", str(30 * 24 * 3600)))
+        self.country_cache_prewarm = _flag(get("COUNTRY_CACHE_PREWARM", ""))
+
+        # WebSocket fan-out
+        self.ws_client_queue_size = int(get("WS_CLIENT_QUEUE_SIZE", "32"))
+        self.ws_evict_after_drops = int(get("WS_EVICT_AFTER_DROPS", "64"))
+        self.ws_send_timeout = float(get("WS_SEND_TIMEOUT", "10"))
+        self.ws_grid_cell_degrees = float(get("WS_GRID_CELL_DEGREES", "5"))
+        self.ws_snapshot_size = int(get("WS_SNAPSHOT_SIZE", "50"))
+        self.ws_replay_limit = int(get("WS_REPLAY_LIMIT", "1000"))
+        self.backplane_url = get("BACKPLANE_URL", "memory://")
+        self.article_store_size = int(get("ARTICLE_STORE_SIZE", "100000"))
+
+        # Map viewport clustering and tile cache
+        self.viewport_max_level = int(get("VIEWPORT_MAX_LEVEL", "8"))
+        self.viewport_points_zoom = int(get("VIEWPORT_POINTS_ZOOM", "12"))
+        self.viewport_max_points = int(get("VIEWPORT_MAX_POINTS", "200"))
+        self.viewport_cache_ttl = float(get("VIEWPORT_CACHE_TTL", "5"))
+        self.viewport_max_tiles = int(get("VIEWPORT_MAX_TILES", "64"))
+        self.viewport_backend = get("VIEWPORT_BACKEND", "memory")
+        self.viewport_window_hours = float(get("VIEWPORT_WINDOW_HOURS", "24"))
+
+        # Ingestion sources; the sample feed runs when none are configured
+        self.rss_feeds = _list(get("RSS_FEEDS", ""))
+        self.news_api_key = get("NEWS_API_KEY") or None
+        self.sample_batch_size = int(get("SAMPLE_BATCH_SIZE", "3"))
+        self.sample_interval = float(get("SAMPLE_INTERVAL", "5"))
+        self.ingest_queue_size = int(get("INGEST_QUEUE_SIZE", "16"))
+        self.dedup_window_seconds = float(get("DEDUP_WINDOW_SECONDS", str(6 * 3600)))
+        self.dedup_max_entries = int(get("DEDUP_MAX_ENTRIES", "200000"))
+        self.dedup_threshold = float(get("DEDUP_THRESHOLD", "0.5"))
+        # Extra comma-separated gazetteer city files (CSV or GeoNames dumps)
+        self.gazetteer_cities = _list(get("GAZETTEER_CITIES", ""))
+
+        # LLM enrichment; off by default in favour of the local keyword classifier
+        self.enrich_with_llm = _flag(get("ENRICH_WITH_LLM", ""))
+        self.enrich_max_concurrency = int(get("ENRICH_MAX_CONCURRENCY", "2"))
+        self.enrich_timeout = float(get("ENRICH_TIMEOUT", "60"))
+        self.enrich_requests_per_minute = float(get("ENRICH_REQUESTS_PER_MINUTE", "60"))
+        self.enrich_tokens_per_minute = float(get("ENRICH_TOKENS_PER_MINUTE", "100000"))
+        self.enrich_max_prompt_tokens = int(get("ENRICH_MAX_PROMPT_TOKENS", "6000"))
+        self.enrich_cost_per_1k_input = float(get("ENRICH_COST_PER_1K_INPUT", "0"))
+        self.enrich_cost_per_1k_output = float(get("ENRICH_COST_PER_1K_OUTPUT", "0"))
+
+        # Postgres persistence, on when DATABASE_URL or POSTGRES_HOST is set
+        self.database_url = database_url_from_env(env)
+        self.db_batch_size = int(get("DB_BATCH_SIZE", "500"))
+        self.db_flush_interval = float(get("DB_FLUSH_INTERVAL", "1"))
+        self.db_pool_size = int(get("DB_POOL_SIZE", "4"))
+        self.db_partitioned = _flag(get("DB_PARTITIONED", ""))
+        retention_days = get("DB_RETENTION_DAYS")
+        self.db_retention_days = int(retention_days) if retention_days else None
+
+        # Diagnostics
+        self.profiler_enabled = _flag(get("PROFILER_ENABLED", ""))
+        self.profiler_interval = float(get("PROFILER_INTERVAL", "0.005"))
+        self.loop_monitor_interval = float(get("LOOP_MONITOR_INTERVAL", "0.1"))
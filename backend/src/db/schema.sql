@@ -19,7 +19,8 @@ CREATE TABLE IF NOT EXISTS news_articles (
     sentiment sentiment_type,
     location_point GEOGRAPHY(POINT),
     location_name TEXT,
-    country_code CHAR(2)
+    country_code CHAR(2),
+    content_hash BYTEA
 );
 
 CREATE TABLE IF NOT EXISTS news_categories (
@@ -50,6 +51,7 @@ CREATE TABLE IF NOT EXISTS social_media_posts (
 -- Create indexes
 CREATE INDEX idx_news_articles_location ON news_articles USING GIST (location_point);
 CREATE INDEX idx_news_articles_published_at ON news_articles(published_at);
+CREATE UNIQUE INDEX idx_news_articles_content_hash ON news_articles(content_hash);
 CREATE INDEX idx_social_media_posts_location ON social_media_posts USING GIST (location_point);
 CREATE INDEX idx_social_media_posts_posted_at ON social_media_posts(posted_at);
 
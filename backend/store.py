@@ -0,0 +1,269 @@
+import json
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Article = Dict[str, Any]
+
+# Time index granularity for publishedAt
+TIME_BUCKET_SECONDS = 3600
+
+
+class SequenceGenerator:
+    """Monotonic article cursors: microseconds since the epoch, never repeating.
+
+    Being time-based, cursors stay roughly ordered when another process takes
+    over producing the feed.
+    """
+
+    def __init__(self):
+        self.last = 0
+
+    def __call__(self) -> int:
+        self.last = max(self.last + 1, time.time_ns() // 1000)
+        return self.last
+
+
+def _timestamp(value: Any) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class ArticleRecord:
+    """One stored article: filterable fields plus the compact JSON encoding."""
+
+    __slots__ = ("seq", "published", "country", "category", "sentiment", "source_type", "lon", "lat", "payload")
+
+    def __init__(self, seq: int, article: Article):
+        location = article.get("location") or {}
+        coordinates = location.get("coordinates") or (None, None)
+        self.seq = seq
+        self.published = _timestamp(article.get("publishedAt"))
+        self.country = article.get("countryCode") or location.get("countryCode")
+        self.category = article.get("category")
+        self.sentiment = article.get("sentiment")
+        self.source_type = article.get("sourceType")
+        self.lon, self.lat = coordinates
+        self.payload = json.dumps(article, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def article(self) -> Article:
+        return json.loads(self.payload)
+
+
+class _PostingList:
+    """Ascending ring positions for one index key, trimmed lazily from the front."""
+
+    __slots__ = ("positions", "start")
+
+    def __init__(self):
+        self.positions = array("q")
+        self.start = 0
+
+    def append(self, position: int) -> None:
+        self.positions.append(position)
+
+    def trim(self, oldest: int) -> None:
+        self.start = bisect_left(self.positions, oldest, self.start)
+        if self.start > 1024 and self.start * 2 > len(self.positions):
+            del self.positions[:self.start]
+            self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.positions) - self.start
+
+
+class ArticleStore:
+    """Bounded ring buffer of recent articles with secondary indexes.
+
+    Articles are indexed by country code, category, sentiment and publishedAt
+    hour. Queries walk the smallest matching posting list and check the
+    remaining filters on each record, so they cost roughly O(matches) rather
+    than O(stored articles). Each article's cursor is its ``seq``.
+
+    ``listeners`` are objects with ``add(record)`` and ``remove(record)``
+    methods, told about every record as it is stored and evicted, so derived
+    indexes stay in step with the ring.
+    """
+
+    def __init__(self, capacity: int = 100000, listeners: Iterable[Any] = ()):
+        self.capacity = capacity
+        self.listeners = list(listeners)
+        self._ring: List[Optional[ArticleRecord]] = [None] * capacity
+        self._next = 0  # position the next article is written to
+        self._indexes: Dict[str, Dict[Any, _PostingList]] = {
+            "country": {}, "category": {}, "sentiment": {}, "bucket": {},
+        }
+        self.last_seq = 0
+        # Seq of the newest record pushed out of the ring; cursors before it missed articles
+        self.last_evicted_seq = 0
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    @property
+    def oldest_seq(self) -> Optional[int]:
+        return self._record(self._oldest).seq if self._next else None
+
+    @property
+    def _oldest(self) -> int:
+        return max(0, self._next - self.capacity)
+
+    def _record(self, position: int) -> ArticleRecord:
+        return self._ring[position % self.capacity]
+
+    def _evict(self, record: ArticleRecord) -> None:
+        keys = (
+            ("country", record.country), ("category", record.category),
+            ("sentiment", record.sentiment), ("bucket", int(record.published // TIME_BUCKET_SECONDS)),
+        )
+        oldest = self._oldest
+        for index, key in keys:
+            postings = self._indexes[index].get(key)
+            if postings is None:
+                continue
+            postings.trim(oldest)
+            if not len(postings):
+                del self._indexes[index][key]
+
+    def add(self, article: Article) -> Optional[int]:
+        """Store an article carrying a ``seq``. Returns its seq, or None if it's out of order."""
+        seq = article.get("seq")
+        if not isinstance(seq, int) or seq <= self.last_seq:
+            return None
+        record = ArticleRecord(seq, article)
+        position = self._next
+        evicted = self._ring[position % self.capacity]
+        self._ring[position % self.capacity] = record
+        self._next += 1
+        if evicted is not None:
+            self.last_evicted_seq = evicted.seq
+            self._evict(evicted)
+            for listener in self.listeners:
+                listener.remove(evicted)
+        keys = (
+            ("country", record.country), ("category", record.category),
+            ("sentiment", record.sentiment), ("bucket", int(record.published // TIME_BUCKET_SECONDS)),
+        )
+        for index, key in keys:
+            if key is not None:
+                self._indexes[index].setdefault(key, _PostingList()).append(position)
+        for listener in self.listeners:
+            listener.add(record)
+        self.last_seq = seq
+        return seq
+
+    def extend(self, articles: List[Article]) -> int:
+        return sum(1 for article in articles if self.add(article) is not None)
+
+    def _position_after(self, seq: int) -> int:
+        """First ring position whose record has a seq greater than ``seq``."""
+        lo, hi = self._oldest, self._next
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid).seq <= seq:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _candidates(self, filters: Dict[str, Any], since: Optional[float],
+                    until: Optional[float]) -> Optional[List[Tuple[array, int]]]:
+        """The smallest set of posting lists that covers the query, or None to scan everything."""
+        best: Optional[List[Tuple[array, int]]] = None
+        best_size = len(self) + 1
+        for index, value in filters.items():
+            postings = self._indexes[index].get(value)
+            if postings is None:
+                return []
+            if len(postings) < best_size:
+                best, best_size = [(postings.positions, postings.start)], len(postings)
+        if since is not None or until is not None:
+            first = int(since // TIME_BUCKET_SECONDS) if since is not None else None
+            last = int(until // TIME_BUCKET_SECONDS) if until is not None else None
+            lists = [
+                (postings.positions, postings.start)
+                for bucket, postings in self._indexes["bucket"].items()
+                if (first is None or bucket >= first) and (last is None or bucket <= last)
+            ]
+            size = sum(len(positions) - start for positions, start in lists)
+            if size < best_size:
+                best = lists
+        return best
+
+    def _walk(self, lo: int, hi: int, candidates: Optional[List[Tuple[array, int]]],
+              newest_first: bool) -> Iterator[ArticleRecord]:
+        if candidates is None:
+            positions = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+        elif len(candidates) == 1:
+            # Walk the posting list in place so a limited query stops early
+            postings, start = candidates[0]
+            begin = bisect_left(postings, lo, start)
+            end = bisect_left(postings, hi, begin)
+            indexes = range(end - 1, begin - 1, -1) if newest_first else range(begin, end)
+            positions = (postings[i] for i in indexes)
+        else:
+            merged = []
+            for postings, start in candidates:
+                begin = bisect_left(postings, lo, start)
+                merged.extend(postings[begin:bisect_left(postings, hi, begin)])
+            merged.sort(reverse=newest_first)
+            positions = merged
+        for position in positions:
+            yield self._record(position)
+
+    def query(self, country: Optional[str] = None, category: Optional[str] = None,
+              sentiment: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              after: Optional[int] = None, before: Optional[int] = None, limit: int = 100,
+              predicate: Optional[Callable[[ArticleRecord], bool]] = None) -> List[ArticleRecord]:
+        """Matching records.
+
+        With ``after`` (a resume cursor) records are returned oldest first,
+        starting just after that cursor. Otherwise they are returned newest
+        first, older than ``before`` if given (history pagination).
+        """
+        filters = {
+            key: value for key, value in
+            (("country", country), ("category", category), ("sentiment", sentiment))
+            if value is not None
+        }
+        lo = self._position_after(after) if after is not None else self._oldest
+        hi = self._position_after(before - 1) if before is not None else self._next
+        candidates = self._candidates(filters, since, until)
+        results = []
+        for record in self._walk(lo, hi, candidates, newest_first=after is None):
+            if country is not None and record.country != country:
+                continue
+            if category is not None and record.category != category:
+                continue
+            if sentiment is not None and record.sentiment != sentiment:
+                continue
+            if since is not None and record.published < since:
+                continue
+            if until is not None and record.published > until:
+                continue
+            if predicate is not None and not predicate(record):
+                continue
+            results.append(record)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "articles": len(self),
+            "capacity": self.capacity,
+            "lastSeq": self.last_seq,
+            "countries": len(self._indexes["country"]),
+            "timeBuckets": len(self._indexes["bucket"]),
+        }
+
+
+def records_to_json(records: List[ArticleRecord]) -> bytes:
+    """A JSON array of the stored articles, spliced from their stored encodings."""
+    return b"[" + b",".join(record.payload for record in records) + b"]"
@@ -0,0 +1,189 @@
+import math
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+BBox = Tuple[float, float, float, float]  # west, south, east, north
+
+
+class SubscriptionError(ValueError):
+    pass
+
+
+def _parse_bbox(value: Any) -> Optional[BBox]:
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = [value.get("west"), value.get("south"), value.get("east"), value.get("north")]
+    try:
+        west, south, east, north = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise SubscriptionError("bbox must be [west, south, east, north]")
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south <= north <= 90):
+        raise SubscriptionError("bbox is out of range")
+    return west, south, east, north
+
+
+def _parse_set(value: Any, field: str) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str) or not all(isinstance(v, str) for v in value):
+        raise SubscriptionError(f"{field} must be a list of strings")
+    return frozenset(value)
+
+
+class Subscription:
+    """What a client wants to receive. ``None`` for a field means "everything"."""
+
+    __slots__ = ("bbox", "categories", "sentiments", "source_types")
+
+    def __init__(self, bbox: Optional[BBox] = None, categories: Optional[FrozenSet[str]] = None,
+                 sentiments: Optional[FrozenSet[str]] = None, source_types: Optional[FrozenSet[str]] = None):
+        self.bbox = bbox
+        self.categories = categories
+        self.sentiments = sentiments
+        self.source_types = source_types
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any], base: Optional["Subscription"] = None) -> "Subscription":
+        """Build a subscription from a client message. Fields missing from an
+        update message keep their value from ``base``."""
+        base = base or cls()
+        fields = {
+            "bbox": base.bbox,
+            "categories": base.categories,
+            "sentiments": base.sentiments,
+            "source_types": base.source_types,
+        }
+        if "bbox" in message or "viewport" in message:
+            fields["bbox"] = _parse_bbox(message.get("bbox", message.get("viewport")))
+        if "categories" in message:
+            fields["categories"] = _parse_set(message["categories"], "categories")
+        if "sentiments" in message:
+            fields["sentiments"] = _parse_set(message["sentiments"], "sentiments")
+        if "sourceTypes" in message:
+            fields["source_types"] = _parse_set(message["sourceTypes"], "sourceTypes")
+        return cls(**fields)
+
+    def contains(self, lon: float, lat: float) -> bool:
+        if self.bbox is None:
+            return True
+        west, south, east, north = self.bbox
+        if not south <= lat <= north:
+            return False
+        if west <= east:
+            return west <= lon <= east
+        # Viewport crosses the antimeridian
+        return lon >= west or lon <= east
+
+    def matches(self, article: Dict[str, Any], lon: Optional[float], lat: Optional[float]) -> bool:
+        return self.matches_fields(
+            article.get("category"), article.get("sentiment"), article.get("sourceType"), lon, lat
+        )
+
+    def matches_fields(self, category: Optional[str], sentiment: Optional[str], source_type: Optional[str],
+                       lon: Optional[float], lat: Optional[float]) -> bool:
+        if self.categories is not None and category not in self.categories:
+            return False
+        if self.sentiments is not None and sentiment not in self.sentiments:
+            return False
+        if self.source_types is not None and source_type not in self.source_types:
+            return False
+        if self.bbox is None:
+            return True
+        return lon is not None and self.contains(lon, lat)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bbox": list(self.bbox) if self.bbox else None,
+            "categories": sorted(self.categories) if self.categories is not None else None,
+            "sentiments": sorted(self.sentiments) if self.sentiments is not None else None,
+            "sourceTypes": sorted(self.source_types) if self.source_types is not None else None,
+        }
+
+
+def article_coordinates(article: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    """(lon, lat) of an article, or (None, None) if it isn't geotagged."""
+    try:
+        lon, lat = article["location"]["coordinates"]
+        return float(lon), float(lat)
+    except (KeyError, TypeError, ValueError):
+        return None, None
+
+
+class SubscriptionIndex:
+    """Routes articles to subscribers through a uniform lat/lon grid.
+
+    Each subscriber is registered in the grid cells its viewport overlaps, so
+    matching an article only looks at the subscribers in its own cell. Viewports
+    covering more than ``max_cells`` cells (and subscribers without a viewport)
+    are kept in a separate list that is checked for every article.
+    """
+
+    def __init__(self, cell_size: float = 5.0, max_cells: int = 256):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._columns = int(math.ceil(360 / cell_size))
+        self._rows = int(math.ceil(180 / cell_size))
+        self.subscriptions: Dict[Hashable, Subscription] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._cells_by_subscriber: Dict[Hashable, List[Tuple[int, int]]] = {}
+        self._global: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        column = min(int((lon + 180) // self.cell_size), self._columns - 1)
+        row = min(int((lat + 90) // self.cell_size), self._rows - 1)
+        return column, row
+
+    def _column_ranges(self, west: float, east: float) -> Iterable[Tuple[int, int]]:
+        if west <= east:
+            return [(self._cell(west, 0)[0], self._cell(east, 0)[0])]
+        return [(self._cell(west, 0)[0], self._columns - 1), (0, self._cell(east, 0)[0])]
+
+    def _cells_for(self, bbox: BBox) -> Optional[List[Tuple[int, int]]]:
+        west, south, east, north = bbox
+        first_row, last_row = self._cell(0, south)[1], self._cell(0, north)[1]
+        ranges = list(self._column_ranges(west, east))
+        count = sum(hi - lo + 1 for lo, hi in ranges) * (last_row - first_row + 1)
+        if count > self.max_cells:
+            return None
+        return [
+            (column, row)
+            for lo, hi in ranges
+            for column in range(lo, hi + 1)
+            for row in range(first_row, last_row + 1)
+        ]
+
+    def subscribe(self, subscriber: Hashable, subscription: Subscription) -> None:
+        """Add or replace the subscription for ``subscriber``."""
+        self.remove(subscriber)
+        self.subscriptions[subscriber] = subscription
+        cells = self._cells_for(subscription.bbox) if subscription.bbox else None
+        if cells is None:
+            self._global.add(subscriber)
+            return
+        self._cells_by_subscriber[subscriber] = cells
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(subscriber)
+
+    def remove(self, subscriber: Hashable) -> None:
+        if self.subscriptions.pop(subscriber, None) is None:
+            return
+        self._global.discard(subscriber)
+        for cell in self._cells_by_subscriber.pop(subscriber, ()):
+            members = self._cells[cell]
+            members.discard(subscriber)
+            if not members:
+                del self._cells[cell]
+
+    def match(self, article: Dict[str, Any]) -> List[Hashable]:
+        """Subscribers whose filters accept ``article``."""
+        lon, lat = article_coordinates(article)
+        candidates: Iterable[Hashable] = self._global
+        if lon is not None and -180 <= lon <= 180 and -90 <= lat <= 90:
+            local = self._cells.get(self._cell(lon, lat))
+            if local:
+                candidates = list(self._global) + list(local)
+        subscriptions = self.subscriptions
+        return [s for s in candidates if subscriptions[s].matches(article, lon, lat)]
@@ -0,0 +1,511 @@
+import heapq
+import inspect
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from persistence import import_asyncpg
+from store import ArticleRecord
+from subscriptions import BBox
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator stops short of the poles
+MAX_LATITUDE = 85.0511287798
+# Finest grid level; cells are ~2.4 m at the equator, so points closer than that share a group
+POINT_LEVEL = 24
+_POINT_CELLS = 1 << POINT_LEVEL
+_POINT_MASK = _POINT_CELLS - 1
+_COMBO_BITS = 16
+_COMBO_MASK = (1 << _COMBO_BITS) - 1
+# Cell entry holding [count, sum x, sum y, positive, neutral, negative] over every combo
+_TOTAL = -1
+# Half the Web Mercator (EPSG:3857) world width in metres
+_MERCATOR_HALF = 20037508.342789244
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+
+class ViewportError(ValueError):
+    pass
+
+
+def project(lon: float, lat: float) -> Tuple[float, float]:
+    """Web Mercator position of (lon, lat) as fractions of the world, in [0, 1)."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    top = 1.0 - 1e-12
+    return min(max(x, 0.0), top), min(max(y, 0.0), top)
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    """(lon, lat) of a Web Mercator world fraction."""
+    return x * 360.0 - 180.0, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+def tile_bounds(z: int, x: int, y: int) -> BBox:
+    """(west, south, east, north) of a map tile."""
+    size = 1 << z
+    west, north = unproject(x / size, y / size)
+    east, south = unproject((x + 1) / size, (y + 1) / size)
+    return west, south, east, north
+
+
+def tiles_for_bbox(bbox: BBox, zoom: int, max_tiles: int = 64) -> List[Tuple[int, int]]:
+    """Tiles at ``zoom`` covering a viewport; it may cross the antimeridian."""
+    west, south, east, north = bbox
+    size = 1 << zoom
+    left, top = project(west, north)
+    right, bottom = project(east, south)
+    first_row, last_row = int(top * size), int(bottom * size)
+    if west <= east:
+        columns = [(int(left * size), int(right * size))]
+    else:
+        columns = [(int(left * size), size - 1), (0, int(right * size))]
+    count = sum(hi - lo + 1 for lo, hi in columns) * (last_row - first_row + 1)
+    if count > max_tiles:
+        raise ViewportError(f"viewport covers {count} tiles at zoom {zoom}; the limit is {max_tiles}")
+    return [(x, y) for lo, hi in columns for x in range(lo, hi + 1) for y in range(first_row, last_row + 1)]
+
+
+def _valid(lon: Any, lat: Any) -> bool:
+    return (isinstance(lon, (int, float)) and isinstance(lat, (int, float))
+            and -180 <= lon <= 180 and -90 <= lat <= 90)
+
+
+def _cluster(lon: float, lat: float, count: int, mix: List[int]) -> Dict[str, Any]:
+    return {
+        "lon": round(lon, 5),
+        "lat": round(lat, 5),
+        "count": count,
+        "sentiment": dict(zip(SENTIMENTS, mix)),
+    }
+
+
+class ViewportIndex:
+    """Stored articles clustered by map tile, for the viewport endpoint.
+
+    Points are projected to Web Mercator and clustered on a grid
+    ``cell_shift`` levels finer than the requested zoom (8x8 cells per tile
+    by default). For every grid level up to ``max_level`` each occupied cell
+    keeps a count and coordinate sums per (category, sentiment), so a cluster
+    tile at low zoom costs a fixed number of dict lookups however many
+    articles it covers, and filters only choose which sums to add up. Memory
+    for those levels is bounded by their cell count, not by the number of
+    articles. Deeper than that, articles are kept in groups of identical
+    position per ``max_level`` cell and clustered on the fly; viewports that
+    deep cover few groups. At ``points_zoom`` and above tiles hold the
+    articles themselves, newest first.
+
+    Register it as an ``ArticleStore`` listener to keep it in step with the store.
+    """
+
+    def __init__(self, max_level: int = 8, cell_shift: int = 3, points_zoom: int = 12, max_points: int = 200):
+        self.max_level = max_level
+        self.cell_shift = cell_shift
+        self.points_zoom = points_zoom
+        self.max_points = max_points
+        self._levels: List[Dict[int, Dict[int, List[float]]]] = [{} for _ in range(max_level + 1)]
+        # max_level cell -> (point cell << _COMBO_BITS | combo) -> records, oldest first
+        self._buckets: Dict[int, Dict[int, List[ArticleRecord]]] = {}
+        self._combos: List[Tuple[Optional[str], Optional[str]]] = []
+        self._combo_ids: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self._combo_sentiments: List[int] = []
+        # Registered first so the overflow combos in _combo always exist
+        for sentiment in SENTIMENTS + (None,):
+            self._combo(None, sentiment)
+        self.points = 0
+        self.tiles_served = 0
+
+    def __len__(self) -> int:
+        return self.points
+
+    def _combo(self, category: Optional[str], sentiment: Optional[str]) -> int:
+        key = (category, sentiment)
+        combo = self._combo_ids.get(key)
+        if combo is None:
+            if len(self._combos) > _COMBO_MASK:
+                # Unbounded category names from some feed: lump the rest together
+                return self._combo_ids[(None, sentiment if sentiment in SENTIMENTS else None)]
+            combo = self._combo_ids[key] = len(self._combos)
+            self._combos.append(key)
+            self._combo_sentiments.append(SENTIMENTS.index(sentiment) if sentiment in SENTIMENTS else -1)
+        return combo
+
+    def _allowed(self, categories: Optional[FrozenSet[str]],
+                 sentiments: Optional[FrozenSet[str]]) -> Optional[FrozenSet[int]]:
+        """Combo ids passing the filters, or None when nothing is filtered."""
+        if categories is None and sentiments is None:
+            return None
+        return frozenset(
+            combo for combo, (category, sentiment) in enumerate(self._combos)
+            if (categories is None or category in categories) and (sentiments is None or sentiment in sentiments)
+        )
+
+    def _locate(self, record: ArticleRecord) -> Optional[Tuple[float, float, int, int]]:
+        if not _valid(record.lon, record.lat):
+            return None
+        x, y = project(record.lon, record.lat)
+        return x, y, int(x * _POINT_CELLS), int(y * _POINT_CELLS)
+
+    def add(self, record: ArticleRecord) -> None:
+        position = self._locate(record)
+        if position is None:
+            return
+        x, y, px, py = position
+        combo = self._combo(record.category, record.sentiment)
+        sentiment = self._combo_sentiments[combo]
+        key = 0
+        for level, cells in enumerate(self._levels):
+            shift = POINT_LEVEL - level
+            key = ((px >> shift) << level) | (py >> shift)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = {_TOTAL: [0, 0.0, 0.0, 0, 0, 0]}
+            total = cell[_TOTAL]
+            total[0] += 1
+            total[1] += x
+            total[2] += y
+            if sentiment >= 0:
+                total[3 + sentiment] += 1
+            sums = cell.get(combo)
+            if sums is None:
+                cell[combo] = [1, x, y]
+            else:
+                sums[0] += 1
+                sums[1] += x
+                sums[2] += y
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+        group = (((px << POINT_LEVEL) | py) << _COMBO_BITS) | combo
+        records = bucket.get(group)
+        if records is None:
+            bucket[group] = [record]
+        else:
+            records.append(record)
+        self.points += 1
+
+    def remove(self, record: ArticleRecord) -> None:
+        position = self._locate(record)
+        if position is None:
+            return
+        x, y, px, py = position
+        combo = self._combo(record.category, record.sentiment)
+        sentiment = self._combo_sentiments[combo]
+        key = 0
+        for level, cells in enumerate(self._levels):
+            shift = POINT_LEVEL - level
+            key = ((px >> shift) << level) | (py >> shift)
+            cell = cells[key]
+            total = cell[_TOTAL]
+            if total[0] == 1:
+                del cells[key]
+                continue
+            total[0] -= 1
+            total[1] -= x
+            total[2] -= y
+            if sentiment >= 0:
+                total[3 + sentiment] -= 1
+            sums = cell[combo]
+            if sums[0] == 1:
+                del cell[combo]
+            else:
+                sums[0] -= 1
+                sums[1] -= x
+                sums[2] -= y
+        bucket = self._buckets[key]
+        group = (((px << POINT_LEVEL) | py) << _COMBO_BITS) | combo
+        records = bucket[group]
+        # Evictions are oldest first, so this is nearly always the head
+        if records[0] is record:
+            del records[0]
+        else:
+            records.remove(record)
+        if not records:
+            del bucket[group]
+            if not bucket:
+                del self._buckets[key]
+        self.points -= 1
+
+    def _groups(self, z: int, tx: int, ty: int) -> Iterator[Tuple[int, int, int, List[ArticleRecord]]]:
+        """(point x, point y, combo, records) for every group inside a tile."""
+        if z >= self.max_level:
+            shift = z - self.max_level
+            bucket = self._buckets.get(((tx >> shift) << self.max_level) | (ty >> shift))
+            buckets = [bucket] if bucket else []
+        else:
+            shift = self.max_level - z
+            buckets = []
+            for bx in range(tx << shift, (tx + 1) << shift):
+                for by in range(ty << shift, (ty + 1) << shift):
+                    bucket = self._buckets.get((bx << self.max_level) | by)
+                    if bucket:
+                        buckets.append(bucket)
+        # A max_level cell can be bigger than the tile; check that each group is inside
+        check = z > self.max_level
+        tile_shift = POINT_LEVEL - z
+        for bucket in buckets:
+            for group, records in bucket.items():
+                point = group >> _COMBO_BITS
+                px, py = point >> POINT_LEVEL, point & _POINT_MASK
+                if check and (px >> tile_shift != tx or py >> tile_shift != ty):
+                    continue
+                yield px, py, group & _COMBO_MASK, records
+
+    def _cells(self, z: int, tx: int, ty: int) -> Iterator[Dict[int, List[float]]]:
+        """Aggregated cells of a tile at the clustering level: from the pyramid, or built from groups."""
+        level = z + self.cell_shift
+        if level <= self.max_level:
+            cells = self._levels[level]
+            span = 1 << self.cell_shift
+            for cx in range(tx * span, (tx + 1) * span):
+                base = cx << level
+                for cy in range(ty * span, (ty + 1) * span):
+                    cell = cells.get(base | cy)
+                    if cell:
+                        yield cell
+            return
+
+        shift = POINT_LEVEL - level
+        built: Dict[int, Dict[int, List[float]]] = {}
+        for px, py, combo, records in self._groups(z, tx, ty):
+            key = ((px >> shift) << level) | (py >> shift)
+            cell = built.get(key)
+            if cell is None:
+                cell = built[key] = {_TOTAL: [0, 0.0, 0.0, 0, 0, 0]}
+            count = len(records)
+            x, y = count * (px + 0.5) / _POINT_CELLS, count * (py + 0.5) / _POINT_CELLS
+            total = cell[_TOTAL]
+            total[0] += count
+            total[1] += x
+            total[2] += y
+            if self._combo_sentiments[combo] >= 0:
+                total[3 + self._combo_sentiments[combo]] += count
+            sums = cell.get(combo)
+            if sums is None:
+                cell[combo] = [count, x, y]
+            else:
+                sums[0] += count
+                sums[1] += x
+                sums[2] += y
+        yield from built.values()
+
+    def tile(self, z: int, x: int, y: int, categories: Optional[FrozenSet[str]] = None,
+             sentiments: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """Clusters (or, from ``points_zoom``, articles) in one tile."""
+        self.tiles_served += 1
+        allowed = self._allowed(categories, sentiments)
+        if z >= self.points_zoom:
+            return self._articles(z, x, y, allowed)
+
+        combo_sentiments = self._combo_sentiments
+        clusters = []
+        for cell in self._cells(z, x, y):
+            if allowed is None:
+                count, sum_x, sum_y, *mix = cell[_TOTAL]
+            else:
+                count, sum_x, sum_y = 0, 0.0, 0.0
+                mix = [0, 0, 0]
+                for combo in allowed:
+                    sums = cell.get(combo)
+                    if sums is None:
+                        continue
+                    count += sums[0]
+                    sum_x += sums[1]
+                    sum_y += sums[2]
+                    if combo_sentiments[combo] >= 0:
+                        mix[combo_sentiments[combo]] += sums[0]
+            if count:
+                lon, lat = unproject(sum_x / count, sum_y / count)
+                clusters.append(_cluster(lon, lat, count, mix))
+        return {"clusters": clusters, "articles": []}
+
+    def _articles(self, z: int, x: int, y: int, allowed: Optional[FrozenSet[int]]) -> Dict[str, Any]:
+        matching = [
+            records for _, _, combo, records in self._groups(z, x, y)
+            if allowed is None or combo in allowed
+        ]
+        total = sum(len(records) for records in matching)
+        # Groups are in seq order, so only the tail of each can be among the newest
+        tails = (record for records in matching for record in records[-self.max_points:])
+        newest = heapq.nlargest(self.max_points, tails, key=lambda r: r.seq)
+        return {"clusters": [], "articles": [record.article() for record in newest],
+                "truncated": total > len(newest)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "points": self.points,
+            "cells": sum(len(cells) for cells in self._levels),
+            "groups": sum(len(bucket) for bucket in self._buckets.values()),
+            "tilesServed": self.tiles_served,
+        }
+
+
+# Tile queries for the PostGIS mode. Cells are computed in EPSG:3857 so they
+# line up with the in-memory grid; the && test on the geography column uses
+# the GIST index on location_point.
+_FILTERS = """
+    a.location_point && ST_MakeEnvelope($1, $2, $3, $4, 4326)::geography
+    AND a.published_at >= now() - $5::interval
+    AND ($6::text[] IS NULL OR a.sentiment::text = ANY($6))
+    AND ($7::text[] IS NULL OR EXISTS (
+        SELECT 1 FROM article_categories ac JOIN news_categories c ON c.id = ac.category_id
+        WHERE ac.article_id = a.id AND c.name = ANY($7)))
+"""
+
+CLUSTER_QUERY = """
+SELECT count(*) AS count, avg(mx) AS mx, avg(my) AS my,
+       count(*) FILTER (WHERE sentiment = 'positive') AS positive,
+       count(*) FILTER (WHERE sentiment = 'neutral') AS neutral,
+       count(*) FILTER (WHERE sentiment = 'negative') AS negative
+FROM (
+    SELECT ST_X(p) AS mx, ST_Y(p) AS my, sentiment,
+           floor((ST_X(p) + $8) / $9)::bigint AS cx, floor(($8 - ST_Y(p)) / $9)::bigint AS cy
+    FROM (
+        SELECT ST_Transform(a.location_point::geometry, 3857) AS p, a.sentiment::text AS sentiment
+        FROM news_articles a
+        WHERE""" + _FILTERS + """
+    ) projected
+) cells
+WHERE cx BETWEEN $10 AND $11 AND cy BETWEEN $12 AND $13
+GROUP BY cx, cy
+"""
+
+POINTS_QUERY = """
+SELECT a.id, a.title, a.summary, a.source_url, a.published_at, a.sentiment::text AS sentiment,
+       a.location_name, a.country_code,
+       ST_X(a.location_point::geometry) AS lon, ST_Y(a.location_point::geometry) AS lat,
+       (SELECT c.name FROM article_categories ac JOIN news_categories c ON c.id = ac.category_id
+        WHERE ac.article_id = a.id ORDER BY c.name LIMIT 1) AS category
+FROM news_articles a
+WHERE""" + _FILTERS + """
+    AND ST_Intersects(a.location_point::geometry, ST_MakeEnvelope($1, $2, $3, $4, 4326))
+ORDER BY a.published_at DESC
+LIMIT $8
+"""
+
+
+class PostGISViewport:
+    """The same tiles as ``ViewportIndex``, clustered in Postgres over everything
+    persisted in the last ``window_hours`` rather than only the in-memory store."""
+
+    def __init__(self, dsn: str, window_hours: float = 24, cell_shift: int = 3, points_zoom: int = 12,
+                 max_points: int = 200, pool_size: int = 2):
+        self.dsn = dsn
+        self.window = timedelta(hours=window_hours)
+        self.cell_shift = cell_shift
+        self.points_zoom = points_zoom
+        self.max_points = max_points
+        self.pool_size = pool_size
+        self._pool = None
+        self.tiles_served = 0
+        self.errors = 0
+
+    async def start(self) -> None:
+        asyncpg = import_asyncpg("for the PostGIS viewport")
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=self.pool_size)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def tile(self, z: int, x: int, y: int, categories: Optional[FrozenSet[str]] = None,
+                   sentiments: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        if self._pool is None:
+            await self.start()
+        self.tiles_served += 1
+        west, south, east, north = tile_bounds(z, x, y)
+        filters = (west, south, east, north, self.window,
+                   sorted(sentiments) if sentiments is not None else None,
+                   sorted(categories) if categories is not None else None)
+        try:
+            async with self._pool.acquire() as connection:
+                if z >= self.points_zoom:
+                    rows = await connection.fetch(POINTS_QUERY, *filters, self.max_points + 1)
+                    return {"clusters": [], "articles": [self._article(row) for row in rows[:self.max_points]],
+                            "truncated": len(rows) > self.max_points}
+                level = z + self.cell_shift
+                span = 1 << self.cell_shift
+                cell_size = 2 * _MERCATOR_HALF / (1 << level)
+                rows = await connection.fetch(
+                    CLUSTER_QUERY, *filters, _MERCATOR_HALF, cell_size,
+                    x * span, (x + 1) * span - 1, y * span, (y + 1) * span - 1,
+                )
+        except Exception:
+            self.errors += 1
+            raise
+        clusters = []
+        for row in rows:
+            lon, lat = unproject((row["mx"] + _MERCATOR_HALF) / (2 * _MERCATOR_HALF),
+                                 (_MERCATOR_HALF - row["my"]) / (2 * _MERCATOR_HALF))
+            clusters.append(_cluster(lon, lat, row["count"], [row["positive"], row["neutral"], row["negative"]]))
+        return {"clusters": clusters, "articles": []}
+
+    @staticmethod
+    def _article(row) -> Dict[str, Any]:
+        return {
+            "id": str(row["id"]),
+            "title": row["title"],
+            "description": row["summary"] or "",
+            "url": row["source_url"],
+            "publishedAt": row["published_at"].isoformat(),
+            "sentiment": row["sentiment"],
+            "category": row["category"],
+            "countryCode": row["country_code"],
+            "location": {"name": row["location_name"], "countryCode": row["country_code"],
+                         "coordinates": [row["lon"], row["lat"]]},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "postgis", "tilesServed": self.tiles_served, "errors": self.errors}
+
+
+class TileCache:
+    """Recently rendered tiles, keyed by tile and filters.
+
+    Tiles are served from here for ``ttl`` seconds, a little behind the live
+    feed in exchange for not re-clustering the same tile for every client.
+    """
+
+    def __init__(self, source: Any, ttl: float = 5.0, max_entries: int = 4096):
+        self.source = source
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, z: int, x: int, y: int, categories: Optional[FrozenSet[str]] = None,
+                  sentiments: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        key = (z, x, y, categories, sentiments)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        result = self.source.tile(z, x, y, categories, sentiments)
+        if inspect.isawaitable(result):
+            result = await result
+        if self.ttl > 0:
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **self.source.stats(),
+            "cachedTiles": len(self._entries),
+            "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,239 @@
+import json
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # optional: binary frames are only offered when installed
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered when installed
+    zstandard = None
+
+JSON = "json"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+
+# The columnar and msgpack formats carry a closed set of article fields: the
+# ones below plus ``location``. Any other key is dropped, so a field clients
+# need has to be added here before the pipeline starts setting it.
+
+# Low-cardinality fields sent as an index into a per-batch dictionary
+ENUM_FIELDS = ("source", "sourceType", "sentiment", "category", "countryCode")
+# Everything else is sent as one plain value per article
+VALUE_FIELDS = ("id", "seq", "title", "description", "content", "url", "publishedAt", "summary", "enrichedBy")
+
+_FIELDS = VALUE_FIELDS + ENUM_FIELDS + ("location",)
+
+# Coordinates are packed as integers in units of 1e-5 degrees (~1 m)
+COORDINATE_SCALE = 100000
+
+# Per-article ``locationMask`` values. Articles without coordinates hold 0, 0
+# in the packed array, which only the mask tells apart from a real 0, 0
+NO_LOCATION = 0
+LOCATION_WITHOUT_COORDINATES = 1
+LOCATION_WITH_COORDINATES = 2
+
+Payload = Union[str, bytes]
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    COLUMNAR: "application/vnd.pulsehub.columnar+json",
+    MSGPACK: "application/x-msgpack",
+}
+
+
+def available_formats() -> List[str]:
+    formats = [JSON, COLUMNAR]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    return formats
+
+
+def available_compressions() -> List[str]:
+    return ["zstd"] if zstandard is not None else []
+
+
+def negotiate(requested_format: Optional[str], requested_compression: Optional[str] = None):
+    """Pick the wire format and compression for a client, falling back to plain JSON."""
+    wire_format = requested_format if requested_format in available_formats() else JSON
+    # zstd only applies to binary frames; text frames rely on permessage-deflate
+    compression = requested_compression if wire_format == MSGPACK else None
+    if compression not in available_compressions():
+        compression = None
+    return wire_format, compression
+
+
+def format_from_accept(accept: Optional[str]) -> str:
+    """Wire format for a REST ``Accept`` header; plain JSON unless asked otherwise."""
+    if accept:
+        for wire_format in (MSGPACK, COLUMNAR):
+            if MEDIA_TYPES[wire_format] in accept and wire_format in available_formats():
+                return wire_format
+    return JSON
+
+
+def to_columns(articles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn a list of article dicts into a columnar batch.
+
+    Enum fields become indexes into ``dictionaries`` and coordinates become a
+    flat list of scaled integers ``[lon0, lat0, lon1, lat1, ...]``, with
+    ``locationMask`` saying which articles have a location and coordinates.
+    ``absent`` lists, per field, the articles that don't have that key at all,
+    or is true if none has it and the column is left out, so decoding gives
+    back the same keys as the JSON encoding.
+    """
+    absent: Dict[str, Any] = {}
+    for field in _FIELDS:
+        rows = [i for i, article in enumerate(articles) if field not in article]
+        if rows:
+            absent[field] = True if len(rows) == len(articles) else rows
+
+    columns: Dict[str, Any] = {
+        field: [a.get(field) for a in articles] for field in VALUE_FIELDS if absent.get(field) is not True
+    }
+    dictionaries: Dict[str, List[Any]] = {}
+    for field in ENUM_FIELDS:
+        if absent.get(field) is True:
+            continue
+        values: List[Any] = []
+        positions: Dict[Any, int] = {}
+        codes = []
+        for article in articles:
+            value = article.get(field)
+            code = positions.get(value)
+            if code is None:
+                code = positions[value] = len(values)
+                values.append(value)
+            codes.append(code)
+        dictionaries[field] = values
+        columns[field] = codes
+
+    coordinates = array("i")
+    names = []
+    location_codes = []
+    mask = []
+    for article in articles:
+        location = article.get("location")
+        if not location:
+            coordinates.extend((0, 0))
+            names.append(None)
+            location_codes.append(None)
+            mask.append(NO_LOCATION)
+            continue
+        point = location.get("coordinates")
+        if point:
+            coordinates.append(int(round(point[0] * COORDINATE_SCALE)))
+            coordinates.append(int(round(point[1] * COORDINATE_SCALE)))
+            mask.append(LOCATION_WITH_COORDINATES)
+        else:
+            coordinates.extend((0, 0))
+            mask.append(LOCATION_WITHOUT_COORDINATES)
+        names.append(location.get("name"))
+        location_codes.append(location.get("countryCode"))
+    columns["locationName"] = names
+    columns["locationCountryCode"] = location_codes
+    columns["locationMask"] = mask
+
+    batch = {
+        "count": len(articles),
+        "dictionaries": dictionaries,
+        "columns": columns,
+        "coordinates": coordinates,
+        "coordinateScale": COORDINATE_SCALE,
+    }
+    if absent:
+        batch["absent"] = absent
+    return batch
+
+
+def _location(columns: Dict[str, Any], coordinates: Any, scale: int, i: int) -> Optional[Dict[str, Any]]:
+    flag = columns["locationMask"][i]
+    if flag == NO_LOCATION:
+        return None
+    location = {"name": columns["locationName"][i]}
+    if columns["locationCountryCode"][i] is not None:
+        location["countryCode"] = columns["locationCountryCode"][i]
+    if flag == LOCATION_WITH_COORDINATES:
+        location["coordinates"] = [coordinates[2 * i] / scale, coordinates[2 * i + 1] / scale]
+    return location
+
+
+def from_columns(batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of ``to_columns``; used by tests, benchmarks and Python clients."""
+    columns = batch["columns"]
+    coordinates = batch["coordinates"]
+    if isinstance(coordinates, (bytes, bytearray)):
+        packed = array("i")
+        packed.frombytes(coordinates)
+        if sys.byteorder != "little":
+            packed.byteswap()
+        coordinates = packed
+    scale = batch.get("coordinateScale", COORDINATE_SCALE)
+    listed = batch.get("absent", {})
+    everything = frozenset(range(batch["count"]))
+    absent = {
+        field: everything if listed.get(field) is True else frozenset(listed.get(field, ())) for field in _FIELDS
+    }
+    articles = []
+    for i in range(batch["count"]):
+        article = {field: columns[field][i] for field in VALUE_FIELDS if i not in absent[field]}
+        for field in ENUM_FIELDS:
+            if i not in absent[field]:
+                article[field] = batch["dictionaries"][field][columns[field][i]]
+        if i not in absent["location"]:
+            article["location"] = _location(columns, coordinates, scale, i)
+        articles.append(article)
+    return articles
+
+
+def _packed_coordinates(coordinates: array) -> bytes:
+    if sys.byteorder != "little":
+        coordinates = array("i", coordinates)
+        coordinates.byteswap()
+    return coordinates.tobytes()
+
+
+def encode_articles(message: Dict[str, Any], wire_format: str = JSON,
+                    compression: Optional[str] = None) -> Payload:
+    """Encode an ``{"type": "articles", "articles": [...]}`` message.
+
+    JSON and columnar produce text frames, msgpack produces a binary frame.
+    """
+    if wire_format == JSON:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    batch = to_columns(message["articles"])
+    envelope = {key: value for key, value in message.items() if key != "articles"}
+    envelope["format"] = wire_format
+    if wire_format == COLUMNAR:
+        batch["coordinates"] = batch["coordinates"].tolist()
+        envelope["batch"] = batch
+        return json.dumps(envelope, separators=(",", ":"), ensure_ascii=False)
+    if wire_format == MSGPACK:
+        batch["coordinates"] = _packed_coordinates(batch["coordinates"])
+        envelope["batch"] = batch
+        data = msgpack.packb(envelope, use_bin_type=True)
+        if compression == "zstd":
+            data = zstandard.ZstdCompressor(level=3).compress(data)
+        return data
+    raise ValueError(f"Unknown wire format: {wire_format}")
+
+
+def decode_articles(payload: Payload) -> Dict[str, Any]:
+    """Decode any payload produced by ``encode_articles`` back to the JSON shape."""
+    if isinstance(payload, (bytes, bytearray)):
+        # zstd frame magic number
+        if zstandard is not None and payload[:4] == b"\x28\xb5\x2f\xfd":
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        envelope = msgpack.unpackb(payload, raw=False)
+    else:
+        envelope = json.loads(payload)
+    if "batch" not in envelope:
+        return envelope
+    batch = envelope.pop("batch")
+    envelope.pop("format", None)
+    envelope["articles"] = from_columns(batch)
+    return envelope